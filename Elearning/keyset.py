@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from uuid import UUID
+
+from django.db.models import Q
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_plain(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def cursor_values(obj, ordering):
+    values = []
+    for field in ordering:
+        value = obj
+        for part in field.lstrip("-").split("__"):
+            value = value[part] if isinstance(value, dict) else getattr(value, part)
+        values.append(value)
+    return values
+
+
+def after(ordering, values):
+    # Rows strictly after ``values`` in ``ordering`` (e.g. ["-created_at", "-id"]):
+    # (a > x) OR (a = x AND b > y) OR ... with the comparison flipped for "-" fields.
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        op = "lt" if field.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{name}__{op}": value})
+        equal &= Q(**{name: value})
+    return condition
@@ -0,0 +1,109 @@
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def word_starts(text):
+    # "Linear Algebra 101" -> ["linear algebra 101", "algebra 101", "101"]
+    words = normalize(text).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    # Sorted array of normalized keys with a parallel array of object ids:
+    # a prefix lookup is one bisect plus a scan of the matching run. Built
+    # from ``loader`` (yielding (id, label)) on first use; add/remove keep it
+    # current afterwards and are no-ops until then, since the build reads
+    # the latest rows. Keys are derived from the label by ``keys_for`` rather
+    # than stored per entry, and repeated keys share one string.
+
+    def __init__(self, loader, keys_for):
+        self.loader = loader
+        self.keys_for = keys_for
+        self._keys = []
+        self._ids = array("q")
+        self._labels = {}
+        self._built = False
+        self._lock = threading.Lock()
+
+    def _build(self):
+        labels = {}
+        pairs = []
+        shared = {}
+        for pk, label in self.loader():
+            labels[pk] = label
+            pairs.extend((shared.setdefault(key, key), pk) for key in set(self.keys_for(label)))
+        pairs.sort()
+        self._keys = [key for key, _ in pairs]
+        self._ids = array("q", (pk for _, pk in pairs))
+        self._labels = labels
+        self._built = True
+
+    def ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._build()
+
+    def lookup(self, prefix, limit=10):
+        prefix = normalize(prefix).strip()
+        if not prefix or limit < 1:
+            return []
+        self.ensure_built()
+        results = []
+        seen = set()
+        with self._lock:
+            keys, ids = self._keys, self._ids
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix):
+                pk = ids[i]
+                if pk not in seen:
+                    seen.add(pk)
+                    results.append((pk, self._labels[pk]))
+                    if len(results) == limit:
+                        break
+                i += 1
+        return results
+
+    def add(self, pk, label):
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(pk)
+            self._labels[pk] = label
+            for key in set(self.keys_for(label)):
+                i = bisect_left(self._keys, key)
+                self._keys.insert(i, key)
+                self._ids.insert(i, pk)
+
+    def remove(self, pk):
+        with self._lock:
+            if self._built:
+                self._remove(pk)
+
+    def _remove(self, pk):
+        label = self._labels.pop(pk, None)
+        if label is None:
+            return
+        for key in set(self.keys_for(label)):
+            i = bisect_left(self._keys, key)
+            while i < len(self._keys) and self._keys[i] == key:
+                if self._ids[i] == pk:
+                    del self._keys[i]
+                    del self._ids[i]
+                    break
+                i += 1
+
+    def reset(self):
+        with self._lock:
+            self._keys, self._ids, self._labels = [], array("q"), {}
+            self._built = False
+
+    def __len__(self):
+        return len(self._labels)
@@ -20,7 +20,8 @@ INSTALLED_APPS = [
     "courses.apps.CoursesConfig",   
     "channels",
     "rtchat",
-    "rest_framework"
+    "rest_framework",
+    "jobs",
 ]
 
 MEDIA_URL = "/media/"
@@ -28,6 +29,7 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "no-reply@elearning.local"
+NOTIFICATION_MAIL = {"BATCH_SIZE": 100, "RATE": None}
 SITE_BASE_URL = "http://127.0.0.1:8000"
 
 ASGI_APPLICATION = "Elearning.asgi.application"
@@ -36,6 +38,20 @@ CHANNEL_LAYERS = {
     "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
 }
 
+CHAT_WRITE_BEHIND = {"ENABLED": False, "FLUSH_INTERVAL": 0.05, "MAX_BATCH": 200}
+CHAT_RECENT_CACHE = {"PER_COURSE": 50, "MAX_MESSAGES": 20000}
+CHAT_EVENT_LOG = {"SIZE": 500, "MAX_COURSES": 1000, "RECENT_UIDS": 2000}
+CHAT_COMPACTION = {"CHUNK_SIZE": 1000, "CHUNKS_PER_JOB": 50}
+
+ROSTER_IMPORT = {"CHUNK_SIZE": 1000, "MAX_ROWS": 100000}
+EXPORT = {"CHUNK_SIZE": 2000, "BUFFER_BYTES": 65536}
+DASHBOARD = {"DEADLINE_DAYS": 30, "MAX_DEADLINES": 10, "TIMEOUT": 86400}
+CATALOG = {"PAGE_SIZE": 20, "MAX_PAGE_SIZE": 100, "TIMEOUT": 300}
+
+JOBS = {"WORKERS": 4, "POLL_INTERVAL": 1.0, "MAX_ATTEMPTS": 5, "BACKOFF": 5, "BACKOFF_MAX": 600}
+
+COURSE_ACCESS_CACHE = {"MAX_ENTRIES": 4096, "TTL": 60}
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
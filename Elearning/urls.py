@@ -1,7 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.views.generic import TemplateView
-from accounts.views import SignUpView
+from accounts.views import SignUpView, home
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -11,7 +10,7 @@ urlpatterns = [
     path("people/", include("accounts.urls")),   
     path("signup/", SignUpView.as_view(), name="signup"),
     path("courses/", include("courses.urls")),  
-    path("", TemplateView.as_view(template_name="home.html"), name="home"),
+    path("", home, name="home"),
     path("chat/", include("rtchat.urls")),  
     path("api/v1/", include("api.urls"))
 ]
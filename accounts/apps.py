@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+class AccountsConfig(AppConfig):
+    name = "accounts"
+
+    def ready(self):
+        from . import signals
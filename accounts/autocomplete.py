@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+
+from Elearning.prefix_index import PrefixIndex, normalize, word_starts
+
+
+def person_keys(label):
+    username, _, full_name = label.partition("\t")
+    return [normalize(username), *word_starts(full_name)]
+
+
+def person_label(username, first_name, last_name):
+    # one string per person keeps the index small; usernames cannot contain tabs
+    return f"{username}\t{f'{first_name} {last_name}'.strip()}"
+
+
+def _load():
+    rows = User.objects.values_list("pk", "username", "first_name", "last_name").order_by()
+    for pk, *names in rows.iterator(chunk_size=5000):
+        yield pk, person_label(*names)
+
+
+people_index = PrefixIndex(_load, person_keys)
+
+
+def suggest_people(prefix, limit=10):
+    results = []
+    for pk, label in people_index.lookup(prefix, limit):
+        username, _, full_name = label.partition("\t")
+        results.append({"id": pk, "username": username, "name": full_name})
+    return results
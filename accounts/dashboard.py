@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from courses import versions
+from courses.models import Assignment, Course, Enrollment
+
+
+def dashboard_settings():
+    conf = {"DEADLINE_DAYS": 30, "MAX_DEADLINES": 10, "TIMEOUT": 24 * 3600}
+    conf.update(getattr(settings, "DASHBOARD", {}))
+    return conf
+
+
+@dataclass
+class Dashboard:
+    teaching: list
+    enrolled: list
+    upcoming: list
+
+
+def _memberships(user_id):
+    teaching = (
+        Course.objects.filter(Q(created_by_id=user_id) | Q(enrollments__user_id=user_id, enrollments__role="TEACHER"))
+        .values_list("pk", flat=True)
+        .distinct()
+    )
+    enrolled = Enrollment.objects.filter(user_id=user_id, role="STUDENT").values_list("course_id", flat=True)
+    return list(teaching), list(enrolled)
+
+
+def _course_entries(course_ids, today, conf):
+    entries = {
+        pk: {"id": pk, "title": title, "deadlines": []}
+        for pk, title in Course.objects.filter(pk__in=course_ids).values_list("pk", "title")
+    }
+    deadlines = (
+        Assignment.objects.filter(
+            course_id__in=course_ids, due_date__gte=today, due_date__lte=today + timedelta(days=conf["DEADLINE_DAYS"])
+        )
+        .order_by("due_date", "id")
+        .values_list("course_id", "title", "due_date")
+    )
+    for course_id, title, due_date in deadlines:
+        entry = entries[course_id]
+        if len(entry["deadlines"]) < conf["MAX_DEADLINES"]:
+            entry["deadlines"].append({"course_title": entry["title"], "title": title, "due_date": due_date})
+    return entries
+
+
+def dashboard_for(user_id, today=None):
+    # Cached in two layers, both keyed by the courses.versions counters so
+    # nothing has to be deleted on writes: which courses the user teaches and
+    # attends (tagged with the user's version), and each course's title and
+    # upcoming deadlines (keyed by the course's version and the day). A warm
+    # dashboard costs the single version lookup.
+    conf = dashboard_settings()
+    today = today or timezone.localdate()
+    user_key = versions.user_key(user_id)
+    memberships = cache.get(f"dashboard:{user_id}")
+    known = memberships["teaching"] + memberships["enrolled"] if memberships else []
+    current = versions.fetch([user_key, *{versions.course_key(pk) for pk in known}])
+
+    if memberships is None or memberships["version"] != versions.tag(current[user_key]):
+        teaching, enrolled = _memberships(user_id)
+        memberships = {"version": versions.tag(current[user_key]), "teaching": teaching, "enrolled": enrolled}
+        cache.set(f"dashboard:{user_id}", memberships, conf["TIMEOUT"])
+        unknown = {versions.course_key(pk) for pk in teaching + enrolled} - current.keys()
+        if unknown:
+            current.update(versions.fetch(list(unknown)))
+
+    course_ids = set(memberships["teaching"] + memberships["enrolled"])
+    keys = {pk: f"dashboard-course:{pk}:{today}:{versions.tag(current[versions.course_key(pk)])}" for pk in course_ids}
+    cached = cache.get_many(keys.values())
+    entries = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = course_ids - entries.keys()
+    if missing:
+        built = _course_entries(missing, today, conf)
+        cache.set_many({keys[pk]: entry for pk, entry in built.items()}, conf["TIMEOUT"])
+        entries.update(built)
+
+    def listed(ids):
+        # a course deleted since the memberships were cached has no entry
+        return sorted((entries[pk] for pk in ids if pk in entries), key=lambda entry: (entry["title"], entry["id"]))
+
+    deadlines = sorted(
+        (deadline for entry in entries.values() for deadline in entry["deadlines"]),
+        key=lambda deadline: deadline["due_date"],
+    )
+    return Dashboard(
+        teaching=listed(memberships["teaching"]),
+        enrolled=listed(memberships["enrolled"]),
+        upcoming=deadlines[: conf["MAX_DEADLINES"]],
+    )
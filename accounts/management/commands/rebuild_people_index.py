@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the people search index from every user account"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        total = rebuild(batch_size=opts["batch_size"])
+        self.stdout.write(f"Indexed {total} user(s)")
@@ -8,6 +8,34 @@ class Status(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["user", "created_at", "id"])]
 
     def __str__(self):
         return f"{self.user.username}: {self.text[:30]}"
+
+
+class PersonSearchTerm(models.Model):
+    # One row per (normalized prefix, user): the people search index.
+    # rank 0 = the term is a whole username token, 1 = a whole name/email
+    # token, 2 = a shorter prefix. ``private`` terms come only from the
+    # email address and are matched for teachers, never for the public API.
+    # ``teacher`` and ``student`` mirror the groups; someone in both is
+    # listed under both.
+    term = models.CharField(max_length=20)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="search_terms")
+    teacher = models.BooleanField(default=False)
+    student = models.BooleanField(default=False)
+    rank = models.PositiveSmallIntegerField()
+    private = models.BooleanField(default=False)
+    sort_name = models.CharField(max_length=150)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["term", "user"], name="unique_person_search_term")]
+        indexes = [
+            models.Index(fields=["term", "rank", "sort_name"]),
+            models.Index(fields=["teacher", "term", "rank", "sort_name"]),
+            models.Index(fields=["student", "term", "rank", "sort_name"]),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.user_id}"
@@ -0,0 +1,112 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from Elearning.prefix_index import normalize
+from .models import PersonSearchTerm
+
+TEACHER = "TEACHER"
+STUDENT = "STUDENT"
+ROLE_GROUPS = {TEACHER: "Teacher", STUDENT: "Student"}
+ROLE_FIELDS = {TEACHER: "teacher", STUDENT: "student"}
+MAX_TERM = PersonSearchTerm._meta.get_field("term").max_length
+PAGE_SIZE = 25
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokens(text):
+    return _WORD.findall(normalize(text))
+
+
+def roles_for(group_names):
+    # the PersonSearchTerm role flags for a user in ``group_names``
+    return {ROLE_FIELDS[role]: group in group_names for role, group in ROLE_GROUPS.items()}
+
+
+def sort_name(user):
+    return normalize(f"{user.first_name} {user.last_name}".strip() or user.username)[:150]
+
+
+def _prefix_ranks(sources):
+    ranks = {}
+    for exact, words in sources:
+        for word in words:
+            word = word[:MAX_TERM]
+            for end in range(1, len(word) + 1):
+                rank = exact if end == len(word) else 2
+                prefix = word[:end]
+                ranks[prefix] = min(rank, ranks.get(prefix, rank))
+    return ranks
+
+
+def index_terms(user, roles):
+    # Every token of the address, domain included, so a full address or a
+    # domain still finds people; those terms are private unless the same
+    # prefix also comes from the username or name.
+    public = _prefix_ranks([(0, tokens(user.username)), (1, tokens(f"{user.first_name} {user.last_name}"))])
+    private = _prefix_ranks([(1, tokens(user.email or ""))])
+    name = sort_name(user)
+    return [
+        PersonSearchTerm(term=term, user_id=user.pk, rank=rank, sort_name=name, **roles)
+        for term, rank in public.items()
+    ] + [
+        PersonSearchTerm(term=term, user_id=user.pk, rank=rank, sort_name=name, private=True, **roles)
+        for term, rank in private.items()
+        if term not in public
+    ]
+
+
+def reindex_user(user, roles=None):
+    if roles is None:
+        roles = roles_for(set(user.groups.values_list("name", flat=True)))
+    with transaction.atomic():
+        PersonSearchTerm.objects.filter(user_id=user.pk).delete()
+        PersonSearchTerm.objects.bulk_create(index_terms(user, roles))
+
+
+def update_role(user_id):
+    names = set(User.groups.through.objects.filter(user_id=user_id).values_list("group__name", flat=True))
+    PersonSearchTerm.objects.filter(user_id=user_id).update(**roles_for(names))
+
+
+def rebuild(batch_size=1000):
+    PersonSearchTerm.objects.all().delete()
+    users = User.objects.order_by("pk").prefetch_related("groups")
+    total = 0
+    last = 0
+    while True:
+        chunk = list(users.filter(pk__gt=last)[:batch_size])
+        if not chunk:
+            return total
+        rows = []
+        for user in chunk:
+            rows.extend(index_terms(user, roles_for({g.name for g in user.groups.all()})))
+        PersonSearchTerm.objects.bulk_create(rows, batch_size=5000)
+        total += len(chunk)
+        last = chunk[-1].pk
+
+
+def search_people(query, role=None, include_private=False):
+    # Index entries of the users matching every word of ``query`` as a
+    # prefix, best match first. Each word is an equality lookup on the
+    # indexed ``term``, so cost follows the result size, not the user count.
+    # Email-derived terms only match with ``include_private``.
+    words = sorted({word[:MAX_TERM] for word in tokens(query)}, key=len, reverse=True)
+    if not words:
+        return PersonSearchTerm.objects.none()
+    terms = PersonSearchTerm.objects.all() if include_private else PersonSearchTerm.objects.filter(private=False)
+    entries = terms.filter(term=words[0])
+    if role:
+        entries = entries.filter(**{ROLE_FIELDS[role]: True})
+    for word in words[1:]:
+        entries = entries.filter(user_id__in=terms.filter(term=word).values("user_id"))
+    return entries.select_related("user").order_by("rank", "sort_name", "user_id")
+
+
+def people_page(query, role=None, number=1, per_page=PAGE_SIZE):
+    # used by the teachers' people search, which may match on email
+    page = Paginator(search_people(query, role, include_private=True), per_page).get_page(number)
+    page.object_list = [entry.user for entry in page.object_list]
+    return page
@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .autocomplete import people_index, person_label
+from .models import PersonSearchTerm
+from .search import ROLE_FIELDS, ROLE_GROUPS, reindex_user, roles_for, update_role
+
+INDEXED_FIELDS = {"username", "first_name", "last_name", "email"}
+
+@receiver(post_save, sender=User)
+def index_person(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields and not INDEXED_FIELDS & set(update_fields)):
+        return
+    reindex_user(instance, roles=roles_for(()) if created else None)
+    pk, label = instance.pk, person_label(instance.username, instance.first_name, instance.last_name)
+    transaction.on_commit(lambda: people_index.add(pk, label))
+
+@receiver(post_delete, sender=User)
+def unindex_person(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: people_index.remove(pk))
+
+@receiver(m2m_changed, sender=User.groups.through)
+def index_person_role(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        update_role(instance.pk)
+        return
+    if pk_set is None:
+        fields = [ROLE_FIELDS[role] for role, group in ROLE_GROUPS.items() if group == instance.name]
+        pk_set = (
+            set(PersonSearchTerm.objects.filter(**{fields[0]: True}).values_list("user_id", flat=True).distinct())
+            if fields else ()
+        )
+    for user_id in pk_set:
+        update_role(user_id)
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from accounts.autocomplete import people_index
+from courses.autocomplete import course_index
+from courses.models import Course
+from Elearning.prefix_index import PrefixIndex, word_starts
+
+
+class PrefixIndexTests(SimpleTestCase):
+    def test_lookup_add_remove(self):
+        index = PrefixIndex(lambda: [(1, "Ann Lee"), (2, "Anna")], word_starts)
+        index.add(3, "Anx")
+        self.assertEqual(index.lookup("AN"), [(1, "Ann Lee"), (2, "Anna")])
+        self.assertEqual(len(index), 2)
+
+        index.add(3, "Ann Anx")
+        index.add(1, "Lee")
+        self.assertEqual(index.lookup("ann"), [(3, "Ann Anx"), (2, "Anna")])
+        self.assertEqual(index.lookup("l"), [(1, "Lee")])
+        index.remove(3)
+        index.remove(99)
+        self.assertEqual(index.lookup("an", limit=5), [(2, "Anna")])
+        self.assertEqual(index.lookup("   "), [])
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("jdoe", password="pw", first_name="Jane", last_name="Doé")
+        User.objects.create_user("dora")
+        cls.course = Course.objects.create(title="Linear Algebra 101", created_by=cls.user)
+
+    def setUp(self):
+        people_index.reset()
+        course_index.reset()
+
+    def test_endpoint_serves_people_and_courses_from_memory(self):
+        self.client.login(username="jdoe", password="pw")
+        self.client.get("/api/v1/autocomplete/", {"q": "x"})
+        with self.assertNumQueries(2):  # session and user lookups only
+            data = self.client.get("/api/v1/autocomplete/", {"q": "do"}).json()
+        self.assertEqual([p["username"] for p in data["people"]], ["jdoe", "dora"])
+        self.assertEqual(data["people"][0]["name"], "Jane Doé")
+        data = self.client.get("/api/v1/autocomplete/", {"q": "alg", "kind": "courses"}).json()
+        self.assertEqual(data, {"courses": [{"id": self.course.id, "title": "Linear Algebra 101"}]})
+        self.assertEqual(self.client.get("/api/v1/autocomplete/", {"q": "a", "kind": "x"}).status_code, 400)
+
+    def test_anonymous_rejected(self):
+        self.assertIn(self.client.get("/api/v1/autocomplete/", {"q": "do"}).status_code, (401, 403))
+
+    def test_index_follows_saves_and_deletes_after_commit(self):
+        self.assertEqual(len(people_index.lookup("")), 0)
+        people_index.ensure_built()
+        course_index.ensure_built()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.last_name = "Smith"
+            self.user.save()
+            Course.objects.create(title="Algebra II", created_by=self.user)
+            self.course.delete()
+        self.assertEqual([pk for pk, _ in people_index.lookup("smi")], [self.user.pk])
+        self.assertEqual(people_index.lookup("doe"), [])
+        self.assertEqual([title for _, title in course_index.lookup("algebra")], ["Algebra II"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(username="dora").delete()
+        self.assertEqual(people_index.lookup("dora"), [])
@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.dashboard import dashboard_for
+from courses.enrollment import bulk_enroll
+from courses.models import Assignment, Course, Enrollment
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user("teach", password="pw")
+        self.student = User.objects.create_user("stud", password="pw")
+        self.today = date.today()
+
+    def make_courses(self, n, prefix="Course"):
+        courses = [Course.objects.create(title=f"{prefix} {i:02d}", created_by=self.teacher) for i in range(n)]
+        bulk_enroll([c.pk for c in courses], [self.student.pk], notify=False)
+        for c in courses:
+            Assignment.objects.create(course=c, title=f"HW {c.title}", due_date=self.today + timedelta(days=3))
+        return courses
+
+    def queries(self, user):
+        with CaptureQueriesContext(connection) as ctx:
+            dashboard = dashboard_for(user.pk)
+        return len(ctx), dashboard
+
+    def test_query_count_does_not_depend_on_course_count(self):
+        self.make_courses(2)
+        cold_small, _ = self.queries(self.student)
+        cache.clear()
+        self.make_courses(12, prefix="More")
+        cold_large, dashboard = self.queries(self.student)
+        warm, _ = self.queries(self.student)
+        self.assertEqual(cold_small, cold_large)
+        self.assertEqual(warm, 1)
+        self.assertEqual(len(dashboard.enrolled), 14)
+        self.assertEqual(len(dashboard.upcoming), 10)
+        self.assertEqual(dashboard_for(self.teacher.pk).teaching, dashboard.enrolled)
+
+    def test_changes_show_up_without_explicit_invalidation(self):
+        algebra, biology = self.make_courses(2)
+        Assignment.objects.create(course=algebra, title="Past", due_date=self.today - timedelta(days=1))
+        Assignment.objects.create(course=algebra, title="Far", due_date=self.today + timedelta(days=60))
+        dashboard = dashboard_for(self.student.pk)
+        self.assertEqual([a["title"] for a in dashboard.upcoming], ["HW Course 00", "HW Course 01"])
+
+        algebra.title = "Algebra"
+        algebra.save()
+        Assignment.objects.create(course=biology, title="Quiz", due_date=self.today)
+        Enrollment.objects.filter(course=biology, user=self.student).delete()
+        chemistry = Course.objects.create(title="Chemistry", created_by=self.teacher)
+        Enrollment.objects.create(course=chemistry, user=self.student)
+
+        dashboard = dashboard_for(self.student.pk)
+        self.assertEqual([c["title"] for c in dashboard.enrolled], ["Algebra", "Chemistry"])
+        self.assertEqual([(a["course_title"], a["title"]) for a in dashboard.upcoming], [("Algebra", "HW Course 00")])
+        self.assertEqual([a["title"] for a in dashboard_for(self.teacher.pk).upcoming], ["Quiz", "HW Course 00", "HW Course 01"])
+
+        chemistry.delete()
+        self.assertEqual([c["title"] for c in dashboard_for(self.student.pk).enrolled], ["Algebra"])
+
+    def test_pages_render_from_dashboard(self):
+        self.make_courses(3)
+        self.client.login(username="stud", password="pw")
+        self.client.get(reverse("home"))
+        with CaptureQueriesContext(connection) as small:
+            resp = self.client.get(reverse("home"))
+        self.assertContains(resp, "Course 02")
+        self.assertContains(resp, "HW Course 01")
+        self.make_courses(5, prefix="More")
+        self.client.get(reverse("home"))
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(reverse("home"))
+        self.assertEqual(len(small), len(large))
+
+        resp = self.client.get(reverse("user_home", args=["teach"]))
+        self.assertContains(resp, "<strong>Teaching:</strong> 8", html=False)
@@ -0,0 +1,94 @@
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from accounts.models import PersonSearchTerm
+from accounts.search import STUDENT, TEACHER, people_page, search_people
+
+
+def usernames(entries):
+    return [entry.user.username for entry in entries]
+
+
+class PeopleIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teachers = Group.objects.create(name="Teacher")
+        cls.students = Group.objects.create(name="Student")
+        cls.ann = User.objects.create_user("ann", password="pw", first_name="Zoë", last_name="Annable")
+        cls.annie = User.objects.create_user("annie", first_name="Annie", last_name="Smith", email="a.smith@ex.com")
+        cls.bob = User.objects.create_user("bob", first_name="Bob", last_name="Anderson")
+        cls.ann.groups.add(cls.teachers)
+        cls.students.user_set.add(cls.annie, cls.bob)
+
+    def test_index_follows_saves_and_group_changes(self):
+        roles = PersonSearchTerm.objects.filter(user=self.ann).values_list("teacher", "student")
+        self.assertEqual(set(roles), {(True, False)})
+        self.bob.last_name = "Brown"
+        self.bob.save()
+        self.assertNotIn("bob", usernames(search_people("anderson")))
+        self.assertEqual(usernames(search_people("brown")), ["bob"])
+
+        self.students.user_set.clear()
+        self.assertEqual(usernames(search_people("smith", STUDENT)), [])
+        self.bob.groups.add(self.teachers)
+        self.assertEqual(usernames(search_people("bob", TEACHER)), ["bob"])
+
+        with self.assertNumQueries(1):
+            self.bob.save(update_fields=["last_login"])
+
+    def test_ranking_prefixes_and_normalization(self):
+        self.assertEqual(usernames(search_people("ann")), ["ann", "annie"])
+        self.assertEqual(usernames(search_people("an")), ["annie", "bob", "ann"])
+        self.assertEqual(usernames(search_people("ZOE")), ["ann"])
+        self.assertEqual(usernames(search_people("annie sm")), ["annie"])
+        self.assertEqual(usernames(search_people("a.smith")), ["annie"])
+        self.assertEqual(usernames(search_people("ann", TEACHER)), ["ann"])
+        self.assertEqual(list(search_people("  ,, ")), [])
+
+    def test_query_cost_does_not_grow_with_users(self):
+        with self.assertNumQueries(2):
+            page = people_page("an", per_page=2)
+        self.assertEqual(page.paginator.count, 3)
+        User.objects.bulk_create(User(username=f"x{i}") for i in range(50))
+        call_command("rebuild_people_index", stdout=open("/dev/null", "w"))
+        with self.assertNumQueries(2):
+            self.assertEqual(len(people_page("an", per_page=2)), 2)
+        self.assertEqual(len(search_people("x")), 50)
+
+    def test_views_use_the_index(self):
+        self.client.login(username="ann", password="pw")
+        resp = self.client.get(reverse("people_search"), {"q": "an"})
+        self.assertEqual(list(resp.context["teachers"]), [self.ann])
+        self.assertEqual(list(resp.context["students"]), [self.annie, self.bob])
+
+        data = self.client.get("/api/v1/users/", {"q": "an", "role": "student"}).json()
+        self.assertEqual([u["username"] for u in data["results"]], ["annie", "bob"])
+        data = self.client.get("/api/v1/users/", {"role": "teacher"}).json()
+        self.assertEqual([u["username"] for u in data["results"]], ["ann"])
+
+    def test_members_of_both_groups_are_listed_as_both(self):
+        self.teachers.user_set.add(self.bob)
+        self.client.login(username="ann", password="pw")
+        resp = self.client.get(reverse("people_search"), {"q": "an"})
+        self.assertEqual(list(resp.context["teachers"]), [self.bob, self.ann])
+        self.assertEqual(list(resp.context["students"]), [self.annie, self.bob])
+        self.assertEqual(usernames(search_people("bob")), ["bob"])
+
+        self.students.user_set.remove(self.bob)
+        self.assertEqual(usernames(search_people("bob", STUDENT)), [])
+        self.assertEqual(usernames(search_people("bob", TEACHER)), ["bob"])
+
+    def test_email_terms_only_match_for_teachers(self):
+        quiet = User.objects.create_user("quiet", email="secret.handle@example.com")
+        quiet.groups.add(self.students)
+        self.assertEqual(usernames(search_people("secret")), [])
+        for q in ("secret", "example.com"):
+            self.assertEqual(self.client.get("/api/v1/users/", {"q": q}).json()["results"], [])
+
+        self.client.login(username="ann", password="pw")
+        for q in ("secret", "secret.handle@example.com", "Secret.Handle@Example.COM", "example.com"):
+            resp = self.client.get(reverse("people_search"), {"q": q})
+            self.assertEqual(list(resp.context["students"]), [quiet], q)
+        resp = self.client.get(reverse("people_search"), {"q": "other.handle@example.com"})
+        self.assertEqual(list(resp.context["students"]), [])
@@ -1,19 +1,20 @@
-from datetime import date, timedelta
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import Group, User
-from django.db.models import Q
 from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.views.generic import CreateView
+from .dashboard import dashboard_for
 from .forms import StatusForm
 from .models import Status
-from courses.models import Course, Enrollment, Assignment
+from .search import STUDENT, TEACHER, people_page
+from courses.access import CourseAccess
 
 
-def is_teacher(user):
-    return user.is_authenticated and user.groups.filter(name="Teacher").exists()
+def home(request):
+    dashboard = dashboard_for(request.user.pk) if request.user.is_authenticated else None
+    return render(request, "home.html", {"dashboard": dashboard})
 
 
 @login_required
@@ -25,35 +26,6 @@ def me_redirect(request):
 def user_home(request, username):
     profile_user = get_object_or_404(User, username=username)
 
-    teaches = (
-        Course.objects.filter(
-            Q(created_by=profile_user) |
-            Q(enrollments__user=profile_user, enrollments__role="TEACHER")
-        )
-        .distinct()
-        .order_by("title")
-    )
-
-    registered = (
-        Course.objects.filter(
-            enrollments__user=profile_user, enrollments__role="STUDENT"
-        )
-        .distinct()
-        .order_by("title")
-    )
-
-    today = date.today()
-    soon = today + timedelta(days=30)
-    upcoming = (
-        Assignment.objects.filter(
-            Q(course__in=teaches) | Q(course__in=registered),
-            due_date__gte=today,
-            due_date__lte=soon,
-        )
-        .select_related("course")
-        .order_by("due_date")[:10]
-    )
-
     statuses = (
         Status.objects.filter(user=profile_user)
         .only("id", "text", "created_at")
@@ -77,9 +49,7 @@ def user_home(request, username):
         "accounts/user_home.html",
         {
             "profile_user": profile_user,
-            "teaches": teaches,
-            "registered": registered,
-            "upcoming": upcoming,
+            "dashboard": dashboard_for(profile_user.pk),
             "statuses": statuses,
             "form": form,
         },
@@ -88,28 +58,14 @@ def user_home(request, username):
 
 @login_required
 def people_search(request):
-    if not is_teacher(request.user):
+    if not CourseAccess.for_request(request).in_group("Teacher"):
         return HttpResponseForbidden()
 
     q = request.GET.get("q", "").strip()
     teachers = students = []
     if q:
-        name_q = (
-            Q(first_name__icontains=q)
-            | Q(last_name__icontains=q)
-            | Q(username__icontains=q)
-            | Q(email__icontains=q)
-        )
-        teachers = (
-            User.objects.filter(name_q, groups__name="Teacher")
-            .order_by("first_name", "last_name", "username")
-            .distinct()
-        )
-        students = (
-            User.objects.filter(name_q, groups__name="Student")
-            .order_by("first_name", "last_name", "username")
-            .distinct()
-        )
+        teachers = people_page(q, TEACHER, request.GET.get("teachers_page"))
+        students = people_page(q, STUDENT, request.GET.get("students_page"))
 
     return render(request, "people_search.html", {
         "query": q,
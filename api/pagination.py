@@ -0,0 +1,70 @@
+from django.core.exceptions import ValidationError
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from Elearning.keyset import after, cursor_values, decode_cursor, encode_cursor
+
+
+class KeysetPagination(BasePagination):
+    # Seek pagination over the queryset's own order_by, whose last field must
+    # be unique. The cursor holds the last row's sort key, so every page is a
+    # single range scan however deep the client has scrolled. Totals cost a
+    # COUNT(*) and are only included when asked for with ?count=true.
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = list(queryset.query.order_by) or ["pk"]
+        queryset = queryset.order_by(*ordering)
+        self.count = queryset.count() if self.wants_count(request) else None
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            try:
+                queryset = queryset.filter(after(ordering, decode_cursor(token, len(ordering))))
+            except (ValueError, TypeError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        size = self.get_page_size(request)
+        rows = list(queryset[: size + 1])
+        page = rows[:size]
+        self.next_cursor = encode_cursor(cursor_values(page[-1], ordering)) if len(rows) > size else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, "").lower() in ("1", "true", "yes")
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        body = {"next": self.get_next_link()}
+        if self.count is not None:
+            body["count"] = self.count
+        body["results"] = data
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            "next": {"type": "string", "nullable": True, "format": "uri"},
+            "count": {"type": "integer"},
+            "results": schema,
+        }
+        return {"type": "object", "required": ["next", "results"], "properties": properties}
@@ -1,10 +1,24 @@
 from django.contrib.auth.models import User
+from django.db import models
 from rest_framework import serializers
 from accounts.models import Status
+from courses.access import groups_for, user_groups
 from courses.models import Course, Enrollment
 
 def is_teacher(user: User) -> bool:
-    return user.groups.filter(name="Teacher").exists()
+    return "Teacher" in user_groups(user.pk)
+
+def preload_groups(context, user_ids):
+    # group names for every user about to be serialized, in one query;
+    # UserPublicSerializer reads them back from the shared context
+    known = context.setdefault("user_groups", {})
+    known.update(groups_for([pk for pk in user_ids if pk not in known]))
+
+class UserListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, models.Manager) else data)
+        preload_groups(self.context, [user.pk for user in users])
+        return super().to_representation(users)
 
 class UserPublicSerializer(serializers.ModelSerializer):
     is_teacher = serializers.SerializerMethodField()
@@ -12,9 +26,11 @@ class UserPublicSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "first_name", "last_name", "date_joined", "is_teacher"]
+        list_serializer_class = UserListSerializer
 
     def get_is_teacher(self, obj):
-        return is_teacher(obj)
+        groups = self.context.get("user_groups", {}).get(obj.pk)
+        return "Teacher" in groups if groups is not None else is_teacher(obj)
 
 class UserPrivateSerializer(UserPublicSerializer):
     class Meta(UserPublicSerializer.Meta):
@@ -37,14 +53,25 @@ class SignupSerializer(serializers.ModelSerializer):
         user.groups.add(grp)
         return user
 
+class StatusListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        statuses = list(data.all() if isinstance(data, models.Manager) else data)
+        preload_groups(self.context, [status.user_id for status in statuses])
+        return super().to_representation(statuses)
+
 class StatusSerializer(serializers.ModelSerializer):
     user = UserPublicSerializer(read_only=True)
 
     class Meta:
         model = Status
         fields = ["id", "user", "text", "created_at"]
+        list_serializer_class = StatusListSerializer
 
 class CourseMiniSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ["id", "title", "start_date", "end_date"]
+
+class BulkEnrollSerializer(serializers.Serializer):
+    courses = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500)
+    users = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=5000)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
-from .views import UserViewSet
+from .views import UserViewSet, autocomplete, course_catalog, enroll_bulk
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 router = SimpleRouter()
@@ -8,6 +8,9 @@ router.register("users", UserViewSet, basename="user")
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("autocomplete/", autocomplete, name="autocomplete"),
+    path("courses/", course_catalog, name="course_catalog"),
+    path("enrollments/bulk/", enroll_bulk, name="enroll_bulk"),
     path("auth/jwt/create", TokenObtainPairView.as_view(), name="jwt_create"),
     path("auth/jwt/refresh", TokenRefreshView.as_view(), name="jwt_refresh"),
 ]
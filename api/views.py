@@ -1,21 +1,37 @@
 from django.contrib.auth.models import User
 from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .pagination import KeysetPagination
 from .serializers import (
     UserPublicSerializer, UserPrivateSerializer, SignupSerializer,
-    StatusSerializer, CourseMiniSerializer
+    StatusSerializer, CourseMiniSerializer, BulkEnrollSerializer
 )
+from accounts.autocomplete import suggest_people
 from accounts.models import Status
+from accounts.search import ROLE_GROUPS, search_people
+from courses import versions
+from courses.access import CourseAccess
+from courses.autocomplete import suggest_courses
+from courses.catalog import catalog_page
+from courses.forms import CatalogFilterForm
+from courses.enrollment import bulk_enroll
 from courses.models import Course, Enrollment
 
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
 class IsSelfOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return request.user.is_staff or obj == request.user
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all().order_by("id")
+    pagination_class = KeysetPagination
 
     def get_permissions(self):
         if self.action in ["create"]:  
@@ -38,18 +54,17 @@ class UserViewSet(viewsets.ModelViewSet):
         return UserPublicSerializer
 
     def list(self, request, *args, **kwargs):
-        qs = self.queryset
         q = request.query_params.get("q")
         role = (request.query_params.get("role") or "").upper()
+        role = role if role in ROLE_GROUPS else None
         if q:
-            qs = qs.filter(
-                Q(username__icontains=q) |
-                Q(first_name__icontains=q) |
-                Q(last_name__icontains=q)
-            )
-        if role in {"TEACHER", "STUDENT"}:
-            qs = qs.filter(groups__name=role).distinct()
-        page = self.paginate_queryset(qs)
+            page = self.paginate_queryset(search_people(q, role))
+            page = [entry.user for entry in page]
+        else:
+            qs = self.queryset
+            if role:
+                qs = qs.filter(groups__name=ROLE_GROUPS[role]).distinct()
+            page = self.paginate_queryset(qs)
         ser = UserPublicSerializer(page, many=True, context={"request": request})
         return self.get_paginated_response(ser.data)
 
@@ -73,14 +88,26 @@ class UserViewSet(viewsets.ModelViewSet):
             ser = StatusSerializer(data=request.data)
             ser.is_valid(raise_exception=True)
             Status.objects.create(user=user, text=ser.validated_data["text"])
-        qs = Status.objects.filter(user=user).order_by("-created_at")
+        qs = Status.objects.filter(user=user).select_related("user").order_by("-created_at", "-id")
         page = self.paginate_queryset(qs)
         ser = StatusSerializer(page, many=True, context={"request": request})
         return self.get_paginated_response(ser.data)
 
     @action(detail=True, methods=["get"])
     def courses(self, request, pk=None):
+        # answered from the version counters of the user and their courses
+        # alone when the client is current
         user = self.get_object()
+        keys = versions.lookup_courses(
+            request, [versions.user_key(user.pk)], Course.objects.filter(Q(created_by=user) | Q(enrollments__user=user))
+        )
+        etag = quote_etag(versions.etag(request, keys, request.get_full_path()))
+        modified = versions.last_modified(request, keys)
+        modified = int(modified.timestamp()) if modified else None
+        not_modified = get_conditional_response(request, etag=etag, last_modified=modified)
+        if not_modified is not None:
+            return not_modified
+
         role = (request.query_params.get("role") or "").upper()
         if role == "TEACHER":
             qs = Course.objects.filter(
@@ -90,6 +117,70 @@ class UserViewSet(viewsets.ModelViewSet):
             qs = Course.objects.filter(enrollments__user=user, enrollments__role="STUDENT").distinct()
         else:
             qs = Course.objects.filter(Q(created_by=user) | Q(enrollments__user=user)).distinct()
-        page = self.paginate_queryset(qs.order_by("title"))
+        page = self.paginate_queryset(qs.order_by("title", "id"))
         ser = CourseMiniSerializer(page, many=True, context={"request": request})
-        return self.get_paginated_response(ser.data)
+        response = self.get_paginated_response(ser.data)
+        response["ETag"] = etag
+        if modified:
+            response["Last-Modified"] = http_date(modified)
+        return response
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def autocomplete(request):
+    q = request.query_params.get("q", "")
+    kind = request.query_params.get("kind")
+    try:
+        limit = min(max(int(request.query_params.get("limit", AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+    data = {}
+    if kind in (None, "", "people"):
+        data["people"] = suggest_people(q, limit)
+    if kind in (None, "", "courses"):
+        data["courses"] = suggest_courses(q, limit)
+    if not data:
+        return Response({"detail": "kind must be people or courses."}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(data)
+
+
+@api_view(["GET"])
+@permission_classes([permissions.AllowAny])
+def course_catalog(request):
+    form = CatalogFilterForm(request.query_params)
+    if not form.is_valid():
+        return Response(form.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        size = int(request.query_params.get("page_size", 0)) or None
+        page = catalog_page(form.cleaned_data, request.query_params.get("cursor"), size)
+    except ValueError:
+        return Response({"detail": "Invalid cursor or page_size."}, status=status.HTTP_400_BAD_REQUEST)
+    next_link = None
+    if page["next"]:
+        next_link = replace_query_param(request.build_absolute_uri(), "cursor", page["next"])
+    return Response({"next": next_link, "results": page["results"]})
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def enroll_bulk(request):
+    ser = BulkEnrollSerializer(data=request.data)
+    ser.is_valid(raise_exception=True)
+    course_ids = ser.validated_data["courses"]
+    user_ids = ser.validated_data.get("users") or [request.user.id]
+    access = CourseAccess.for_request(request)
+    if set(user_ids) == {request.user.id}:
+        # the same rule as the enrollment page's StudentRequiredMixin
+        if not access.in_group("Student"):
+            return Response({"detail": "Only students can enroll themselves."}, status=403)
+    elif not all(access.is_teacher(course_id) for course_id in course_ids):
+        return Response({"detail": "Only the course teacher can enroll other users."}, status=403)
+    results = bulk_enroll(course_ids, user_ids)
+    return Response({
+        "results": [
+            {"course": course_id, "user": user_id, "result": results[course_id, user_id]}
+            for course_id in dict.fromkeys(course_ids)
+            for user_id in dict.fromkeys(user_ids)
+        ]
+    })
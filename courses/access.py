@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Q, Subquery
+
+from .models import Course, Enrollment
+
+TEACHER = "TEACHER"
+STUDENT = "STUDENT"
+
+_MISSING = object()
+
+
+class _TTLCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_conf = getattr(settings, "COURSE_ACCESS_CACHE", {})
+_roles = _TTLCache(_conf.get("MAX_ENTRIES", 4096), _conf.get("TTL", 60))
+_groups = _TTLCache(_conf.get("MAX_ENTRIES", 4096), _conf.get("TTL", 60))
+
+
+def resolve_role(user_id, course_id):
+    # (course_exists, role) where role is TEACHER, STUDENT or None; one query on a miss
+    key = (user_id, course_id)
+    cached = _roles.get(key)
+    if cached is not _MISSING:
+        return cached
+
+    enrolled_role = Enrollment.objects.filter(
+        course_id=OuterRef("pk"), user_id=user_id
+    ).values("role")[:1]
+    row = (
+        Course.objects.filter(pk=course_id)
+        .annotate(enrolled_role=Subquery(enrolled_role))
+        .values_list("created_by_id", "enrolled_role")
+        .first()
+    )
+    if row is None:
+        result = (False, None)
+    elif row[0] == user_id:
+        result = (True, TEACHER)
+    else:
+        result = (True, row[1])
+    _roles.set(key, result)
+    return result
+
+
+def member_course_ids(user_id):
+    # ids of every course the user teaches or is enrolled in, as a subquery
+    return Course.objects.filter(
+        Q(created_by_id=user_id) | Q(pk__in=Enrollment.objects.filter(user_id=user_id).values("course_id"))
+    ).values("pk")
+
+
+def user_groups(user_id):
+    cached = _groups.get(user_id)
+    if cached is not _MISSING:
+        return cached
+    User = get_user_model()
+    names = frozenset(
+        User.groups.through.objects.filter(user_id=user_id).values_list("group__name", flat=True)
+    )
+    _groups.set(user_id, names)
+    return names
+
+
+def groups_for(user_ids):
+    # user_groups for many users at once: one query for all the uncached ids
+    result, missing = {}, []
+    for user_id in dict.fromkeys(user_ids):
+        cached = _groups.get(user_id)
+        if cached is _MISSING:
+            missing.append(user_id)
+        else:
+            result[user_id] = cached
+    if missing:
+        User = get_user_model()
+        names = {user_id: set() for user_id in missing}
+        rows = User.groups.through.objects.filter(user_id__in=missing).values_list("user_id", "group__name")
+        for user_id, name in rows:
+            names[user_id].add(name)
+        for user_id, group_names in names.items():
+            result[user_id] = frozenset(group_names)
+            _groups.set(user_id, result[user_id])
+    return result
+
+
+def invalidate(user_id=None, course_id=None):
+    if user_id is not None and course_id is not None:
+        _roles.discard((user_id, course_id))
+    elif course_id is not None:
+        _roles.discard_where(lambda key: key[1] == course_id)
+    elif user_id is not None:
+        _roles.discard_where(lambda key: key[0] == user_id)
+    else:
+        _roles.clear()
+
+
+def invalidate_groups(user_id=None):
+    if user_id is None:
+        _groups.clear()
+    else:
+        _groups.discard(user_id)
+
+
+class CourseAccess:
+    def __init__(self, user):
+        self.user = user
+        self._memo = {}  # course id -> role
+        self._groups = None
+
+    @classmethod
+    def for_request(cls, request):
+        access = getattr(request, "_course_access", None)
+        if access is None or access.user is not request.user:
+            access = cls(request.user)
+            request._course_access = access
+        return access
+
+    def role(self, course):
+        if not self.user.is_authenticated:
+            return None
+        course_id = getattr(course, "pk", course)
+        if course_id not in self._memo:
+            if isinstance(course, Course) and course.created_by_id == self.user.id:
+                self._memo[course_id] = TEACHER
+            else:
+                self._memo[course_id] = resolve_role(self.user.id, course_id)[1]
+        return self._memo[course_id]
+
+    def is_teacher(self, course):
+        return self.role(course) == TEACHER
+
+    def is_student(self, course):
+        return self.role(course) == STUDENT
+
+    def is_member(self, course):
+        return self.role(course) is not None
+
+    def in_group(self, name):
+        if not self.user.is_authenticated:
+            return False
+        if self._groups is None:
+            self._groups = user_groups(self.user.id)
+        return name in self._groups
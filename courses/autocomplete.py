@@ -0,0 +1,13 @@
+from Elearning.prefix_index import PrefixIndex, word_starts
+from .models import Course
+
+
+def _load():
+    return Course.objects.values_list("pk", "title").order_by().iterator(chunk_size=5000)
+
+
+course_index = PrefixIndex(_load, word_starts)
+
+
+def suggest_courses(prefix, limit=10):
+    return [{"id": pk, "title": title} for pk, title in course_index.lookup(prefix, limit)]
@@ -0,0 +1,90 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import ExpressionWrapper, F, FloatField, Q
+
+from Elearning.keyset import after, cursor_values, decode_cursor, encode_cursor
+from . import versions
+from .models import Course, CourseRatingSummary
+
+ORDERING = ("-created_at", "-id")
+
+
+def catalog_settings():
+    conf = {"PAGE_SIZE": 20, "MAX_PAGE_SIZE": 100, "TIMEOUT": 300}
+    conf.update(getattr(settings, "CATALOG", {}))
+    return conf
+
+
+def catalog_queryset(filters):
+    # ``filters`` as cleaned by CatalogFilterForm; empty values are ignored
+    qs = Course.objects.select_related("created_by", "rating_summary").only(
+        "id", "title", "start_date", "end_date", "capacity", "student_count", "created_at",
+        "created_by__username", *(f"rating_summary__{f.name}" for f in CourseRatingSummary._meta.concrete_fields),
+    )
+    if filters.get("start_from"):
+        qs = qs.filter(start_date__gte=filters["start_from"])
+    if filters.get("start_to"):
+        qs = qs.filter(start_date__lte=filters["start_to"])
+    if filters.get("open_seats"):
+        qs = qs.filter(Q(capacity__isnull=True) | Q(student_count__lt=F("capacity")))
+    if filters.get("min_rating"):
+        needed = ExpressionWrapper(F("rating_summary__count") * float(filters["min_rating"]), output_field=FloatField())
+        qs = qs.filter(rating_summary__count__gt=0, rating_summary__total__gte=needed)
+    return qs.order_by(*ORDERING)
+
+
+def _row(course):
+    try:
+        summary = course.rating_summary
+    except CourseRatingSummary.DoesNotExist:
+        summary = CourseRatingSummary(course=course)
+    return {
+        "id": course.pk,
+        "title": course.title,
+        "start_date": course.start_date,
+        "end_date": course.end_date,
+        "teacher": course.created_by.username,
+        "capacity": course.capacity,
+        "seats_left": course.seats_left,
+        "rating": summary.average,
+        "rating_count": summary.count,
+        "created_at": course.created_at,
+    }
+
+
+def _cache_key(version, filters, cursor, size):
+    params = json.dumps(
+        [versions.tag(version), sorted((k, str(v)) for k, v in filters.items() if v), cursor, size]
+    )
+    return "catalog:" + hashlib.blake2b(params.encode(), digest_size=16).hexdigest()
+
+
+def catalog_page(filters, cursor=None, size=None):
+    # {"results": [...rows], "next": cursor or None}. Pages are cached per
+    # filter set and cursor under the catalog version, which every change to
+    # a course, its seats left or its ratings bumps, so a warm page is one
+    # lookup.
+    # Raises ValueError for a malformed cursor.
+    conf = catalog_settings()
+    size = min(max(size or conf["PAGE_SIZE"], 1), conf["MAX_PAGE_SIZE"])
+    values = decode_cursor(cursor, len(ORDERING)) if cursor else None
+    key = _cache_key(versions.fetch([versions.CATALOG])[versions.CATALOG], filters, cursor, size)
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    qs = catalog_queryset(filters)
+    if values is not None:
+        try:
+            qs = qs.filter(after(ORDERING, values))
+        except (TypeError, ValidationError) as exc:
+            raise ValueError("Invalid cursor") from exc
+    rows = list(qs[: size + 1])
+    next_cursor = encode_cursor(cursor_values(rows[size - 1], ORDERING)) if len(rows) > size else None
+    page = {"results": [_row(course) for course in rows[:size]], "next": next_cursor}
+    cache.set(key, page, conf["TIMEOUT"])
+    return page
@@ -0,0 +1,369 @@
+import random
+import time
+import uuid
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+
+from accounts import search as people_search
+from accounts.autocomplete import people_index
+from rtchat import search as chat_search
+from rtchat.models import ChatMessage
+from . import versions
+from .autocomplete import course_index
+from .enrollment import rebuild_counts
+from .models import Assignment, Course, CourseFeedback, CourseMaterial, CourseRatingSummary, Enrollment
+
+FIRST_NAMES = [
+    "Alex", "Sam", "Jo", "Kai", "Nia", "Zen", "Taylor", "Morgan", "Riley", "Jamie", "Avery", "Quinn",
+    "Rowan", "Casey", "Devon", "Emery", "Harper", "Jordan", "Logan", "Micah", "Noor", "Priya", "Ravi", "Sora",
+]
+LAST_NAMES = [
+    "Lim", "Ng", "Goh", "Wong", "Ong", "Chua", "Lee", "Chan", "Tan", "Smith", "Garcia", "Khan",
+    "Müller", "Rossi", "Silva", "Novak", "Kowalski", "Haddad", "Okafor", "Sato", "Nguyen", "Ibrahim",
+]
+SUBJECTS = [
+    "Algebra", "Biology", "World History", "Chemistry", "Physics", "Statistics", "Economics", "Philosophy",
+    "Literature", "Geography", "Computer Science", "Art History", "Music Theory", "Psychology", "Astronomy",
+]
+LEVELS = ["101", "102", "201", "Basics", "Foundations", "Advanced", "Seminar", "Workshop", "Lab"]
+COUNTS = ("users", "courses", "enrollments", "messages", "feedback", "materials", "assignments")
+
+
+@dataclass(frozen=True)
+class Spec:
+    # Row counts are totals; enrollments counts student enrollments only
+    # (each course also gets one for its teacher).
+    users: int = 1000
+    courses: int = 100
+    enrollments: int = 10000
+    messages: int = 25000
+    feedback: int = 2500
+    materials: int = 1000
+    assignments: int = 500
+    teachers: float = 0.02
+    skew: float = 1.1
+    days: int = 180
+    seed: int = 0
+    prefix: str = "gen"
+    password: str = "pass1234"
+    anchor: date = None
+    batch_size: int = 5000
+
+    def scaled(self, factor):
+        return replace(self, **{name: round(getattr(self, name) * factor) for name in COUNTS})
+
+    def validate(self):
+        for name in COUNTS:
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} must not be negative")
+        if self.courses and self.users < 2:
+            raise ValueError("courses need at least two users, a teacher and a student")
+        if not 0 < self.teachers < 1:
+            raise ValueError("teachers is the fraction of users who teach, between 0 and 1")
+        if self.skew < 0 or self.batch_size < 1 or self.days < 1:
+            raise ValueError("skew, batch size and days must be positive")
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def _allocate(total, weights, caps=None):
+    # Splits ``total`` over ``weights`` proportionally without exceeding
+    # ``caps``; whatever rounding or the caps leave over goes to the
+    # heaviest entries that still have room.
+    scale = total / (sum(weights) or 1)
+    counts = [int(w * scale) for w in weights]
+    if caps is not None:
+        counts = [min(n, cap) for n, cap in zip(counts, caps)]
+    left = total - sum(counts)
+    for i in sorted(range(len(weights)), key=weights.__getitem__, reverse=True):
+        if left <= 0:
+            break
+        extra = left if caps is None else min(left, caps[i] - counts[i])
+        counts[i] += extra
+        left -= extra
+    return counts
+
+
+@contextmanager
+def _bulk_load():
+    # Every batch is committed on its own, so on SQLite skip the fsync per
+    # commit for the duration of the load and restore the setting afterwards.
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        previous = cursor.fetchone()[0]
+        cursor.execute("PRAGMA synchronous = OFF")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA synchronous = {int(previous)}")
+
+
+class DataGenerator:
+    # Builds a synthetic dataset from a Spec in batches of Spec.batch_size
+    # rows, one transaction per batch. Each table draws from its own random stream seeded from
+    # Spec.seed, so the same spec always yields the same rows, and changing
+    # one count leaves the other tables as they were. Course popularity
+    # follows a Zipf curve (Spec.skew): a few huge courses, a long tail of
+    # small ones, and chat activity to match. Signal-maintained data (seat
+    # counts, rating summaries, search indexes) is rebuilt once at the end.
+
+    def __init__(self, spec, log=None):
+        spec.validate()
+        self.spec = spec
+        self.anchor = spec.anchor or date.today()
+        self.epoch = datetime.combine(self.anchor, datetime.min.time(), dt_timezone.utc)
+        self.log = log or (lambda message: None)
+        self.teacher_ids = array("q")
+        self.student_ids = array("q")
+        self.course_ids = array("q")
+        self.creators = array("q")
+        self.starts = []
+        self.weights = []
+        self.sizes = []
+        self.members = []
+
+    def _rng(self, table):
+        return random.Random(f"{self.spec.seed}:{table}")
+
+    def _insert(self, model, rows, pks=None):
+        total = 0
+        for chunk in _chunks(rows, self.spec.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, batch_size=self.spec.batch_size)
+            if pks is not None:
+                pks.extend(obj.pk for obj in chunk)
+            total += len(chunk)
+        return total
+
+    def _copy(self, model, columns, rows):
+        # bulk_create spends most of its time preparing values field by
+        # field; the large tables are written as ready-made tuples instead.
+        ops = connection.ops
+        fields = [model._meta.get_field(name) for name in columns]
+        prepare = [
+            i for i, f in enumerate(fields) if f.get_internal_type() in ("DateField", "DateTimeField", "UUIDField")
+        ]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            ops.quote_name(model._meta.db_table),
+            ", ".join(ops.quote_name(f.column) for f in fields),
+            ", ".join(["%s"] * len(fields)),
+        )
+        total = 0
+        for chunk in _chunks(rows, self.spec.batch_size):
+            if prepare:
+                chunk = [list(row) for row in chunk]
+                for row in chunk:
+                    for i in prepare:
+                        row[i] = fields[i].get_db_prep_value(row[i], connection, prepared=True)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, chunk)
+            total += len(chunk)
+        return total
+
+    def _moment(self, rng):
+        return self.epoch - timedelta(seconds=rng.randrange(self.spec.days * 86400))
+
+    def run(self):
+        if User.objects.filter(username=f"{self.spec.prefix}0").exists():
+            raise ValueError(f"Users prefixed {self.spec.prefix!r} already exist; pick another prefix")
+        created = {}
+        with _bulk_load():
+            for name in COUNTS:
+                started = time.perf_counter()
+                created[name] = getattr(self, f"_{name}")()
+                self.log(f"{name}: {created[name]} row(s) in {time.perf_counter() - started:.1f}s")
+            started = time.perf_counter()
+            self._rebuild_derived()
+            self.log(f"derived data rebuilt in {time.perf_counter() - started:.1f}s")
+        return created
+
+    def _users(self):
+        spec = self.spec
+        rng = self._rng("users")
+        password = make_password(spec.password)
+        teachers = max(round(spec.users * spec.teachers), 1) if spec.users else 0
+        teacher_group, _ = Group.objects.get_or_create(name="Teacher")
+        student_group, _ = Group.objects.get_or_create(name="Student")
+        add_course = Permission.objects.get(
+            codename="add_course", content_type=ContentType.objects.get_for_model(Course)
+        )
+        teacher_group.permissions.add(add_course)
+
+        def rows():
+            for i in range(spec.users):
+                username = f"{spec.prefix}{i}"
+                yield User(
+                    username=username,
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    email=f"{username}@example.com",
+                    password=password,
+                    date_joined=self._moment(rng),
+                )
+
+        pks = array("q")
+        total = self._insert(User, rows(), pks)
+        self.teacher_ids, self.student_ids = pks[:teachers], pks[teachers:]
+        self._copy(User.groups.through, ("user", "group"), (
+            (pk, teacher_group.pk if i < teachers else student_group.pk) for i, pk in enumerate(pks)
+        ))
+        return total
+
+    def _courses(self):
+        spec = self.spec
+        rng = self._rng("courses")
+        ranks = list(range(spec.courses))
+        rng.shuffle(ranks)
+        self.weights = [1 / (rank + 1) ** spec.skew for rank in ranks]
+        self.creators = array("q", (rng.choice(self.teacher_ids) for _ in range(spec.courses)))
+        self.starts = [self.anchor + timedelta(days=rng.randint(-120, 120)) for _ in range(spec.courses)]
+        # capacities need the enrollment counts, which come from their own stream
+        self.sizes = _allocate(spec.enrollments, self.weights, [len(self.student_ids)] * spec.courses)
+
+        def rows():
+            for i in range(spec.courses):
+                capped = rng.random() < 0.6
+                yield Course(
+                    title=f"{rng.choice(SUBJECTS)} {rng.choice(LEVELS)}",
+                    description=f"Course {i} for the generated dataset.",
+                    start_date=self.starts[i],
+                    end_date=self.starts[i] + timedelta(days=rng.randint(30, 120)),
+                    capacity=self.sizes[i] + rng.randint(0, 50) if capped else None,
+                    waitlist_enabled=capped and rng.random() < 0.3,
+                    created_by_id=self.creators[i],
+                )
+
+        return self._insert(Course, rows(), self.course_ids)
+
+    def _enrollments(self):
+        rng = self._rng("enrollments")
+        students = self.student_ids
+        self.members = [
+            array("q", (students[j] for j in rng.sample(range(len(students)), size))) for size in self.sizes
+        ]
+
+        def rows():
+            for course_id, creator, members in zip(self.course_ids, self.creators, self.members):
+                yield creator, course_id, "TEACHER", self.epoch - timedelta(days=self.spec.days)
+                for user_id in members:
+                    yield user_id, course_id, "STUDENT", self._moment(rng)
+
+        self._copy(Enrollment, ("user", "course", "role", "created_at"), rows())
+        return sum(self.sizes)
+
+    def _messages(self):
+        spec = self.spec
+        if not spec.messages or not self.course_ids:
+            return 0
+        rng = self._rng("messages")
+        words, word_weights = _vocabulary(rng)
+        activity = list(accumulate(w * (len(m) + 1) for w, m in zip(self.weights, self.members)))
+        start = self.epoch - timedelta(days=spec.days)
+        step = timedelta(days=spec.days) / spec.messages
+        courses = range(len(self.course_ids))
+
+        def rows():
+            for offset in range(0, spec.messages, spec.batch_size):
+                count = min(spec.batch_size, spec.messages - offset)
+                for n, c in enumerate(rng.choices(courses, cum_weights=activity, k=count), offset):
+                    members = self.members[c]
+                    author = self.creators[c] if not members or rng.random() < 0.1 else rng.choice(members)
+                    yield (
+                        self.course_ids[c],
+                        author,
+                        " ".join(rng.choices(words, cum_weights=word_weights, k=rng.randint(3, 16))),
+                        uuid.UUID(int=rng.getrandbits(128), version=4),
+                        start + n * step,
+                    )
+
+        # indexing five million rows one trigger at a time is most of the load
+        indexed = chat_search.uninstall()
+        try:
+            return self._copy(ChatMessage, ("course", "user", "text", "uid", "created_at"), rows())
+        finally:
+            if indexed:
+                chat_search.install()
+
+    def _feedback(self):
+        rng = self._rng("feedback")
+        words, word_weights = _vocabulary(rng)
+        counts = _allocate(self.spec.feedback, [len(m) for m in self.members], [len(m) for m in self.members])
+
+        def rows():
+            for course_id, members, count in zip(self.course_ids, self.members, counts):
+                mood = rng.uniform(2.5, 4.8)
+                for j in rng.sample(range(len(members)), count):
+                    comment = ""
+                    if rng.random() < 0.3:
+                        comment = " ".join(rng.choices(words, cum_weights=word_weights, k=rng.randint(4, 24)))
+                    rating = min(max(round(rng.gauss(mood, 1.0)), 1), 5)
+                    when = self._moment(rng)
+                    yield course_id, members[j], rating, comment, when, when
+
+        return self._copy(CourseFeedback, ("course", "user", "rating", "comment", "created_at", "updated_at"), rows())
+
+    def _materials(self):
+        rng = self._rng("materials")
+        counts = _allocate(self.spec.materials, self.weights)
+
+        def rows():
+            for course_id, creator, count in zip(self.course_ids, self.creators, counts):
+                for n in range(1, count + 1):
+                    yield (
+                        course_id,
+                        f"Week {n} notes",
+                        f"Reading list {rng.randint(1, 999)}",
+                        "",
+                        f"https://example.com/materials/{course_id}/{n}",
+                        creator,
+                        self._moment(rng),
+                    )
+
+        columns = ("course", "title", "description", "file", "url", "created_by", "created_at")
+        return self._copy(CourseMaterial, columns, rows())
+
+    def _assignments(self):
+        rng = self._rng("assignments")
+        counts = _allocate(self.spec.assignments, self.weights)
+
+        def rows():
+            for course_id, start, count in zip(self.course_ids, self.starts, counts):
+                due = start
+                for n in range(1, count + 1):
+                    due += timedelta(days=rng.randint(5, 14))
+                    yield course_id, f"Assignment {n}", due
+
+        return self._copy(Assignment, ("course", "title", "due_date"), rows())
+
+    def _rebuild_derived(self):
+        rebuild_counts()
+        CourseRatingSummary.rebuild()
+        people_search.rebuild(batch_size=self.spec.batch_size)
+        course_index.reset()
+        people_index.reset()
+        versions.bump(versions.CATALOG)
+
+
+def _vocabulary(rng, size=4000):
+    # Made-up words with Zipf frequencies, so a few are everywhere and most are rare.
+    syllables = ["ka", "lo", "mi", "ne", "ru", "ta", "sho", "vin", "der", "pal", "qui", "zen"]
+    words = sorted({"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(size)})
+    words += ["homework", "deadline", "midterm", "lecture", "question", "thanks"]
+    rng.shuffle(words)
+    return words, list(accumulate(1 / (rank + 1) for rank in range(len(words))))
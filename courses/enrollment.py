@@ -0,0 +1,212 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from django.utils import timezone
+
+from jobs.queue import enqueue
+from rtchat.events import broadcast
+from . import access, tasks, versions
+from .models import Course, CourseBlock, Enrollment, WaitlistEntry
+
+STUDENT = "STUDENT"
+
+ENROLLED = "enrolled"
+WAITLISTED = "waitlisted"
+FULL = "full"
+ALREADY_ENROLLED = "already_enrolled"
+BLOCKED = "blocked"
+NOT_FOUND = "not_found"
+
+
+class CourseFull(ValidationError):
+    # a ValidationError, so a form saving an enrollment reports it as one
+    def __init__(self, course_id):
+        super().__init__("This course is full.", code="full")
+        self.course_id = course_id
+
+
+def claim_seat(course_id):
+    # The capacity check and the increment are a single conditional UPDATE,
+    # so concurrent enrollments can never push student_count past capacity.
+    claimed = (
+        Course.objects.filter(pk=course_id)
+        .filter(Q(capacity__isnull=True) | Q(student_count__lt=F("capacity")))
+        .update(student_count=F("student_count") + 1)
+    )
+    if not claimed:
+        raise CourseFull(course_id)
+
+
+def release_seat(course_id):
+    Course.objects.filter(pk=course_id, student_count__gt=0).update(student_count=F("student_count") - 1)
+
+
+def promote_waitlist(course_id):
+    # Give a freed seat to the longest-waiting user, skipping entries that
+    # can no longer be enrolled.
+    for entry in WaitlistEntry.objects.filter(course_id=course_id).order_by("created_at", "id"):
+        if CourseBlock.objects.filter(course_id=course_id, user_id=entry.user_id).exists():
+            entry.delete()
+            continue
+        try:
+            with transaction.atomic():
+                Enrollment.objects.create(user_id=entry.user_id, course_id=course_id, role=STUDENT)
+                entry.delete()
+            return entry
+        except CourseFull:
+            return None
+        except IntegrityError:
+            entry.delete()
+    return None
+
+
+def rebuild_counts(course_ids=None):
+    courses = Course.objects.all() if course_ids is None else Course.objects.filter(pk__in=course_ids)
+    students = (
+        Enrollment.objects.filter(course_id=OuterRef("pk"), role=STUDENT)
+        .order_by()
+        .values("course_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    return courses.update(student_count=Coalesce(Subquery(students), Value(0)))
+
+
+def _claim_seats(courses, wanted):
+    # {course_id: seats granted}. Courses without a capacity are claimed with
+    # one UPDATE per distinct batch size; capped courses take as many of the
+    # requested seats as are free in a conditional UPDATE of their own.
+    granted = {}
+    unlimited = defaultdict(list)
+    for course_id, user_ids in wanted.items():
+        if courses[course_id].capacity is None:
+            unlimited[len(user_ids)].append(course_id)
+            granted[course_id] = len(user_ids)
+    for n, course_ids in unlimited.items():
+        Course.objects.filter(pk__in=course_ids).update(student_count=F("student_count") + n)
+    for course_id, user_ids in wanted.items():
+        if course_id in granted:
+            continue
+        n = len(user_ids)
+        while n > 0:
+            claimed = (
+                Course.objects.filter(pk=course_id, student_count__lte=F("capacity") - n)
+                .update(student_count=F("student_count") + n)
+            )
+            if claimed:
+                break
+            row = Course.objects.filter(pk=course_id).values_list("capacity", "student_count").first()
+            n = min(n - 1, max(row[0] - row[1], 0)) if row and row[0] is not None else 0
+        granted[course_id] = n
+    return granted
+
+
+def bulk_enroll(course_ids, user_ids, notify=True):
+    # Enroll every user in every course as students: blocks and existing
+    # enrollments are checked with one query each, seats are claimed per
+    # course, rows go in with bulk_create, and each course gets a single
+    # notification for all of its new students. Returns
+    # {(course_id, user_id): result}.
+    course_ids = list(dict.fromkeys(course_ids))
+    user_ids = list(dict.fromkeys(user_ids))
+    courses = Course.objects.only("id", "title", "capacity", "waitlist_enabled").in_bulk(course_ids)
+    users = set(get_user_model().objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+    blocked = set(
+        CourseBlock.objects.filter(course_id__in=courses, user_id__in=user_ids).values_list("course_id", "user_id")
+    )
+    existing = set(
+        Enrollment.objects.filter(course_id__in=courses, user_id__in=user_ids).values_list("course_id", "user_id")
+    )
+    results = {}
+    wanted = {}
+    for course_id in course_ids:
+        for user_id in user_ids:
+            key = (course_id, user_id)
+            if course_id not in courses or user_id not in users:
+                results[key] = NOT_FOUND
+            elif key in blocked:
+                results[key] = BLOCKED
+            elif key in existing:
+                results[key] = ALREADY_ENROLLED
+            else:
+                wanted.setdefault(course_id, []).append(user_id)
+    if not wanted:
+        return results
+
+    enrolled = {}
+    with transaction.atomic():
+        granted = _claim_seats(courses, wanted)
+        # A concurrent request may have enrolled some of these users since the
+        # check above. The seat claim has locked the courses, so a second look
+        # now is final; the seats claimed for them are handed back.
+        raced = set(
+            Enrollment.objects.filter(course_id__in=wanted, user_id__in=user_ids).values_list("course_id", "user_id")
+        )
+        rows = []
+        waiting = []
+        for course_id, pending in wanted.items():
+            late = [user_id for user_id in pending if (course_id, user_id) in raced]
+            results.update(((course_id, user_id), ALREADY_ENROLLED) for user_id in late)
+            pending = [user_id for user_id in pending if (course_id, user_id) not in raced]
+            seats = min(granted[course_id], len(pending))
+            if granted[course_id] > seats:
+                release = granted[course_id] - seats
+                Course.objects.filter(pk=course_id).update(student_count=F("student_count") - release)
+            seated, rest = pending[:seats], pending[seats:]
+            rows.extend(Enrollment(course_id=course_id, user_id=user_id, role=STUDENT) for user_id in seated)
+            results.update(((course_id, user_id), ENROLLED) for user_id in seated)
+            if seated:
+                enrolled[course_id] = seated
+            if courses[course_id].waitlist_enabled:
+                waiting.extend(WaitlistEntry(course_id=course_id, user_id=user_id) for user_id in rest)
+            outcome = WAITLISTED if courses[course_id].waitlist_enabled else FULL
+            results.update(((course_id, user_id), outcome) for user_id in rest)
+        Enrollment.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+        WaitlistEntry.objects.bulk_create(waiting, batch_size=500, ignore_conflicts=True)
+        if enrolled:
+            # the catalog only shows seats left for courses with a capacity
+            shown = any(courses[course_id].capacity is not None for course_id in enrolled)
+            versions.bump(
+                *([versions.CATALOG] if shown else []),
+                *(versions.course_key(course_id) for course_id in enrolled),
+                *(versions.user_key(user_id) for seated in enrolled.values() for user_id in seated),
+            )
+        if notify:
+            # the enrollments are committed by the time this runs, so a failed
+            # notification is logged rather than raised as if they were not
+            transaction.on_commit(lambda: _notify_enrolled(courses, enrolled), robust=True)
+
+    for course_id, seated in enrolled.items():
+        for user_id in seated:
+            access.invalidate(user_id=user_id, course_id=course_id)
+    return results
+
+
+def _notify_enrolled(courses, enrolled):
+    if not enrolled:
+        return
+    user_ids = {user_id for seated in enrolled.values() for user_id in seated}
+    names = dict(get_user_model().objects.filter(pk__in=user_ids).values_list("pk", "username"))
+    now = timezone.now().isoformat()
+    for course_id, seated in enrolled.items():
+        course = courses[course_id]
+        usernames = [names[pk] for pk in seated if pk in names]
+        if len(usernames) == 1:
+            text = f"{usernames[0]} enrolled in {course.title}"
+        else:
+            text = f"{len(usernames)} students enrolled in {course.title}"
+        broadcast(course_id, "notify.enrolled", {
+            "event": "enrolled",
+            "user": usernames[0] if len(usernames) == 1 else None,
+            "users": usernames[:100],
+            "count": len(usernames),
+            "course": course.title,
+            "text": text,
+            "created_at": now,
+        })
+        enqueue(tasks.email_teacher_enrollments, course_id=course_id, student_ids=seated)
@@ -0,0 +1,34 @@
+from django.db.models import F
+
+from .models import CourseFeedback, Enrollment
+
+ROSTER_FIELDS = ["username", "first_name", "last_name", "email", "enrolled_at"]
+FEEDBACK_FIELDS = ["username", "rating", "comment", "created_at", "updated_at"]
+
+
+def roster_rows(course):
+    return (
+        Enrollment.objects.filter(course=course, role="STUDENT")
+        .order_by("id")
+        .values(
+            username=F("user__username"),
+            first_name=F("user__first_name"),
+            last_name=F("user__last_name"),
+            email=F("user__email"),
+            enrolled_at=F("created_at"),
+        )
+    )
+
+
+def feedback_rows(course):
+    return (
+        CourseFeedback.objects.filter(course=course)
+        .order_by("id")
+        .values("rating", "comment", "created_at", "updated_at", username=F("user__username"))
+    )
+
+
+DATASETS = {
+    "roster": (ROSTER_FIELDS, roster_rows),
+    "feedback": (FEEDBACK_FIELDS, feedback_rows),
+}
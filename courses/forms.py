@@ -7,7 +7,7 @@ class DateInput(forms.DateInput):
 class CourseForm(forms.ModelForm):
     class Meta:
         model = Course
-        fields = ["title", "description", "start_date", "end_date", "capacity"]
+        fields = ["title", "description", "start_date", "end_date", "capacity", "waitlist_enabled"]
         widgets = {
             "start_date": DateInput(),
             "end_date": DateInput(),
@@ -34,6 +34,15 @@ class MultiEnrollForm(forms.Form):
                 pass
         self.fields["courses"].queryset = qs.order_by("title")
 
+class CatalogFilterForm(forms.Form):
+    start_from = forms.DateField(required=False, widget=DateInput(), label="Starts on or after")
+    start_to = forms.DateField(required=False, widget=DateInput(), label="Starts on or before")
+    open_seats = forms.BooleanField(required=False, label="Open seats only")
+    min_rating = forms.DecimalField(required=False, min_value=1, max_value=5, decimal_places=1, label="Minimum rating")
+
+class RosterImportForm(forms.Form):
+    file = forms.FileField(label="CSV file (one username or email per row)")
+
 class CourseFeedbackForm(forms.ModelForm):
     class Meta:
         model = CourseFeedback
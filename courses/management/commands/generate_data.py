@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.datagen import COUNTS, DataGenerator, Spec
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic dataset of users, courses, enrollments, chat and feedback"
+
+    def add_arguments(self, parser):
+        defaults = Spec()
+        for name in COUNTS:
+            parser.add_argument(f"--{name}", type=int, default=getattr(defaults, name))
+        parser.add_argument(
+            "--scale", type=float, default=1.0,
+            help="Multiply every row count, e.g. 200 for 200k users and 5M chat messages",
+        )
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--skew", type=float, default=defaults.skew, help="Zipf exponent of course sizes")
+        parser.add_argument("--teachers", type=float, default=defaults.teachers, help="Fraction of users who teach")
+        parser.add_argument("--days", type=int, default=defaults.days, help="Days of chat history")
+        parser.add_argument("--prefix", default=defaults.prefix, help="Username prefix of generated users")
+        parser.add_argument("--password", default=defaults.password)
+        parser.add_argument(
+            "--anchor", type=date.fromisoformat,
+            help="Date the data is laid out around (default today); fix it for byte-identical runs",
+        )
+        parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+
+    def handle(self, *args, **opts):
+        spec = Spec(
+            **{name: opts[name] for name in COUNTS},
+            teachers=opts["teachers"],
+            skew=opts["skew"],
+            days=opts["days"],
+            seed=opts["seed"],
+            prefix=opts["prefix"],
+            password=opts["password"],
+            anchor=opts["anchor"],
+            batch_size=opts["batch_size"],
+        ).scaled(opts["scale"])
+        try:
+            created = DataGenerator(spec, log=self.stdout.write).run()
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(", ".join(f"{n} {name}" for name, n in created.items()))
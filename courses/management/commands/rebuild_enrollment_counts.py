@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from courses.enrollment import rebuild_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute every course's student_count from its enrollments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_ids", nargs="*", type=int, help="Limit the rebuild to these courses")
+
+    def handle(self, *args, **opts):
+        total = rebuild_counts(opts["course_ids"] or None)
+        self.stdout.write(f"Recounted {total} course(s)")
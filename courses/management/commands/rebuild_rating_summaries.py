@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import CourseRatingSummary
+
+
+class Command(BaseCommand):
+    help = "Recompute every course rating summary from CourseFeedback"
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_ids", nargs="*", type=int, help="Limit the rebuild to these courses")
+
+    def handle(self, *args, **opts):
+        total = CourseRatingSummary.rebuild(opts["course_ids"] or None)
+        self.stdout.write(f"Rebuilt {total} rating summar{'y' if total == 1 else 'ies'}")
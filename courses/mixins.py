@@ -1,11 +1,12 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import HttpResponseForbidden
+from .access import CourseAccess
 
 class TeacherRequiredMixin(LoginRequiredMixin):
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
-        if not request.user.groups.filter(name="Teacher").exists():
+        if not CourseAccess.for_request(request).in_group("Teacher"):
             return HttpResponseForbidden()
         return super().dispatch(request, *args, **kwargs)
 
@@ -13,6 +14,6 @@ class StudentRequiredMixin(LoginRequiredMixin):
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
-        if not request.user.groups.filter(name="Student").exists():
+        if not CourseAccess.for_request(request).in_group("Student"):
             return HttpResponseForbidden()
         return super().dispatch(request, *args, **kwargs)
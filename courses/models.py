@@ -1,5 +1,8 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F
 from django.conf import settings
+from django.utils import timezone
 
 class Course(models.Model):
     title = models.CharField(max_length=200)
@@ -7,6 +10,8 @@ class Course(models.Model):
     start_date = models.DateField(null=True, blank=True)
     end_date = models.DateField(null=True, blank=True)
     capacity = models.PositiveIntegerField(null=True, blank=True)
+    waitlist_enabled = models.BooleanField(default=False)
+    student_count = models.PositiveIntegerField(default=0, editable=False)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name="courses_created"
     )
@@ -15,9 +20,28 @@ class Course(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["start_date"]),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # student_count is only ever changed by conditional UPDATEs; never
+        # write back a value that may be stale by now
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != "student_count"
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def seats_left(self):
+        return None if self.capacity is None else max(self.capacity - self.student_count, 0)
+
 class Enrollment(models.Model):
     ROLE_CHOICES = (
         ("STUDENT", "Student"),
@@ -34,6 +58,38 @@ class Enrollment(models.Model):
     def __str__(self):
         return f"{self.user.username} -> {self.course.title} ({self.role})"
 
+    def clean(self):
+        # A form's early warning for a full course; the seat claim in the
+        # pre_save signal stays the check that holds under concurrency.
+        if self.role != "STUDENT" or self.course_id is None:
+            return
+        if self.pk and Enrollment.objects.filter(pk=self.pk, role="STUDENT").exists():
+            return  # already holds a seat
+        full = Course.objects.filter(
+            pk=self.course_id, capacity__isnull=False, student_count__gte=F("capacity")
+        ).exists()
+        if full:
+            raise ValidationError("This course is full.", code="full")
+
+    def save(self, *args, **kwargs):
+        # the pre_save signal claims a seat; roll it back if the insert fails
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class WaitlistEntry(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="waitlist")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="waitlist_entries")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("course", "user")
+        ordering = ["created_at", "id"]
+        indexes = [models.Index(fields=["course", "created_at", "id"])]
+
+    def __str__(self):
+        return f"{self.user.username} waiting for {self.course.title}"
+
 class Assignment(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="assignments")
     title = models.CharField(max_length=200)
@@ -59,6 +115,90 @@ class CourseFeedback(models.Model):
     def __str__(self):
         return f"{self.user.username} → {self.course.title} ({self.rating})"
 
+    def save(self, *args, **kwargs):
+        # the post_save signal adjusts CourseRatingSummary inside this transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class CourseRatingSummary(models.Model):
+    RATINGS = range(1, 6)
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name="rating_summary")
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.course_id}: {self.count} rating(s)"
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def histogram(self):
+        return {rating: getattr(self, f"rating_{rating}") for rating in self.RATINGS}
+
+    @property
+    def distribution(self):
+        return [
+            {"rating": rating, "count": n, "percent": round(100 * n / self.count) if self.count else 0}
+            for rating, n in sorted(self.histogram.items(), reverse=True)
+        ]
+
+    @classmethod
+    def for_course(cls, course):
+        try:
+            return course.rating_summary
+        except cls.DoesNotExist:
+            return cls(course=course)
+
+    @classmethod
+    def apply(cls, course_id, added=None, removed=None):
+        # Moves one rating in or out of the summary with a single UPDATE, so
+        # concurrent writers never lose each other's changes.
+        if added == removed:
+            return
+        changes = {}
+        delta = 0
+        if added is not None:
+            changes[f"rating_{added}"] = F(f"rating_{added}") + 1
+            delta += 1
+        if removed is not None:
+            key = f"rating_{removed}"
+            changes[key] = F(key) - 1
+            delta -= 1
+        if not changes:
+            return
+        changes["count"] = F("count") + delta
+        changes["total"] = F("total") + (added or 0) - (removed or 0)
+        if cls.objects.filter(course_id=course_id).update(**changes) or added is None:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(course_id=course_id, **{"count": 1, "total": added, f"rating_{added}": 1})
+        except IntegrityError:
+            cls.objects.filter(course_id=course_id).update(**changes)
+
+    @classmethod
+    def rebuild(cls, course_ids=None):
+        courses = Course.objects.all() if course_ids is None else Course.objects.filter(pk__in=course_ids)
+        rows = CourseFeedback.objects.filter(course__in=courses).values("course_id", "rating").annotate(n=Count("id"))
+        summaries = {pk: cls(course_id=pk) for pk in courses.values_list("pk", flat=True)}
+        for row in rows.order_by():
+            summary = summaries[row["course_id"]]
+            setattr(summary, f"rating_{row['rating']}", row["n"])
+            summary.count += row["n"]
+            summary.total += row["rating"] * row["n"]
+        with transaction.atomic():
+            cls.objects.filter(course__in=courses).delete()
+            cls.objects.bulk_create(summaries.values(), batch_size=1000)
+        return len(summaries)
+
 class CourseBlock(models.Model):
     course = models.ForeignKey("Course", on_delete=models.CASCADE, related_name="blocks")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="course_blocks")
@@ -86,4 +226,14 @@ class CourseMaterial(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.course_id} · {self.title}"
\ No newline at end of file
+        return f"{self.course_id} · {self.title}"
+
+class ContentVersion(models.Model):
+    # A counter per cached resource ("course:<id>", "user:<id>", "catalog"),
+    # bumped whenever something it covers changes; see courses.versions.
+    key = models.CharField(max_length=64, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.key} v{self.value}"
@@ -0,0 +1,47 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+
+def mail_settings():
+    conf = {"BATCH_SIZE": 100, "RATE": None}
+    conf.update(getattr(settings, "NOTIFICATION_MAIL", {}))
+    return conf
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+class NotificationMailer:
+    # One message per recipient so addresses are never disclosed to each other,
+    # but every batch goes out over a single backend connection. RATE caps the
+    # number of messages per second across the whole send.
+
+    def __init__(self, batch_size=None, rate=None, backend=None):
+        conf = mail_settings()
+        self.batch_size = max(int(batch_size or conf["BATCH_SIZE"]), 1)
+        self.rate = rate if rate is not None else conf["RATE"]
+        self.backend = backend
+
+    def send(self, subject, body, recipients, from_email=None):
+        sent = 0
+        started = time.monotonic()
+        for batch in _chunks(recipients, self.batch_size):
+            if self.rate:
+                # pace before each batch after the first, never after the last
+                ahead = sent / self.rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+            connection = get_connection(self.backend)
+            messages = [
+                EmailMessage(subject, body, from_email, [address], connection=connection)
+                for address in batch
+            ]
+            with connection:
+                sent += connection.send_messages(messages) or 0
+        return sent
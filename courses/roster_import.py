@@ -0,0 +1,151 @@
+import csv
+import io
+from collections import Counter
+from itertools import count, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from jobs.queue import enqueue
+from rtchat.events import broadcast
+from . import tasks
+from .enrollment import ENROLLED, NOT_FOUND, WAITLISTED, bulk_enroll
+
+INVALID = "invalid"
+AMBIGUOUS = "ambiguous"
+DUPLICATE = "duplicate"
+TOO_MANY_ROWS = "too_many_rows"
+REPORT_HEADER = ["row", "identifier", "result"]
+_HEADER_NAMES = {"username", "email", "user", "identifier"}
+
+
+def roster_import_settings():
+    conf = {"CHUNK_SIZE": 1000, "MAX_ROWS": 100000}
+    conf.update(getattr(settings, "ROSTER_IMPORT", {}))
+    return conf
+
+
+def _rows(lines):
+    # (row number, identifier) from the first column; a header row is skipped
+    # and a malformed row comes out with an empty identifier
+    reader = csv.reader(lines)
+    for number in count(1):
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error:
+            yield number, ""
+            continue
+        identifier = row[0].strip() if row else ""
+        if number == 1 and identifier.lower() in _HEADER_NAMES:
+            continue
+        yield number, identifier
+
+
+def _resolve(identifiers):
+    # identifier -> user id (None when an email matches several accounts);
+    # usernames win over emails, emails match case-insensitively
+    User = get_user_model()
+    found = dict(User.objects.filter(username__in=identifiers).values_list("username", "pk"))
+    emails = {i.lower(): i for i in identifiers if "@" in i and i not in found}
+    if emails:
+        matches = (
+            User.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=emails)
+            .values_list("email_lower", "pk")
+        )
+        by_email = {}
+        for email, pk in matches:
+            by_email[email] = None if email in by_email else pk
+        for identifier in identifiers:
+            if identifier not in found and identifier.lower() in by_email:
+                found[identifier] = by_email[identifier.lower()]
+    return found
+
+
+class _SeenUsers:
+    # A set of user ids kept as one bit per id, so remembering every user of
+    # a large file costs the id range over eight bytes, not an entry per row.
+
+    def __init__(self):
+        self.bits = bytearray()
+
+    def add(self, pk):
+        byte, bit = divmod(pk, 8)
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << bit
+
+    def __contains__(self, pk):
+        byte, bit = divmod(pk, 8)
+        return byte < len(self.bits) and bool(self.bits[byte] >> bit & 1)
+
+
+def import_roster(course, lines, report=None):
+    # Enroll the users listed in ``lines`` (an iterable of CSV text lines,
+    # read lazily) as students of ``course``, CHUNK_SIZE rows per query
+    # batch and transaction. Each row's outcome is written to ``report``
+    # (a csv writer) as it is decided; returns the totals per outcome.
+    conf = roster_import_settings()
+    totals = Counter()
+    rows = _rows(lines)
+    if report is not None:
+        report.writerow(REPORT_HEADER)
+    limited = islice(rows, conf["MAX_ROWS"])
+    # users already seen anywhere earlier in the file, so a repeat in a later
+    # batch is a duplicate rather than already enrolled
+    seen = _SeenUsers()
+    while chunk := list(islice(limited, conf["CHUNK_SIZE"])):
+        found = _resolve({identifier for _, identifier in chunk if identifier})
+        user_ids = list(dict.fromkeys(pk for pk in found.values() if pk is not None and pk not in seen))
+        results = bulk_enroll([course.pk], user_ids, notify=False) if user_ids else {}
+        for number, identifier in chunk:
+            pk = found.get(identifier)
+            if not identifier:
+                result = INVALID
+            elif identifier not in found:
+                result = NOT_FOUND
+            elif pk is None:
+                result = AMBIGUOUS
+            elif pk in seen:
+                result = DUPLICATE
+            else:
+                result = results[course.pk, pk]
+                seen.add(pk)
+            _record(report, totals, number, identifier, result)
+    for number, identifier in islice(rows, 1):
+        # the rest of the file is left unread
+        _record(report, totals, number, identifier, TOO_MANY_ROWS)
+    if totals[ENROLLED] or totals[WAITLISTED]:
+        transaction.on_commit(lambda: _notify_imported(course, totals))
+    return totals
+
+
+def _record(report, totals, number, identifier, result):
+    totals[result] += 1
+    if report is not None:
+        report.writerow([number, identifier, result])
+
+
+def _notify_imported(course, totals):
+    # one summary for the whole file instead of one per batch
+    broadcast(course.pk, "notify.enrolled", {
+        "event": "enrolled",
+        "user": None,
+        "users": [],
+        "count": totals[ENROLLED],
+        "course": course.title,
+        "text": f"{totals[ENROLLED]} students enrolled in {course.title}",
+        "created_at": timezone.now().isoformat(),
+    })
+    enqueue(tasks.email_teacher_roster_import, course_id=course.pk,
+            enrolled=totals[ENROLLED], waitlisted=totals[WAITLISTED])
+
+
+def uploaded_lines(upload):
+    # decode the upload lazily; utf-8-sig drops the BOM spreadsheet exports add
+    return io.TextIOWrapper(upload.file, encoding="utf-8-sig", errors="replace", newline="")
@@ -1,11 +1,15 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.contrib.auth.models import User
-from .models import Enrollment, CourseMaterial
+from jobs.queue import enqueue
+from rtchat.events import broadcast
+from . import access, enrollment, tasks, versions
+from .autocomplete import course_index
+from .models import (
+    Assignment, Course, CourseBlock, CourseFeedback, CourseMaterial, CourseRatingSummary, Enrollment, WaitlistEntry,
+)
 
 @receiver(post_save, sender=Enrollment)
 def notify_teacher_on_enrollment(sender, instance, created, **kwargs):
@@ -14,34 +18,16 @@ def notify_teacher_on_enrollment(sender, instance, created, **kwargs):
 
     course = instance.course
     student = instance.user
-    layer = get_channel_layer()
-
-    async_to_sync(layer.group_send)(
-        f"course_{course.id}",
-        {
-            "type": "notify.enrolled",  
-            "payload": 
-            {
-                "event": "enrolled",
-                "user": student.username,
-                "course": course.title,     
-                "text": f"{student.username} enrolled in {course.title}",
-                "created_at": timezone.now().isoformat()
-            },
-        },
-    )
-
-    if course.created_by and course.created_by.email:
-        try:
-            send_mail(
-                subject=f"New enrollment — {course.title}",
-                message=f"{student.username} has enrolled in “{course.title}”",
-                from_email=None,                       
-                recipient_list=[course.created_by.email],
-                fail_silently=True             
-            )
-        except Exception:
-            pass
+
+    broadcast(course.id, "notify.enrolled", {
+        "event": "enrolled",
+        "user": student.username,
+        "course": course.title,
+        "text": f"{student.username} enrolled in {course.title}",
+        "created_at": timezone.now().isoformat(),
+    })
+
+    enqueue(tasks.email_teacher_enrollment, course_id=course.id, student_id=student.id)
 
 
 @receiver(post_save, sender=CourseMaterial)
@@ -51,34 +37,181 @@ def notify_students_on_material(sender, instance, created, **kwargs):
 
     course = instance.course
 
-    layer = get_channel_layer()
-    async_to_sync(layer.group_send)(
-        f"course_{course.id}",
-        {
-            "type": "notify.material",
-            "payload": {
-                "event": "material",
-                "title": instance.title,
-                "course": course.title,
-                "created_at": timezone.now().isoformat(),
-                "url": instance.url,
-                "has_file": bool(instance.file),
-            },
-        },
-    )
-
-    students = (User.objects
-                .filter(enrollments__course=course, enrollments__role="STUDENT")
-                .exclude(email="")
-                .distinct())
-    for u in students:
-        try:
-            send_mail(
-                subject=f"New material in {course.title}",
-                message=f'"{instance.title}" was added to {course.title}',
-                from_email=None,
-                recipient_list=[u.email],
-                fail_silently=True,
-            )
-        except Exception:
-            pass
+    broadcast(course.id, "notify.material", {
+        "event": "material",
+        "title": instance.title,
+        "course": course.title,
+        "created_at": timezone.now().isoformat(),
+        "url": instance.url,
+        "has_file": bool(instance.file),
+    })
+
+    enqueue(tasks.email_students_material, material_id=instance.id)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=CourseBlock)
+@receiver(post_delete, sender=CourseBlock)
+def invalidate_course_access(sender, instance, **kwargs):
+    access.invalidate(user_id=instance.user_id, course_id=instance.course_id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_access_for_course(sender, instance, **kwargs):
+    access.invalidate(course_id=instance.pk)
+
+
+@receiver(post_save, sender=Course)
+def index_course_title(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pk, title = instance.pk, instance.title
+    transaction.on_commit(lambda: course_index.add(pk, title))
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course_title(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: course_index.remove(pk))
+
+
+@receiver(post_save, sender=User)
+def invalidate_course_access_for_user(sender, instance, created, **kwargs):
+    if created:
+        access.invalidate(user_id=instance.pk)
+        access.invalidate_groups(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_access(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        access.invalidate_groups(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            access.invalidate_groups(user_id)
+    else:
+        access.invalidate_groups()
+
+
+@receiver(post_save, sender=Course)
+def create_rating_summary(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        CourseRatingSummary.objects.get_or_create(course=instance)
+
+
+@receiver(pre_save, sender=CourseFeedback)
+def remember_previous_rating(sender, instance, raw=False, **kwargs):
+    instance._previous_rating = None
+    if instance.pk and not raw:
+        instance._previous_rating = (
+            CourseFeedback.objects.filter(pk=instance.pk).values_list("course_id", "rating").first()
+        )
+
+
+@receiver(post_save, sender=CourseFeedback)
+def count_rating(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_rating", None)
+    if previous is None:
+        CourseRatingSummary.apply(instance.course_id, added=instance.rating)
+    elif previous[0] == instance.course_id:
+        CourseRatingSummary.apply(instance.course_id, added=instance.rating, removed=previous[1])
+    else:
+        CourseRatingSummary.apply(previous[0], removed=previous[1])
+        CourseRatingSummary.apply(instance.course_id, added=instance.rating)
+
+
+@receiver(post_delete, sender=CourseFeedback)
+def uncount_rating(sender, instance, **kwargs):
+    CourseRatingSummary.apply(instance.course_id, removed=instance.rating)
+
+
+@receiver(pre_save, sender=Enrollment)
+def claim_enrollment_seat(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None
+    if not instance._state.adding:
+        previous = Enrollment.objects.filter(pk=instance.pk).values_list("role", flat=True).first()
+    instance._seat_changed = (instance.role == enrollment.STUDENT) != (previous == enrollment.STUDENT)
+    if instance.role == enrollment.STUDENT and previous != enrollment.STUDENT:
+        enrollment.claim_seat(instance.course_id)
+    elif previous == enrollment.STUDENT and instance.role != enrollment.STUDENT:
+        enrollment.release_seat(instance.course_id)
+
+
+def _course_deleted(origin):
+    return isinstance(origin, Course) or getattr(origin, "model", None) is Course
+
+
+@receiver(post_delete, sender=Enrollment)
+def release_enrollment_seat(sender, instance, origin=None, **kwargs):
+    if instance.role != enrollment.STUDENT:
+        return
+    if _course_deleted(origin):
+        return  # the whole course is going away
+    enrollment.release_seat(instance.course_id)
+    enrollment.promote_waitlist(instance.course_id)
+
+
+@receiver(post_save, sender=CourseBlock)
+def drop_blocked_from_waitlist(sender, instance, created, **kwargs):
+    if created:
+        WaitlistEntry.objects.filter(course_id=instance.course_id, user_id=instance.user_id).delete()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def bump_course_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        versions.bump(versions.CATALOG, versions.course_key(instance.pk), versions.user_key(instance.created_by_id))
+
+
+def _has_capacity(enrollment_row):
+    if Enrollment.course.is_cached(enrollment_row):
+        return enrollment_row.course.capacity is not None
+    return Course.objects.filter(pk=enrollment_row.course_id, capacity__isnull=False).exists()
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def bump_enrollment_versions(sender, instance, raw=False, origin=None, signal=None, **kwargs):
+    if raw or _course_deleted(origin):
+        return
+    keys = [versions.course_key(instance.course_id), versions.user_key(instance.user_id)]
+    # the catalog only shows seats left for courses with a capacity
+    if signal is post_delete:
+        seat_changed = instance.role == enrollment.STUDENT
+    else:
+        seat_changed = getattr(instance, "_seat_changed", False)
+    if seat_changed and _has_capacity(instance):
+        keys.append(versions.CATALOG)
+    versions.bump(*keys)
+
+
+@receiver(post_save, sender=CourseMaterial)
+@receiver(post_delete, sender=CourseMaterial)
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def bump_course_content_version(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and not _course_deleted(origin):
+        versions.bump(versions.course_key(instance.course_id))
+
+
+@receiver(post_save, sender=CourseFeedback)
+@receiver(post_delete, sender=CourseFeedback)
+def bump_feedback_versions(sender, instance, raw=False, origin=None, signal=None, **kwargs):
+    if raw or _course_deleted(origin):
+        return
+    # the catalog shows and filters on rating counts and averages, which an
+    # edit of the comment alone leaves as they were
+    previous = getattr(instance, "_previous_rating", None)
+    if signal is post_save and previous == (instance.course_id, instance.rating):
+        versions.bump(versions.course_key(instance.course_id))
+    else:
+        versions.bump(versions.CATALOG, versions.course_key(instance.course_id))
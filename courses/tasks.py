@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+from jobs.queue import enqueue, task
+from .models import Course, CourseMaterial
+from .notifications import NotificationMailer
+
+@task
+def email_teacher_enrollment(course_id, student_id):
+    email_teacher_enrollments(course_id, [student_id])
+
+@task
+def email_teacher_enrollments(course_id, student_ids):
+    course = Course.objects.select_related("created_by").filter(pk=course_id).first()
+    if course is None or not course.created_by.email:
+        return
+    names = list(User.objects.filter(pk__in=student_ids).order_by("username").values_list("username", flat=True))
+    if not names:
+        return
+    if len(names) == 1:
+        subject, body = f"New enrollment — {course.title}", f"{names[0]} has enrolled in “{course.title}”"
+    else:
+        shown = ", ".join(names[:50]) + (f" and {len(names) - 50} more" if len(names) > 50 else "")
+        subject, body = f"{len(names)} new enrollments — {course.title}", f"{shown} have enrolled in “{course.title}”"
+    NotificationMailer().send(subject, body, [course.created_by.email])
+
+@task
+def email_teacher_roster_import(course_id, enrolled, waitlisted):
+    course = Course.objects.select_related("created_by").filter(pk=course_id).first()
+    if course is None or not course.created_by.email:
+        return
+    body = f"{enrolled} students were enrolled in “{course.title}” from an imported roster"
+    if waitlisted:
+        body += f", {waitlisted} more were added to the waitlist"
+    NotificationMailer().send(f"Roster imported — {course.title}", body, [course.created_by.email])
+
+@task
+def email_students_material(material_id, after=0):
+    # One batch of students per job, in id order after ``after``; the next
+    # batch is only enqueued once this one is sent, so a retry re-sends
+    # nothing another job already delivered.
+    material = CourseMaterial.objects.select_related("course").filter(pk=material_id).first()
+    if material is None:
+        return
+    course = material.course
+    mailer = NotificationMailer()
+    batch_size = mailer.batch_size
+    batch = list(User.objects
+                 .filter(enrollments__course=course, enrollments__role="STUDENT", pk__gt=after)
+                 .exclude(email="")
+                 .order_by("pk")
+                 .values_list("pk", "email")
+                 .distinct()[:batch_size])
+    if not batch:
+        return
+    mailer.send(
+        f"New material in {course.title}",
+        f'"{material.title}" was added to {course.title}',
+        [email for _, email in batch],
+    )
+    if len(batch) == batch_size:
+        # the mailer only paces within one send, so RATE spaces the jobs out
+        delay = batch_size / mailer.rate if mailer.rate else 0
+        enqueue(email_students_material, delay=delay, material_id=material_id, after=batch[-1][0])
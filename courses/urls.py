@@ -2,7 +2,7 @@ from django.urls import path
 from .views import (
     CourseListView, CourseCreateView, TeacherCourseListView, CourseDetailView,
     CourseMultiEnrollView, StudentCourseListView,
-    leave_feedback, course_roster, course_roster, remove_student, block_student, unblock_student,CourseMaterialCreateView,
+    leave_feedback, course_roster, course_roster, course_roster_import, course_export, remove_student, block_student, unblock_student,CourseMaterialCreateView,
     course_home, CourseMaterialCreateView
 )
 
@@ -16,6 +16,8 @@ urlpatterns = [
     path("course/<int:pk>/feedback/", leave_feedback, name="course_feedback"),
     path("course/<int:pk>/roster/", course_roster, name="course_roster"),
     path("course/<int:pk>/roster/", course_roster, name="course_roster"),
+    path("course/<int:pk>/roster/import/", course_roster_import, name="course_roster_import"),
+    path("course/<int:pk>/export/<slug:dataset>/", course_export, name="course_export"),
     path("course/<int:pk>/remove/<int:user_id>/", remove_student, name="course_remove_student"),
     path("course/<int:pk>/block/<int:user_id>/",  block_student,  name="course_block_student"),
     path("course/<int:pk>/unblock/<int:user_id>/", unblock_student, name="course_unblock_student"),
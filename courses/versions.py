@@ -0,0 +1,98 @@
+import hashlib
+
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.session import SessionStorage
+from django.db.models import CharField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from .models import ContentVersion
+
+CATALOG = "catalog"
+
+
+def course_key(course_id):
+    return f"course:{course_id}"
+
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+def bump(*keys):
+    keys = set(keys)
+    if not keys:
+        return
+    ContentVersion.objects.bulk_create([ContentVersion(key=key) for key in keys], ignore_conflicts=True)
+    ContentVersion.objects.filter(key__in=keys).update(value=F("value") + 1, updated_at=timezone.now())
+
+
+def fetch(keys):
+    # {key: (value, updated_at)} in one query; keys never bumped are (0, None)
+    rows = ContentVersion.objects.filter(key__in=keys).values_list("key", "value", "updated_at")
+    found = {key: (value, updated_at) for key, value, updated_at in rows}
+    return {key: found.get(key, (0, None)) for key in keys}
+
+
+def tag(version):
+    # a (value, updated_at) pair as a cache-key fragment; the timestamp keeps
+    # a restored or recreated counter from matching entries made before it
+    value, updated_at = version
+    return f"{value}.{updated_at.timestamp() if updated_at else 0}"
+
+
+def lookup(request, keys):
+    # fetch(), memoized on the request so the ETag and Last-Modified
+    # callbacks share one query
+    memo = request.__dict__.setdefault("_content_versions", {})
+    missing = [key for key in keys if key not in memo]
+    if missing:
+        memo.update(fetch(missing))
+    return [memo[key] for key in keys]
+
+
+def lookup_courses(request, keys, courses):
+    # lookup() for ``keys`` plus the key of every course in the ``courses``
+    # queryset, found in the same query. Returns ``keys`` followed by the
+    # course keys in id order; courses never bumped count as (0, None).
+    memo = request.__dict__.setdefault("_content_versions", {})
+    prefix = course_key("")
+    key = Concat(Value(prefix), Cast("pk", CharField()), output_field=CharField())
+    version = ContentVersion.objects.filter(key=OuterRef("version_key"))
+    rows = (
+        courses.order_by()
+        .annotate(
+            version_key=key,
+            version_value=Subquery(version.values("value")),
+            version_updated_at=Subquery(version.values("updated_at")),
+        )
+        .values_list("version_key", "version_value", "version_updated_at")
+        .union(ContentVersion.objects.filter(key__in=keys).values_list("key", "value", "updated_at"))
+    )
+    found = {row_key: (value or 0, updated_at) for row_key, value, updated_at in rows}
+    memo.update({row_key: found.get(row_key, (0, None)) for row_key in keys})
+    course_keys = sorted(
+        (k for k in found if k.startswith(prefix) and k not in keys), key=lambda k: int(k[len(prefix):])
+    )
+    memo.update({row_key: found[row_key] for row_key in course_keys})
+    return [*keys, *course_keys]
+
+
+def etag(request, keys, *extra):
+    parts = [f"{key}={value}" for key, (value, _) in zip(keys, lookup(request, keys))]
+    parts += [str(part) for part in extra]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def last_modified(request, keys):
+    stamps = [updated_at for _, updated_at in lookup(request, keys)]
+    return None if None in stamps or not stamps else max(stamps)
+
+
+def page_etag(request, keys):
+    # ETag for an HTML page: it also depends on who is looking, on the CSRF
+    # secret embedded in its forms and on the URL. Pages with flash messages
+    # waiting are never served as 304, or the messages would be lost.
+    if request.COOKIES.get(CookieStorage.cookie_name) or request.session.get(SessionStorage.session_key):
+        return None
+    return etag(request, keys, request.user.pk, request.META.get("CSRF_COOKIE", ""), request.get_full_path())
@@ -1,37 +1,57 @@
+import csv
+import io
+import tempfile
+
 # Django
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Avg, Count, Prefetch, Q
-from django.http import HttpResponseForbidden
+from django.db.models import Prefetch, Q
+from django.http import FileResponse, Http404, HttpResponseBadRequest, HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.utils.http import url_has_allowed_host_and_scheme
-from django.views.decorators.http import require_POST
-from django.views.generic import CreateView, DetailView, FormView, ListView
-from .forms import CourseFeedbackForm, CourseForm, CourseMaterialForm, MultiEnrollForm
-from .mixins import StudentRequiredMixin
-from .models import Course, CourseBlock, CourseFeedback, CourseMaterial, Enrollment
+from django.views.decorators.http import condition, require_POST
+from django.views.generic import CreateView, DetailView, FormView, ListView, TemplateView
+from . import versions
+from .access import CourseAccess
+from Elearning.export import CONTENT_TYPES, export_response
+from .enrollment import BLOCKED, FULL, WAITLISTED, bulk_enroll
+from .catalog import catalog_page
+from .export import DATASETS
+from .forms import CatalogFilterForm, CourseFeedbackForm, CourseForm, CourseMaterialForm, MultiEnrollForm, RosterImportForm
+from .mixins import StudentRequiredMixin, TeacherRequiredMixin
+from .models import Course, CourseBlock, CourseFeedback, CourseMaterial, CourseRatingSummary, Enrollment
+from .roster_import import import_roster, uploaded_lines
 
 User = get_user_model()
 
-class TeacherRequiredMixin(LoginRequiredMixin):
-    def dispatch(self, request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not request.user.groups.filter(name="Teacher").exists():
-            return HttpResponseForbidden()
-        return super().dispatch(request, *args, **kwargs)
-
 def _teacher_filter(user):
     return Q(created_by=user) | Q(enrollments__user=user, enrollments__role="TEACHER")
 
-class CourseListView(ListView):
+def _course_list_etag(request, *args, **kwargs):
+    return versions.page_etag(request, [versions.CATALOG])
+
+@method_decorator(condition(etag_func=_course_list_etag), name="get")
+class CourseListView(TemplateView):
     template_name = "courses/course_list.html"
-    context_object_name = "courses"
-    model = Course
-    ordering = ["-created_at"]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = CatalogFilterForm(self.request.GET)
+        filters = form.cleaned_data if form.is_valid() else {}
+        try:
+            page = catalog_page(filters, self.request.GET.get("cursor"))
+        except ValueError:
+            page = catalog_page(filters)
+        next_query = None
+        if page["next"]:
+            params = self.request.GET.copy()
+            params["cursor"] = page["next"]
+            next_query = params.urlencode()
+        context.update(form=form, courses=page["results"], next_query=next_query)
+        return context
 
 class CourseCreateView(TeacherRequiredMixin, CreateView):
     model = Course
@@ -53,7 +73,6 @@ class TeacherCourseListView(TeacherRequiredMixin, ListView):
             Course.objects.filter(_teacher_filter(self.request.user))
             .distinct()
             .prefetch_related(Prefetch("enrollments", queryset=student_enrs, to_attr="student_enrollments"))
-            .annotate(student_count=Count("enrollments", filter=Q(enrollments__role="STUDENT"), distinct=True))
             .order_by("title")
         )
 
@@ -67,6 +86,7 @@ class CourseDetailView(TeacherRequiredMixin, DetailView):
         return (
             Course.objects.filter(_teacher_filter(self.request.user))
             .distinct()
+            .select_related("rating_summary")
             .prefetch_related(Prefetch("enrollments", queryset=student_enrs, to_attr="student_enrollments"))
         )
 
@@ -87,17 +107,19 @@ class CourseMultiEnrollView(StudentRequiredMixin, FormView):
         return kwargs
 
     def form_valid(self, form):
-        user = self.request.user
         selected = form.cleaned_data["courses"]
+        results = bulk_enroll([c.pk for c in selected], [self.request.user.pk])
         created_any = False
         for course in selected:
-            if CourseBlock.objects.filter(course=course, user=user).exists():
+            result = results[(course.pk, self.request.user.pk)]
+            if result == BLOCKED:
                 messages.warning(self.request, f"You are blocked from enrolling in “{course.title}”")
-                continue
-            Enrollment.objects.get_or_create(
-                user=user, course=course, defaults={"role": "STUDENT"}
-            )
-            created_any = True
+            elif result == FULL:
+                messages.warning(self.request, f"“{course.title}” is full")
+            elif result == WAITLISTED:
+                messages.info(self.request, f"“{course.title}” is full, you have been added to its waitlist")
+            else:
+                created_any = True
         if created_any:
             messages.success(self.request, "Enrollment updated")
         return super().form_valid(form)
@@ -117,10 +139,7 @@ class StudentCourseListView(StudentRequiredMixin, ListView):
 @login_required
 def leave_feedback(request, pk):
     course = get_object_or_404(Course, pk=pk)
-    is_enrolled_student = Enrollment.objects.filter(
-        course=course, user=request.user, role="STUDENT"
-    ).exists()
-    if not is_enrolled_student:
+    if not CourseAccess.for_request(request).is_student(course):
         return HttpResponseForbidden("Only enrolled students can leave feedback")
 
     instance = CourseFeedback.objects.filter(course=course, user=request.user).first()
@@ -143,7 +162,9 @@ def leave_feedback(request, pk):
     return render(request, "courses/feedback_form.html", {"course": course, "form": form, "editing": instance is not None})
 
 def course_detail_extra_context(context, course, request):
-    context["avg_rating"] = course.feedbacks.aggregate(avg=Avg("rating"))["avg"]
+    summary = CourseRatingSummary.for_course(course)
+    context["rating_summary"] = summary
+    context["avg_rating"] = summary.average
     context["feedbacks"] = course.feedbacks.select_related("user")
     if request.user.is_authenticated:
         context["my_feedback"] = course.feedbacks.filter(user=request.user).first()
@@ -151,12 +172,8 @@ def course_detail_extra_context(context, course, request):
 
 @login_required
 def course_roster(request, pk):
-    course = get_object_or_404(Course, pk=pk)
-    is_teacher = (
-        course.created_by_id == request.user.id
-        or Enrollment.objects.filter(course=course, user=request.user, role="TEACHER").exists()
-    )
-    if not is_teacher:
+    course = get_object_or_404(Course.objects.select_related("rating_summary"), pk=pk)
+    if not CourseAccess.for_request(request).is_teacher(course):
         return HttpResponseForbidden("Teachers only")
 
     students = (
@@ -167,26 +184,63 @@ def course_roster(request, pk):
     )
 
     feedbacks = CourseFeedback.objects.filter(course=course).select_related("user").order_by("-updated_at")
-    avg_rating = feedbacks.aggregate(avg=Avg("rating"))["avg"]
+    rating_summary = CourseRatingSummary.for_course(course)
     my_feedback = feedbacks.filter(user=request.user).first()
 
     return render(
         request,
         "courses/course_roster.html",
-        {"course": course, "students": list(students), "feedbacks": list(feedbacks), "avg_rating": avg_rating, "my_feedback": my_feedback},
+        {
+            "course": course,
+            "students": list(students),
+            "feedbacks": list(feedbacks),
+            "rating_summary": rating_summary,
+            "avg_rating": rating_summary.average,
+            "my_feedback": my_feedback,
+        },
     )
 
-def _is_teacher_for(course, user):
-    return (
-        course.created_by_id == user.id
-        or Enrollment.objects.filter(course=course, user=user, role="TEACHER").exists()
-    )
+@login_required
+@require_POST
+def course_roster_import(request, pk):
+    course = get_object_or_404(Course, pk=pk)
+    if not CourseAccess.for_request(request).is_teacher(course):
+        return HttpResponseForbidden("Teachers only")
+    form = RosterImportForm(request.POST, request.FILES)
+    if not form.is_valid():
+        messages.error(request, "Choose a CSV file to import")
+        return redirect("course_roster", pk=pk)
+
+    # the per-row report only stays in memory while it is small
+    report = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    writer = io.TextIOWrapper(report, encoding="utf-8", newline="")
+    totals = import_roster(course, uploaded_lines(form.cleaned_data["file"]), csv.writer(writer))
+    writer.flush()
+    writer.detach()
+    report.seek(0)
+
+    summary = ", ".join(f"{n} {result.replace('_', ' ')}" for result, n in sorted(totals.items()))
+    messages.success(request, f"Roster imported: {summary or 'no rows'}")
+    return FileResponse(report, as_attachment=True, filename=f"roster-import-{course.pk}.csv", content_type="text/csv")
+
+@login_required
+def course_export(request, pk, dataset):
+    course = get_object_or_404(Course.objects.only("id", "created_by_id"), pk=pk)
+    if not CourseAccess.for_request(request).is_teacher(course):
+        return HttpResponseForbidden("Teachers only")
+    if dataset not in DATASETS:
+        raise Http404("Unknown export")
+    fmt = request.GET.get("format", "csv")
+    if fmt not in CONTENT_TYPES:
+        return HttpResponseBadRequest("format must be csv or ndjson")
+    fields, rows = DATASETS[dataset]
+    return export_response(request, rows(course), fields, fmt, f"course-{course.pk}-{dataset}")
 
 @login_required
 @require_POST
 def remove_student(request, pk, user_id):
     course = get_object_or_404(Course, pk=pk)
-    if not _is_teacher_for(course, request.user):
+    if not CourseAccess.for_request(request).is_teacher(course):
         return HttpResponseForbidden("Teachers only")
     deleted, _ = Enrollment.objects.filter(course=course, user_id=user_id, role="STUDENT").delete()
     messages.success(request, "Student removed from the course" if deleted else "No student enrollment found to remove")
@@ -196,7 +250,7 @@ def remove_student(request, pk, user_id):
 @require_POST
 def block_student(request, pk, user_id):
     course = get_object_or_404(Course, pk=pk)
-    if not _is_teacher_for(course, request.user):
+    if not CourseAccess.for_request(request).is_teacher(course):
         return HttpResponseForbidden("Teachers only")
     reason = (request.POST.get("reason") or "").strip()
     CourseBlock.objects.get_or_create(course=course, user_id=user_id, defaults={"reason": reason, "created_by": request.user})
@@ -208,7 +262,7 @@ def block_student(request, pk, user_id):
 @require_POST
 def unblock_student(request, pk, user_id):
     course = get_object_or_404(Course, pk=pk)
-    if not _is_teacher_for(course, request.user):
+    if not CourseAccess.for_request(request).is_teacher(course):
         return HttpResponseForbidden("Teachers only")
     CourseBlock.objects.filter(course=course, user_id=user_id).delete()
     messages.success(request, "Student unblocked")
@@ -216,39 +270,20 @@ def unblock_student(request, pk, user_id):
 
 
 
-class CourseMaterialCreateView(TeacherRequiredMixin, CreateView):
-    model = CourseMaterial
-    form_class = CourseMaterialForm
-    template_name = "courses/material_form.html"
-
-    def dispatch(self, request, *args, **kwargs):
-        self.course = get_object_or_404(Course, pk=kwargs["pk"])
-        if not (self.course.created_by_id == request.user.id or
-                Enrollment.objects.filter(course=self.course, user=request.user, role="TEACHER").exists()):
-            return HttpResponseForbidden()
-        return super().dispatch(request, *args, **kwargs)
-
-    def form_valid(self, form):
-        form.instance.course = self.course
-        form.instance.created_by = self.request.user
-        return super().form_valid(form)
-
-    def get_success_url(self):
-        return reverse_lazy("course_detail", kwargs={"pk": self.course.pk})
-
-
-
-def _is_teacher_for(course, user):
-    return (course.created_by_id == user.id
-            or Enrollment.objects.filter(course=course, user=user, role="TEACHER").exists())
+def _course_home_etag(request, pk):
+    # no ETag for non-members, so a 403 can never be revalidated into a 304
+    if not CourseAccess.for_request(request).is_member(pk):
+        return None
+    return versions.page_etag(request, [versions.course_key(pk)])
 
 @login_required
+@condition(etag_func=_course_home_etag)
 def course_home(request, pk):
     course = get_object_or_404(Course, pk=pk)
-    is_teacher = _is_teacher_for(course, request.user)
-    is_student = Enrollment.objects.filter(course=course, user=request.user, role="STUDENT").exists()
-    if not (is_teacher or is_student):
+    access = CourseAccess.for_request(request)
+    if not access.is_member(course):
         return HttpResponseForbidden()
+    is_teacher = access.is_teacher(course)
 
     materials = course.materials.select_related("created_by").order_by("-created_at")
     return render(request, "courses/course_home.html", {
@@ -264,7 +299,7 @@ class CourseMaterialCreateView(CreateView):
 
     def dispatch(self, request, *args, **kwargs):
         self.course = get_object_or_404(Course, pk=kwargs["pk"])
-        if not request.user.is_authenticated or not _is_teacher_for(self.course, request.user):
+        if not CourseAccess.for_request(request).is_teacher(self.course):
             return HttpResponseForbidden()
         return super().dispatch(request, *args, **kwargs)
 
@@ -0,0 +1,61 @@
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from jobs.queue import claim, execute, job_settings, requeue_stale, run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs with a thread pool"
+
+    def add_arguments(self, parser):
+        conf = job_settings()
+        parser.add_argument("--workers", type=int, default=conf["WORKERS"])
+        parser.add_argument("--poll-interval", type=float, default=conf["POLL_INTERVAL"])
+        parser.add_argument("--once", action="store_true", help="Drain due jobs in-process and exit")
+
+    def handle(self, *args, **opts):
+        if opts["once"]:
+            total = 0
+            while True:
+                done = run_pending()
+                if not done:
+                    break
+                total += done
+            self.stdout.write(f"Processed {total} job(s)")
+            return
+
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        workers = max(opts["workers"], 1)
+        slots = threading.BoundedSemaphore(workers)
+        self.stdout.write(f"Job worker started with {workers} thread(s)")
+
+        def run(job):
+            try:
+                close_old_connections()
+                execute(job)
+            finally:
+                connection.close()
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job") as pool:
+            while not stop.is_set():
+                close_old_connections()
+                requeue_stale()
+                free = 0
+                while slots.acquire(blocking=False):
+                    free += 1
+                jobs = claim(free) if free else []
+                for _ in range(free - len(jobs)):
+                    slots.release()
+                for job in jobs:
+                    pool.submit(run, job)
+                if not jobs:
+                    stop.wait(opts["poll_interval"])
+        self.stdout.write("Job worker stopped")
@@ -0,0 +1,115 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def job_settings():
+    conf = {
+        "WORKERS": 4,
+        "POLL_INTERVAL": 1.0,
+        "MAX_ATTEMPTS": 5,
+        "BACKOFF": 5,
+        "BACKOFF_MAX": 600,
+        "STALE_AFTER": 600,
+    }
+    conf.update(getattr(settings, "JOBS", {}))
+    return conf
+
+
+def task(func=None, *, name=None):
+    def register(fn):
+        fn.job_name = name or f"{fn.__module__}.{fn.__name__}"
+        _registry[fn.job_name] = fn
+        return fn
+
+    return register(func) if func is not None else register
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def enqueue(func_or_name, *, delay=0, max_attempts=None, **payload):
+    # The row is only written once the surrounding transaction commits, so a
+    # worker never picks up a job for data it cannot see yet.
+    name = getattr(func_or_name, "job_name", func_or_name)
+    if name not in _registry:
+        raise KeyError(f"Unknown job {name!r}")
+    attempts = max_attempts or job_settings()["MAX_ATTEMPTS"]
+
+    def create():
+        Job.objects.create(
+            name=name,
+            payload=payload,
+            max_attempts=attempts,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+
+    transaction.on_commit(create)
+
+
+def backoff_delay(attempts):
+    conf = job_settings()
+    return min(conf["BACKOFF"] * 2 ** max(attempts - 1, 0), conf["BACKOFF_MAX"])
+
+
+def requeue_stale():
+    cutoff = timezone.now() - timedelta(seconds=job_settings()["STALE_AFTER"])
+    return Job.objects.filter(status="RUNNING", locked_at__lt=cutoff).update(status="QUEUED", locked_at=None)
+
+
+def claim(limit):
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status="QUEUED", run_at__lte=now)
+        .order_by("run_at", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    claimed = []
+    for job_id in candidates:
+        won = Job.objects.filter(pk=job_id, status="QUEUED").update(
+            status="RUNNING", locked_at=now, attempts=F("attempts") + 1
+        )
+        if won:
+            claimed.append(job_id)
+    return list(Job.objects.filter(pk__in=claimed).order_by("run_at", "id"))
+
+
+def execute(job):
+    func = get_task(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"No task registered as {job.name!r}")
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s failed permanently: %s", job, error)
+            Job.objects.filter(pk=job.pk).update(status="FAILED", locked_at=None, last_error=error)
+        else:
+            retry_at = timezone.now() + timedelta(seconds=backoff_delay(job.attempts))
+            logger.warning("Job %s failed, retrying at %s", job, retry_at)
+            Job.objects.filter(pk=job.pk).update(
+                status="QUEUED", locked_at=None, run_at=retry_at, last_error=error
+            )
+        return False
+    Job.objects.filter(pk=job.pk).update(status="DONE", locked_at=None, last_error="")
+    return True
+
+
+def run_pending(limit=100):
+    jobs = claim(limit)
+    for job in jobs:
+        execute(job)
+    return len(jobs)
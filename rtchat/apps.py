@@ -1,5 +1,10 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class RtchatConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rtchat"
+
+    def ready(self):
+        from . import signals
+        post_migrate.connect(signals.install_search_index, sender=self)
@@ -0,0 +1,110 @@
+import asyncio
+import atexit
+import logging
+import weakref
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+def write_behind_settings():
+    conf = {"ENABLED": False, "FLUSH_INTERVAL": 0.05, "MAX_BATCH": 200, "MAX_PENDING": 50000}
+    conf.update(getattr(settings, "CHAT_WRITE_BEHIND", {}))
+    return conf
+
+
+class ChatWriteBuffer:
+    # Collects unsaved ChatMessage rows and persists them with bulk_create,
+    # either every FLUSH_INTERVAL seconds or as soon as MAX_BATCH are pending.
+
+    def __init__(self, flush_interval=None, max_batch=None, max_pending=None):
+        conf = write_behind_settings()
+        self.flush_interval = flush_interval if flush_interval is not None else conf["FLUSH_INTERVAL"]
+        self.max_batch = max_batch or conf["MAX_BATCH"]
+        self.max_pending = max_pending or conf["MAX_PENDING"]
+        self.pending = []
+        self.written = 0
+        self.dropped = 0
+        self._full = asyncio.Event()
+        self._flusher = None
+        self._flush_lock = asyncio.Lock()
+
+    def add(self, message):
+        self.pending.append(message)
+        if len(self.pending) > self.max_pending:
+            overflow = len(self.pending) - self.max_pending
+            del self.pending[:overflow]
+            self.dropped += overflow
+            logger.error("Chat write buffer overflow, dropped %d message(s)", overflow)
+        if len(self.pending) >= self.max_batch:
+            self._full.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while self.pending:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self.pending:
+                batch = self.pending[: self.max_batch]
+                del self.pending[: len(batch)]
+                if len(self.pending) < self.max_batch:
+                    self._full.clear()
+                try:
+                    await database_sync_to_async(self._write)(batch)
+                except Exception:
+                    logger.exception("Chat write buffer flush failed, will retry %d message(s)", len(batch))
+                    self.pending[:0] = batch
+                    return
+                self.written += len(batch)
+
+    def flush_sync(self):
+        batch, self.pending = self.pending, []
+        if batch:
+            self._write(batch)
+            self.written += len(batch)
+
+    @staticmethod
+    def _write(batch):
+        try:
+            with transaction.atomic():
+                ChatMessage.objects.bulk_create(batch, batch_size=len(batch))
+        except IntegrityError:
+            # e.g. the course was deleted while messages were pending: keep the good rows
+            for message in batch:
+                try:
+                    with transaction.atomic():
+                        message.save(force_insert=True)
+                except IntegrityError:
+                    logger.warning("Dropping unsavable chat message %s", message.uid)
+
+
+_buffers = weakref.WeakKeyDictionary()
+
+
+def get_buffer():
+    loop = asyncio.get_running_loop()
+    buffer = _buffers.get(loop)
+    if buffer is None:
+        buffer = _buffers[loop] = ChatWriteBuffer()
+    return buffer
+
+
+@atexit.register
+def _flush_on_exit():
+    for buffer in list(_buffers.values()):
+        try:
+            buffer.flush_sync()
+        except Exception:
+            logger.exception("Could not flush chat write buffer on exit")
@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict, deque
+
+from django.conf import settings
+
+from Elearning.keyset import encode_cursor
+from .history import PAGE_SIZE, fetch_page
+
+
+def recent_cache_settings():
+    conf = {"PER_COURSE": PAGE_SIZE, "MAX_MESSAGES": 20000}
+    conf.update(getattr(settings, "CHAT_RECENT_CACHE", {}))
+    return conf
+
+
+def _page(messages, has_more, limit):
+    page = messages[-limit:]
+    next_cursor = None
+    if page and (has_more or len(messages) > limit):
+        oldest = page[0]
+        # rows still waiting in the write-behind buffer have no id yet
+        next_cursor = encode_cursor([oldest["created_at"], oldest["id"] or 0])
+    return page, next_cursor
+
+
+class _Window:
+    def __init__(self, messages, has_more, size):
+        self.messages = deque(messages, maxlen=size)
+        self.has_more = has_more
+
+
+class RecentMessageCache:
+    # The newest PER_COURSE serialized messages of recently viewed courses,
+    # kept current by the consumer's send path. MAX_MESSAGES caps the total
+    # across courses; the least recently used course is evicted first.
+
+    def __init__(self, per_course=None, max_messages=None):
+        conf = recent_cache_settings()
+        self.per_course = per_course or conf["PER_COURSE"]
+        self.max_messages = max_messages or conf["MAX_MESSAGES"]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._windows = OrderedDict()
+        self._size = 0
+        self._writes = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, course_id, limit=PAGE_SIZE):
+        with self._lock:
+            window = self._windows.get(course_id)
+            if window is None or limit > self.per_course:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._windows.move_to_end(course_id)
+            messages, has_more = list(window.messages), window.has_more
+        return _page(messages, has_more, limit)
+
+    def write_token(self, course_id):
+        with self._lock:
+            return self._generation, self._writes.get(course_id, 0)
+
+    def fill(self, course_id, messages, has_more, token):
+        with self._lock:
+            if (self._generation, self._writes.get(course_id, 0)) != token:
+                return False
+            self._store(course_id, _Window(messages, has_more, self.per_course))
+            return True
+
+    def append(self, course_id, message):
+        with self._lock:
+            self._touch(course_id)
+            window = self._windows.get(course_id)
+            if window is None:
+                return
+            if len(window.messages) == window.messages.maxlen:
+                window.has_more = True
+                self._size -= 1
+            window.messages.append(message)
+            self._size += 1
+
+    def clear(self, course_id):
+        with self._lock:
+            self._touch(course_id)
+            self._store(course_id, _Window([], False, self.per_course))
+
+    def discard(self, course_id):
+        with self._lock:
+            self._touch(course_id)
+            window = self._windows.pop(course_id, None)
+            if window is not None:
+                self._size -= len(window.messages)
+
+    def reset(self):
+        with self._lock:
+            self._windows.clear()
+            self._writes.clear()
+            self._generation += 1
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "courses": len(self._windows),
+                "messages": self._size,
+            }
+
+    def _touch(self, course_id):
+        # invalidates fills that read the database before this write
+        if len(self._writes) > 10 * self.max_messages:
+            self._writes.clear()
+            self._generation += 1
+        self._writes[course_id] = self._writes.get(course_id, 0) + 1
+
+    def _store(self, course_id, window):
+        old = self._windows.pop(course_id, None)
+        if old is not None:
+            self._size -= len(old.messages)
+        self._windows[course_id] = window
+        self._size += len(window.messages)
+        while self._size > self.max_messages and len(self._windows) > 1:
+            _, evicted = self._windows.popitem(last=False)
+            self._size -= len(evicted.messages)
+            self.evictions += 1
+
+
+recent_messages = RecentMessageCache()
+
+
+def recent_page(course_id, limit=PAGE_SIZE):
+    cached = recent_messages.get(course_id, limit)
+    if cached is not None:
+        return cached
+    if limit > recent_messages.per_course:
+        return fetch_page(course_id, limit=limit)
+    token = recent_messages.write_token(course_id)
+    window, next_cursor = fetch_page(course_id, limit=recent_messages.per_course)
+    recent_messages.fill(course_id, window, next_cursor is not None, token)
+    return _page(window, next_cursor is not None, limit)
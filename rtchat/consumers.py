@@ -1,7 +1,15 @@
+import uuid
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.utils.timezone import now
-from courses.models import Course, Enrollment
+from django.db import IntegrityError
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware, now
+from courses.access import TEACHER, resolve_role
+from .buffer import get_buffer, write_behind_settings
+from .cache import recent_messages
+from .events import abroadcast, event_log, group_name, parse_event_id
+from .history import clear_chat, fetch_since, message_event, serialize_message
 from .models import ChatMessage
 
 
@@ -9,6 +17,7 @@ class CourseChatConsumer(AsyncJsonWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
         self.course_id = int(self.scope["url_route"]["kwargs"]["course_id"])
+        self.replayed_upto = 0
 
         if not self.user.is_authenticated:
             await self.close(code=4001)
@@ -19,89 +28,136 @@ class CourseChatConsumer(AsyncJsonWebsocketConsumer):
             await self.close(code=4003)
             return
 
-        self.group_name = f"course_{self.course_id}"
+        self.group_name = group_name(self.course_id)
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
 
+        params = parse_qs(self.scope.get("query_string", b"").decode())
+        last_event = params.get("last_event", [""])[0]
+        try:
+            since = parse_datetime(params.get("since", [""])[0])
+        except ValueError:
+            since = None
+        if since is not None and is_naive(since):
+            since = make_aware(since)
+        await self._resume(last_event, since)
+
+    async def _resume(self, last_event, since):
+        # Replay from the in-memory event log when it still covers the gap,
+        # otherwise fall back to the messages stored since ``since``.
+        events = []
+        if last_event:
+            events = event_log.since(self.course_id, last_event)
+        elif since is not None:
+            events = None
+        gap = events is None
+        truncated = False
+        if gap:
+            events = []
+            if since is not None:
+                if write_behind_settings()["ENABLED"]:
+                    await get_buffer().flush()
+                events, truncated = await database_sync_to_async(fetch_since)(self.course_id, since)
+        for payload in events:
+            await self.send_json(payload)
+            self.replayed_upto = max(self.replayed_upto, parse_event_id(payload.get("event_id")) or 0)
+        await self.send_json({
+            "event": "resumed",
+            "last_event_id": event_log.last_event_id(),
+            "replayed": len(events),
+            "gap": gap,
+            "truncated": truncated,
+        })
+
     async def receive_json(self, content, **kwargs):
         if content.get("action") == "clear":
             can_clear = await self._user_can_clear(self.user.id, self.course_id)
             if not can_clear:
                 return
             await self._clear_messages(self.course_id)
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "chat.cleared",
-                    "payload": {
-                        "event": "chat_cleared",
-                        "by": self.user.username,
-                        "created_at": now().isoformat(),
-                    },
-                },
-            )
+            recent_messages.clear(self.course_id)
+            await abroadcast(self.course_id, "chat.cleared", {
+                "event": "chat_cleared",
+                "by": self.user.username,
+                "created_at": now().isoformat(),
+            }, layer=self.channel_layer)
             return
 
         text = (content.get("message") or "").strip()
         if not text:
             return
 
-        msg = await self._save_message(self.user.id, self.course_id, text)
-        payload = {
-            "event": "message",
-            "id": msg.id,
-            "user": self.user.username,
-            "text": msg.text,
-            "created_at": msg.created_at.isoformat(),
-        }
-        await self.channel_layer.group_send(
-            self.group_name, {"type": "chat.message", "payload": payload}
-        )
+        uid = self._client_uid(content.get("client_id"))
+        if uid is not None:
+            earlier = event_log.recent_message(self.course_id, str(uid))
+            if earlier is not None:
+                if earlier["user"] == self.user.username:
+                    await self.send_json(earlier)
+                    return
+                uid = None
+        uid = uid or uuid.uuid4()
+
+        if write_behind_settings()["ENABLED"]:
+            msg = ChatMessage(user_id=self.user.id, course_id=self.course_id, text=text, uid=uid, created_at=now())
+            get_buffer().add(msg)
+        else:
+            msg, created = await self._save_message(self.user.id, self.course_id, text, uid)
+            if not created:
+                if msg is not None and msg.user_id == self.user.id:
+                    await self.send_json(message_event(msg, self.user.username))
+                return
+        recent_messages.append(self.course_id, serialize_message(msg, self.user.username))
+        await abroadcast(self.course_id, "chat.message", message_event(msg, self.user.username), layer=self.channel_layer)
 
-    async def chat_message(self, event):
+    @staticmethod
+    def _client_uid(value):
+        try:
+            return uuid.UUID(str(value)) if value else None
+        except ValueError:
+            return None
+
+    async def _forward(self, event):
+        seq = parse_event_id(event["payload"].get("event_id"))
+        if seq is not None and seq <= self.replayed_upto:
+            return
         await self.send_json(event["payload"])
 
+    async def chat_message(self, event):
+        await self._forward(event)
+
     async def chat_cleared(self, event):
-        await self.send_json(event["payload"])
+        await self._forward(event)
 
     async def notify_enrolled(self, event):
-        await self.send_json(event["payload"])
+        await self._forward(event)
 
     async def notify_material(self, event):
-        await self.send_json(event["payload"])
+        await self._forward(event)
 
     async def disconnect(self, code):
         if hasattr(self, "group_name"):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if write_behind_settings()["ENABLED"]:
+            await get_buffer().flush()
 
     @database_sync_to_async
     def _user_allowed(self, user_id, course_id):
-        try:
-            c = Course.objects.only("id", "created_by_id").get(pk=course_id)
-        except Course.DoesNotExist:
-            return False
-        if c.created_by_id == user_id:
-            return True
-        return Enrollment.objects.filter(course_id=course_id, user_id=user_id).exists()
+        return resolve_role(user_id, course_id)[1] is not None
 
     @database_sync_to_async
     def _user_can_clear(self, user_id, course_id):
-        try:
-            c = Course.objects.only("id", "created_by_id").get(pk=course_id)
-        except Course.DoesNotExist:
-            return False
-        if c.created_by_id == user_id:
-            return True
-        return Enrollment.objects.filter(
-            course_id=course_id, user_id=user_id, role="TEACHER"
-        ).exists()
+        return resolve_role(user_id, course_id)[1] == TEACHER
 
     @database_sync_to_async
     def _clear_messages(self, course_id):
-        ChatMessage.objects.filter(course_id=course_id).delete()
+        clear_chat(course_id)
 
     @database_sync_to_async
-    def _save_message(self, user_id, course_id, text):
-        return ChatMessage.objects.create(
-            user_id=user_id, course_id=course_id, text=text, created_at=now()
-        )
+    def _save_message(self, user_id, course_id, text, uid):
+        try:
+            return ChatMessage.objects.create(
+                user_id=user_id, course_id=course_id, text=text, uid=uid, created_at=now()
+            ), True
+        except IntegrityError:
+            # a resend whose original is no longer in the event log
+            return ChatMessage.objects.filter(uid=uid, course_id=course_id).first(), False
@@ -0,0 +1,122 @@
+import threading
+import uuid
+from collections import OrderedDict, deque
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+EPOCH = uuid.uuid4().hex[:12]
+
+
+def event_log_settings():
+    conf = {"SIZE": 500, "MAX_COURSES": 1000, "RECENT_UIDS": 2000}
+    conf.update(getattr(settings, "CHAT_EVENT_LOG", {}))
+    return conf
+
+
+def group_name(course_id):
+    return f"course_{course_id}"
+
+
+class _CourseLog:
+    def __init__(self, size, floor):
+        self.events = deque(maxlen=size)
+        # every event for this course with a sequence number above ``floor`` is in ``events``
+        self.floor = floor
+        self.uids = OrderedDict()
+
+
+class CourseEventLog:
+    # Per-process ring buffer of the events broadcast to each course group.
+    # Event ids are "<epoch>:<seq>": seq is monotonic for the life of the
+    # process and epoch changes on restart, so a client reconnecting with an
+    # id from another epoch is always treated as a gap.
+
+    def __init__(self, size=None, max_courses=None, recent_uids=None):
+        conf = event_log_settings()
+        self.size = size or conf["SIZE"]
+        self.max_courses = max_courses or conf["MAX_COURSES"]
+        self.recent_uids = recent_uids or conf["RECENT_UIDS"]
+        self._courses = OrderedDict()
+        self._seq = 0
+        self._evicted_upto = 0
+        self._lock = threading.Lock()
+
+    def _log(self, course_id):
+        log = self._courses.get(course_id)
+        if log is None:
+            log = self._courses[course_id] = _CourseLog(self.size, self._evicted_upto)
+            while len(self._courses) > self.max_courses:
+                _, evicted = self._courses.popitem(last=False)
+                last = evicted.events[-1][0] if evicted.events else evicted.floor
+                self._evicted_upto = max(self._evicted_upto, last)
+        else:
+            self._courses.move_to_end(course_id)
+        return log
+
+    def record(self, course_id, payload):
+        with self._lock:
+            self._seq += 1
+            payload = dict(payload, event_id=f"{EPOCH}:{self._seq}")
+            log = self._log(course_id)
+            if len(log.events) == log.events.maxlen:
+                log.floor = log.events[0][0]
+            log.events.append((self._seq, payload))
+            if payload.get("event") == "message" and payload.get("uid"):
+                log.uids[payload["uid"]] = payload
+                while len(log.uids) > self.recent_uids:
+                    log.uids.popitem(last=False)
+            return payload
+
+    def since(self, course_id, event_id):
+        # Events after ``event_id``, or None when they can't all be replayed from memory.
+        seq = parse_event_id(event_id)
+        if seq is None:
+            return None
+        with self._lock:
+            log = self._courses.get(course_id)
+            if log is None:
+                return [] if seq >= self._evicted_upto else None
+            if seq < log.floor:
+                return None
+            return [payload for s, payload in log.events if s > seq]
+
+    def recent_message(self, course_id, uid):
+        with self._lock:
+            log = self._courses.get(course_id)
+            return log.uids.get(uid) if log else None
+
+    def last_event_id(self):
+        return f"{EPOCH}:{self._seq}"
+
+    def clear(self):
+        with self._lock:
+            self._courses.clear()
+            self._evicted_upto = self._seq
+
+
+def parse_event_id(event_id):
+    epoch, _, seq = (event_id or "").partition(":")
+    if epoch != EPOCH or not seq.isdigit():
+        return None
+    return int(seq)
+
+
+event_log = CourseEventLog()
+
+
+def _message(course_id, event_type, payload):
+    return {"type": event_type, "payload": event_log.record(course_id, payload)}
+
+
+async def abroadcast(course_id, event_type, payload, layer=None):
+    layer = layer or get_channel_layer()
+    await layer.group_send(group_name(course_id), _message(course_id, event_type, payload))
+
+
+def broadcast(course_id, event_type, payload, layer=None):
+    layer = layer or get_channel_layer()
+    if layer is None:
+        return
+    async_to_sync(layer.group_send)(group_name(course_id), _message(course_id, event_type, payload))
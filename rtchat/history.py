@@ -0,0 +1,96 @@
+from datetime import datetime, timezone as dt_timezone
+from django.core.exceptions import ValidationError
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from Elearning.keyset import after, cursor_values, decode_cursor, encode_cursor
+from jobs.queue import enqueue
+from .models import ChatMessage, CourseChatState
+from .tasks import compact_chat
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+ORDERING = ("-created_at", "-id")
+_BEGINNING = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def visible_messages(course_id=None):
+    # Messages newer than their course's clear watermark. The watermark is a
+    # correlated subquery so hiding a cleared history costs no extra query.
+    watermark = CourseChatState.objects.filter(course_id=OuterRef("course_id")).values("cleared_at")[:1]
+    qs = ChatMessage.objects.all() if course_id is None else ChatMessage.objects.filter(course_id=course_id)
+    return qs.filter(created_at__gt=Coalesce(Subquery(watermark), Value(_BEGINNING)))
+
+
+def clear_chat(course_id):
+    # O(1) regardless of history size: move the watermark and leave the
+    # physical delete to the compaction job.
+    cleared_at = timezone.now()
+    CourseChatState.objects.update_or_create(course_id=course_id, defaults={"cleared_at": cleared_at})
+    enqueue(compact_chat, course_id=course_id)
+    return cleared_at
+
+
+EXPORT_FIELDS = ["id", "username", "text", "created_at"]
+
+
+def export_rows(course_id):
+    return (
+        visible_messages(course_id)
+        .order_by("created_at", "id")
+        .values("id", "text", "created_at", username=F("user__username"))
+    )
+
+
+def serialize_message(message, username=None):
+    return {
+        "id": message.id,
+        "uid": message.uid,
+        "user": username or message.user.username,
+        "text": message.text,
+        "created_at": message.created_at,
+    }
+
+
+def message_event(message, username=None):
+    return {
+        "event": "message",
+        "id": message.id,
+        "uid": str(message.uid),
+        "user": username or message.user.username,
+        "text": message.text,
+        "created_at": message.created_at.isoformat(),
+    }
+
+
+def fetch_since(course_id, since, limit=MAX_PAGE_SIZE):
+    # Newest ``limit`` messages created at or after ``since``, oldest first,
+    # plus whether older matching messages were left out.
+    rows = list(
+        visible_messages(course_id).filter(created_at__gte=since)
+        .select_related("user")
+        .only("id", "uid", "text", "created_at", "user__username")
+        .order_by(*ORDERING)[: limit + 1]
+    )
+    return [message_event(m) for m in reversed(rows[:limit])], len(rows) > limit
+
+
+def fetch_page(course_id, before=None, limit=PAGE_SIZE):
+    # Newest-first keyset scan on (course, created_at, id); the page is
+    # returned oldest-first for display together with the cursor for the
+    # next (older) page, or None when the history is exhausted. Raises
+    # ValueError for a malformed cursor.
+    qs = (
+        visible_messages(course_id)
+        .select_related("user")
+        .only("id", "uid", "text", "created_at", "user__username")
+        .order_by(*ORDERING)
+    )
+    if before:
+        try:
+            qs = qs.filter(after(ORDERING, decode_cursor(before, len(ORDERING))))
+        except (TypeError, ValidationError) as exc:
+            raise ValueError("Invalid cursor") from exc
+    rows = list(qs[: limit + 1])
+    next_cursor = encode_cursor(cursor_values(rows[limit - 1], ORDERING)) if len(rows) > limit else None
+    return [serialize_message(m) for m in reversed(rows[:limit])], next_cursor
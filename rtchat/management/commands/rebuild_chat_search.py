@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rtchat.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Drop and repopulate the chat full-text search index"
+
+    def handle(self, *args, **opts):
+        if not rebuild():
+            raise CommandError("Chat search needs SQLite with FTS5")
+        self.stdout.write("Chat search index rebuilt")
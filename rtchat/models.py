@@ -1,16 +1,28 @@
+import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from courses.models import Course
 
 class ChatMessage(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="chat_messages")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     text = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [models.Index(fields=["course", "created_at", "id"])]
 
     def __str__(self):
         preview = (self.text[:40] + "…") if len(self.text) > 40 else self.text
         return f"{self.user.username}: {preview} @ {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class CourseChatState(models.Model):
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name="chat_state")
+    cleared_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.course_id} cleared at {self.cleared_at}"
@@ -0,0 +1,151 @@
+import logging
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+from courses.access import member_course_ids
+from .history import visible_messages
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+TABLE = "rtchat_chatmessage_fts"
+MAX_RESULTS = 50
+# above this many courses, scoping through the index costs more than filtering the matches
+MAX_SCOPE_TOKENS = 20
+_TOKEN = re.compile(r"(\w+)(\*?)")
+_OPEN, _CLOSE = "\x02", "\x03"
+
+# The index stores the message text plus a "c<course_id>" token in its own
+# column, so scoping a search to the user's courses is an index intersection
+# rather than a filter over every match. Triggers keep it in step with every
+# insert, edit and delete on ChatMessage, including bulk_create from the
+# write-behind buffer and the chunked deletes of clear compaction.
+_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(text, course, prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON rtchat_chatmessage BEGIN
+        INSERT INTO {TABLE}(rowid, text, course) VALUES (new.id, new.text, 'c' || new.course_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON rtchat_chatmessage BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_au AFTER UPDATE OF text, course_id ON rtchat_chatmessage BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+        INSERT INTO {TABLE}(rowid, text, course) VALUES (new.id, new.text, 'c' || new.course_id);
+    END""",
+]
+
+_QUERY = f"""
+    SELECT m.id, snippet({TABLE}, 0, '{_OPEN}', '{_CLOSE}', '…', 16), bm25({TABLE}, 1.0, 0.0) AS score
+    FROM {TABLE} f
+    JOIN rtchat_chatmessage m ON m.id = f.rowid
+    LEFT JOIN rtchat_coursechatstate s ON s.course_id = m.course_id
+    WHERE {TABLE} MATCH %s AND (s.cleared_at IS NULL OR m.created_at > s.cleared_at){{scope}}
+    ORDER BY score
+    LIMIT %s
+"""
+
+
+def fts_available(using=None):
+    conn = using or connection
+    return conn.vendor == "sqlite"
+
+
+def install(using=None):
+    conn = using or connection
+    if not fts_available(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [TABLE])
+        exists = cursor.fetchone() is not None
+        for statement in _SCHEMA:
+            cursor.execute(statement)
+        if not exists:
+            cursor.execute(
+                f"INSERT INTO {TABLE}(rowid, text, course) SELECT id, text, 'c' || course_id FROM rtchat_chatmessage"
+            )
+    return True
+
+
+def uninstall(using=None):
+    # Drops the triggers with the index, so bulk loads can skip per-row
+    # indexing and have install() populate it in one statement afterwards.
+    conn = using or connection
+    if not fts_available(conn):
+        return False
+    with conn.cursor() as cursor:
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {TABLE}_{suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    return True
+
+
+def rebuild(using=None):
+    conn = using or connection
+    uninstall(conn)
+    return install(conn)
+
+
+def parse_query(text):
+    # Free text to an FTS5 expression: every word must match, a trailing "*"
+    # makes it a prefix. Quoting each token keeps FTS syntax out of user input.
+    terms = [f'"{word}"{star}' for word, star in _TOKEN.findall(text or "")]
+    return " ".join(terms)
+
+
+def highlight(snippet):
+    return escape(snippet).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def search_messages(user_id, text, course_id=None, limit=MAX_RESULTS):
+    terms = parse_query(text)
+    if not terms:
+        return []
+    course_ids = list(member_course_ids(user_id).values_list("pk", flat=True))
+    if course_id is not None:
+        course_ids = [course_id] if course_id in course_ids else []
+    if not course_ids:
+        return []
+    limit = min(max(limit, 1), MAX_RESULTS)
+    if not fts_available():
+        return _search_fallback(course_ids, text, limit)
+
+    expression = f"text : ({terms})"
+    if len(course_ids) <= MAX_SCOPE_TOKENS:
+        expression += " AND course : ({})".format(" OR ".join(f"c{pk}" for pk in course_ids))
+        sql, params = _QUERY.format(scope=""), [expression, limit]
+    else:
+        placeholders = ", ".join(["%s"] * len(course_ids))
+        sql, params = _QUERY.format(scope=f" AND m.course_id IN ({placeholders})"), [expression, *course_ids, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    messages = ChatMessage.objects.select_related("user").in_bulk([row[0] for row in rows])
+    return [
+        _result(messages[pk], highlight(snippet), -score)
+        for pk, snippet, score in rows
+        if pk in messages
+    ]
+
+
+def _result(message, snippet, score):
+    return {
+        "id": message.id,
+        "uid": str(message.uid),
+        "course_id": message.course_id,
+        "user": message.user.username,
+        "created_at": message.created_at.isoformat(),
+        "snippet": snippet,
+        "score": score,
+    }
+
+
+def _search_fallback(course_ids, text, limit):
+    messages = (
+        visible_messages()
+        .filter(course_id__in=course_ids, text__icontains=text.strip())
+        .select_related("user")
+        .order_by("-created_at", "-id")[:limit]
+    )
+    return [_result(m, escape(m.text), None) for m in messages]
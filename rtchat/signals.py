@@ -0,0 +1,18 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from courses.models import Course
+from .cache import recent_messages
+from .search import install
+
+@receiver(post_save, sender=Course)
+def drop_recent_messages_on_create(sender, instance, created, **kwargs):
+    if created:
+        recent_messages.discard(instance.pk)
+
+@receiver(post_delete, sender=Course)
+def drop_recent_messages_on_delete(sender, instance, **kwargs):
+    recent_messages.discard(instance.pk)
+
+def install_search_index(sender, using, **kwargs):
+    install(connections[using])
@@ -0,0 +1,26 @@
+from django.conf import settings
+from jobs.queue import enqueue, task
+from .models import ChatMessage, CourseChatState
+
+
+def compaction_settings():
+    conf = {"CHUNK_SIZE": 1000, "CHUNKS_PER_JOB": 50}
+    conf.update(getattr(settings, "CHAT_COMPACTION", {}))
+    return conf
+
+
+@task
+def compact_chat(course_id):
+    # Physically delete messages hidden by the clear watermark, one bounded
+    # chunk per transaction so writers are never blocked for long.
+    state = CourseChatState.objects.filter(course_id=course_id).first()
+    if state is None or state.cleared_at is None:
+        return
+    conf = compaction_settings()
+    hidden = ChatMessage.objects.filter(course_id=course_id, created_at__lte=state.cleared_at)
+    for _ in range(conf["CHUNKS_PER_JOB"]):
+        ids = list(hidden.order_by().values_list("id", flat=True)[: conf["CHUNK_SIZE"]])
+        if not ids:
+            return
+        ChatMessage.objects.filter(id__in=ids).delete()
+    enqueue(compact_chat, course_id=course_id)
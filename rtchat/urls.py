@@ -4,5 +4,8 @@ from . import views
 
 urlpatterns = [
     path("course/<int:pk>/chat/", course_chat_page, name="course_chat"),
+    path("course/<int:pk>/chat/history/", views.course_chat_history, name="course_chat_history"),
+    path("course/<int:pk>/chat/export/", views.course_chat_export, name="course_chat_export"),
+    path("search/", views.chat_search, name="chat_search"),
     path("chat/<int:course_id>/clear/", views.course_chat_clear, name="course_chat_clear"),
 ]
@@ -1,11 +1,15 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages  
-from django.http import HttpResponseForbidden, HttpResponseNotAllowed
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import get_object_or_404, render, redirect
-from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from courses.models import Course, Enrollment
-from .models import ChatMessage
+from courses.access import CourseAccess
+from courses.models import Course
+from .cache import recent_messages, recent_page
+from .events import broadcast
+from Elearning.export import CONTENT_TYPES, export_response
+from .history import EXPORT_FIELDS, MAX_PAGE_SIZE, PAGE_SIZE, clear_chat, export_rows, fetch_page
+from .search import MAX_RESULTS, search_messages
 from django.views.decorators.http import require_POST
 from django.utils.timezone import now
 
@@ -13,63 +17,91 @@ from django.utils.timezone import now
 @login_required
 def course_chat_page(request, pk):
     course = get_object_or_404(Course, pk=pk)
-    is_teacher = (
-        course.created_by_id == request.user.id
-        or Enrollment.objects.filter(course=course, user=request.user, role="TEACHER").exists()
-    )
-    is_student = Enrollment.objects.filter(course=course, user=request.user, role="STUDENT").exists()
-    if not (is_teacher or is_student):
+    access = CourseAccess.for_request(request)
+    if not access.is_member(course):
         return HttpResponseForbidden()
+    is_teacher = access.is_teacher(course)
 
-    chat_qs = course.chat_messages.select_related("user").order_by("-created_at")[:50]
-    chat_messages = list(chat_qs)[::-1]  
+    chat_messages, history_cursor = recent_page(course.id)
 
     return render(
         request,
         "rtchat/course_chat.html",
-        {"course": course, "chat_messages": chat_messages, "is_teacher": is_teacher},
+        {"course": course, "chat_messages": chat_messages, "history_cursor": history_cursor, "is_teacher": is_teacher},
     )
 
 
+@login_required
+def course_chat_history(request, pk):
+    course = get_object_or_404(Course.objects.only("id", "created_by_id"), pk=pk)
+    if not CourseAccess.for_request(request).is_member(course):
+        return HttpResponseForbidden()
+    try:
+        limit = min(max(int(request.GET.get("limit", PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        before = request.GET.get("before")
+        if before:
+            page, next_cursor = fetch_page(course.id, before=before, limit=limit)
+        else:
+            page, next_cursor = recent_page(course.id, limit)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid cursor or limit")
+    return JsonResponse({"messages": page, "next": next_cursor})
+
+
+@login_required
+def course_chat_export(request, pk):
+    course = get_object_or_404(Course.objects.only("id", "created_by_id"), pk=pk)
+    if not CourseAccess.for_request(request).is_teacher(course):
+        return HttpResponseForbidden()
+    fmt = request.GET.get("format", "csv")
+    if fmt not in CONTENT_TYPES:
+        return HttpResponseBadRequest("format must be csv or ndjson")
+    return export_response(request, export_rows(course.id), EXPORT_FIELDS, fmt, f"course-{course.id}-chat")
+
+
+@login_required
+def chat_search(request):
+    query = request.GET.get("q", "").strip()
+    try:
+        course_id = int(request.GET["course"]) if request.GET.get("course") else None
+        limit = int(request.GET.get("limit", MAX_RESULTS))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid course or limit")
+    results = search_messages(request.user.id, query, course_id=course_id, limit=limit)
+    return JsonResponse({"query": query, "results": results})
+
 
 @login_required
 def clear_course_chat(request, pk):
     course = get_object_or_404(Course, pk=pk)
-    is_teacher = (course.created_by_id == request.user.id or Enrollment.objects.filter(course=course, user=request.user, role="TEACHER").exists())
-    if not is_teacher:
+    if not CourseAccess.for_request(request).is_teacher(course):
         return HttpResponseForbidden()
     if request.method != "POST":
         return HttpResponseNotAllowed(["POST"])
 
-    ChatMessage.objects.filter(course=course).delete()
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(f"course_{course.id}", {"type": "chat.cleared"})
+    clear_chat(course.id)
+    recent_messages.clear(course.id)
+    broadcast(course.id, "chat.cleared", {
+        "event": "chat_cleared",
+        "by": request.user.get_username(),
+        "created_at": now().isoformat(),
+    }, layer=get_channel_layer())
     return redirect("course_chat", pk=pk)
 
 @login_required
 @require_POST
 def course_chat_clear(request, course_id: int):
     course = get_object_or_404(Course, pk=course_id)
+    if not CourseAccess.for_request(request).is_teacher(course):
+        return redirect("course_chat", pk=course_id)
+
+    clear_chat(course_id)
+    recent_messages.clear(course_id)
 
-    is_owner = (course.created_by_id == request.user.id)
-    is_teacher = Enrollment.objects.filter(course_id=course_id, user_id=request.user.id, role="TEACHER").exists()
-    if not (is_owner or is_teacher):
-        return redirect("course_chat", course_id=course_id)
-
-    ChatMessage.objects.filter(course_id=course_id).delete()
-
-    layer = get_channel_layer()
-    if layer is not None:
-        async_to_sync(layer.group_send)(
-            f"course_{course_id}",
-            {
-                "type": "chat.cleared",
-                "payload": {
-                    "event": "chat_cleared",
-                    "by": request.user.get_username(),
-                    "created_at": now().isoformat(),
-                },
-            },
-        )
+    broadcast(course_id, "chat.cleared", {
+        "event": "chat_cleared",
+        "by": request.user.get_username(),
+        "created_at": now().isoformat(),
+    }, layer=get_channel_layer())
 
     return redirect("course_chat", pk=course_id)
@@ -0,0 +1,80 @@
+import os
+import random
+import time
+import tracemalloc
+
+from benchutil import bootstrap, scratch_database
+
+bootstrap()
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+from accounts.autocomplete import people_index, suggest_people
+from courses.autocomplete import course_index, suggest_courses
+from courses.models import Course
+
+USERS = int(os.environ.get("USERS", "100000"))
+COURSES = int(os.environ.get("COURSES", "10000"))
+RUNS = int(os.environ.get("RUNS", "2000"))
+PREFIXES = ["m", "ma", "mar", "maria g", "user99", "intro", "zz"]
+FIRST = ["maria", "james", "anna", "li", "omar", "sofia", "marek", "aiko", "pedro", "fatima", "john", "chen"]
+LAST = ["garcia", "smith", "nguyen", "kowalski", "ito", "haddad", "martin", "silva", "brown", "wang"]
+SUBJECTS = ["Algebra", "Biology", "Chemistry", "History", "Poetry", "Statistics", "Databases", "Music"]
+
+
+def seed(rng):
+    User.objects.bulk_create(
+        (User(username=f"user{i}", first_name=rng.choice(FIRST), last_name=rng.choice(LAST)) for i in range(USERS)),
+        batch_size=5000,
+    )
+    owner = User.objects.create_user("owner")
+    Course.objects.bulk_create(
+        (Course(title=f"{rng.choice(['Intro to', 'Advanced', 'Applied'])} {rng.choice(SUBJECTS)} {i}", created_by=owner)
+         for i in range(COURSES)),
+        batch_size=5000,
+    )
+
+
+def micros(fn, arg, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def icontains(q):
+    qs = User.objects.filter(Q(username__icontains=q) | Q(first_name__icontains=q) | Q(last_name__icontains=q))
+    return list(qs.values_list("pk", "username")[:10])
+
+
+def run():
+    with scratch_database():
+        seed(random.Random(3))
+        for label, index in (("people", people_index), ("courses", course_index)):
+            tracemalloc.start()
+            started = time.perf_counter()
+            index.ensure_built()
+            elapsed = time.perf_counter() - started
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{label}: {len(index)} entries, {len(index._keys)} keys, built in {elapsed:.2f}s, {size / 2**20:.1f} MiB")
+
+        print(f"\n{'prefix':<10} {'people p50/p99 (us)':>22} {'courses p50/p99 (us)':>22} {'icontains p50 (us)':>20}")
+        for prefix in PREFIXES:
+            people = micros(suggest_people, prefix, RUNS)
+            courses = micros(suggest_courses, prefix, RUNS)
+            scan = micros(icontains, prefix, 10)
+            print(f"{prefix!r:<10} {people[0]:>10.1f} / {people[1]:<9.1f} {courses[0]:>10.1f} / {courses[1]:<9.1f} {scan[0]:>18.0f}")
+
+        user = User.objects.get(username="user5")
+        started = time.perf_counter()
+        for i in range(1000):
+            people_index.add(user.pk, f"user5\tRenamed {i}")
+        print(f"\nincremental update: {(time.perf_counter() - started) * 1000:.1f} us/update")
+
+
+if __name__ == "__main__":
+    run()
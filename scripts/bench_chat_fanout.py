@@ -0,0 +1,155 @@
+import asyncio
+import os
+import random
+import time
+import tracemalloc
+
+from benchutil import bootstrap, scratch_database, session_cookie, summarize, write_results
+
+bootstrap()
+
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test.utils import override_settings
+from Elearning.asgi import application
+from courses.models import Course, Enrollment
+
+SOCKETS = [int(n) for n in os.environ.get("SOCKETS", "100,500,1000").split(",")]
+COURSES = int(os.environ.get("COURSES", "20"))
+RATE = float(os.environ.get("RATE", "100"))  # messages per second, across all courses
+DURATION = float(os.environ.get("DURATION", "5"))
+DRAIN = float(os.environ.get("DRAIN", "30"))
+WRITE_BEHIND = os.environ.get("WRITE_BEHIND") == "1"
+SEED = int(os.environ.get("SEED", "0"))
+CONNECT_BATCH = 50
+
+
+def seed(students):
+    # Every student is enrolled in one course, round robin, and gets a
+    # logged-in session so the sockets go through AuthMiddlewareStack.
+    with transaction.atomic():
+        owner = User.objects.create_user("bench-teacher")
+        courses = Course.objects.bulk_create(Course(title=f"Course {i}", created_by=owner) for i in range(COURSES))
+        users = User.objects.bulk_create(User(username=f"bench{i}") for i in range(students))
+        Enrollment.objects.bulk_create(
+            Enrollment(user=user, course=courses[i % COURSES], role="STUDENT") for i, user in enumerate(users)
+        )
+        return [(session_cookie(user), courses[i % COURSES].pk) for i, user in enumerate(users)]
+
+
+async def connect_all(clients):
+    connect_ms = []
+
+    async def open_socket(cookie, course_id):
+        comm = WebsocketCommunicator(application, f"/ws/chat/course/{course_id}/", headers=[(b"cookie", cookie)])
+        started = time.perf_counter()
+        connected, code = await comm.connect(timeout=DRAIN)
+        if not connected:
+            raise RuntimeError(f"socket for course {course_id} was refused with {code}")
+        await comm.receive_json_from(timeout=DRAIN)  # the "resumed" event
+        connect_ms.append((time.perf_counter() - started) * 1000)
+        return comm
+
+    sockets = []
+    for offset in range(0, len(clients), CONNECT_BATCH):
+        batch = clients[offset:offset + CONNECT_BATCH]
+        sockets.extend(await asyncio.gather(*(open_socket(*client) for client in batch)))
+    return sockets, connect_ms
+
+
+async def measure(clients):
+    rng = random.Random(SEED)
+    # traced only while connecting: everything the open sockets hold on to,
+    # the consumer, its channel layer queue and the test communicator alike
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    sockets, connect_ms = await connect_all(clients)
+    per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / len(sockets)
+    tracemalloc.stop()
+
+    course_of = [course_id for _, course_id in clients]
+    sent_at = {}
+    latencies = []
+    received = [0] * len(sockets)
+    last_delivery = [0.0]
+
+    async def read(i, comm):
+        while True:
+            event = await comm.receive_json_from(timeout=DURATION + DRAIN)
+            if event.get("event") == "message":
+                now = time.perf_counter()
+                latencies.append((now - sent_at[int(event["text"])]) * 1000)
+                received[i] += 1
+                last_delivery[0] = now
+
+    readers = [asyncio.create_task(read(i, comm)) for i, comm in enumerate(sockets)]
+    sends = dict.fromkeys(course_of, 0)
+    total = int(RATE * DURATION)
+    started = time.perf_counter()
+    for seq in range(total):
+        delay = started + seq / RATE - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        i = rng.randrange(len(sockets))
+        sent_at[seq] = time.perf_counter()
+        await sockets[i].send_json_to({"message": str(seq)})
+        sends[course_of[i]] += 1
+    send_elapsed = time.perf_counter() - started
+
+    expected = sum(sends[course_id] for course_id in course_of)
+    deadline = time.perf_counter() + DRAIN
+    while sum(received) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    for reader in readers:
+        reader.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+    await asyncio.gather(*(comm.disconnect(timeout=DRAIN) for comm in sockets), return_exceptions=True)
+
+    delivered = sum(received)
+    return {
+        "sockets": len(sockets),
+        "messages_sent": total,
+        "send_rate": round(total / send_elapsed, 1),
+        "deliveries": delivered,
+        "expected_deliveries": expected,
+        "lost": expected - delivered,
+        "deliveries_per_second": round(delivered / max(last_delivery[0] - started, 1e-9), 1),
+        "latency_ms": summarize(latencies),
+        "connect_ms": summarize(connect_ms),
+        "memory_per_connection_bytes": round(per_connection),
+    }
+
+
+async def run_all(clients):
+    results = []
+    for size in SOCKETS:
+        result = await measure(clients[:size])
+        latency = result["latency_ms"]
+        print(
+            f"{size:>7} {result['send_rate']:>9.1f} {result['deliveries_per_second']:>11.1f} "
+            f"{latency.get('p50', 0):>8.2f} {latency.get('p95', 0):>8.2f} {latency.get('p99', 0):>8.2f} "
+            f"{result['lost']:>6} {result['memory_per_connection_bytes'] / 1024:>10.1f}"
+        )
+        results.append(result)
+    return results
+
+
+def run():
+    config = {
+        "sockets": SOCKETS, "courses": COURSES, "rate": RATE, "duration": DURATION,
+        "drain": DRAIN, "write_behind": WRITE_BEHIND, "seed": SEED,
+    }
+    write_behind = dict(getattr(settings, "CHAT_WRITE_BEHIND", {}), ENABLED=WRITE_BEHIND)
+    with scratch_database(), override_settings(CHAT_WRITE_BEHIND=write_behind):
+        clients = seed(max(SOCKETS))
+        print(f"courses={COURSES} rate={RATE:g}/s duration={DURATION:g}s write_behind={WRITE_BEHIND}")
+        print(f"{'sockets':>7} {'sent/s':>9} {'delivered/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'lost':>6} {'KiB/conn':>10}")
+        results = asyncio.run(run_all(clients))
+    print(f"results written to {write_results('chat_fanout', config, results)}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,101 @@
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchutil import bootstrap, scratch_database
+
+bootstrap()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from courses.models import Course, Enrollment
+from rtchat.models import ChatMessage
+from rtchat.search import search_messages
+
+MESSAGES = int(os.environ.get("MESSAGES", "1000000"))
+COURSES = int(os.environ.get("COURSES", "500"))
+USERS = int(os.environ.get("USERS", "2000"))
+RUNS = int(os.environ.get("RUNS", "50"))
+BATCH = 20000
+
+QUERIES = ["midterm", "teacher midterm", "home*", "homework deadline", "lorem", "zyzzyva"]
+
+
+def vocabulary(rng):
+    syllables = ["ka", "lo", "mi", "ne", "ru", "ta", "sho", "vin", "der", "pal", "qui", "zen"]
+    words = {"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(8000)}
+    words = sorted(words)
+    rng.shuffle(words)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    return words, weights
+
+
+def seed():
+    rng = random.Random(42)
+    words, weights = vocabulary(rng)
+    topical = ["midterm", "homework", "deadline", "teacher", "lorem", "exam"]
+    User.objects.bulk_create(User(username=f"user{i}") for i in range(USERS))
+    user_ids = list(User.objects.values_list("id", flat=True))
+    owner = User.objects.create_user("teach")
+    Course.objects.bulk_create(Course(title=f"Course {i}", created_by=owner) for i in range(COURSES))
+    course_ids = list(Course.objects.values_list("id", flat=True))
+
+    student = User.objects.create_user("student")
+    Enrollment.objects.bulk_create(Enrollment(user=student, course_id=pk) for pk in course_ids[:5])
+
+    sql = "INSERT INTO rtchat_chatmessage (course_id, user_id, text, uid, created_at) VALUES (%s, %s, %s, %s, %s)"
+    start = datetime(2025, 1, 1)
+    started = time.perf_counter()
+    for offset in range(0, MESSAGES, BATCH):
+        rows = []
+        for i in range(offset, min(offset + BATCH, MESSAGES)):
+            text = rng.choices(words, weights, k=rng.randint(4, 20))
+            if rng.random() < 0.02:
+                text.insert(rng.randrange(len(text)), rng.choice(topical))
+            created = start + timedelta(seconds=i)
+            rows.append((rng.choice(course_ids), rng.choice(user_ids), " ".join(text), uuid.uuid4().hex, created.isoformat(" ")))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+    print(f"seeded {MESSAGES} messages over {COURSES} courses in {time.perf_counter() - started:.0f}s")
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return owner, student
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return result, samples
+
+
+def report(label, results, samples):
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<40} hits={len(results):>3}  p50={statistics.median(samples):7.2f}ms  p95={p95:7.2f}ms  max={samples[-1]:7.2f}ms")
+
+
+def run():
+    with scratch_database():
+        owner, student = seed()
+        for label, user in (("student (5 courses)", student), (f"teacher ({COURSES} courses)", owner)):
+            print(label)
+            for query in QUERIES:
+                report(f"  fts {query!r}", *timed(lambda: search_messages(user.id, query), RUNS))
+
+        scope = list(Enrollment.objects.filter(user=student).values_list("course_id", flat=True))
+        baseline = lambda: list(
+            ChatMessage.objects.filter(course_id__in=scope, text__icontains="midterm").order_by("-created_at")[:50]
+        )
+        report("  icontains 'midterm' (student)", *timed(baseline, 3))
+        baseline = lambda: list(ChatMessage.objects.filter(text__icontains="midterm").order_by("-created_at")[:50])
+        report("  icontains 'midterm' (all courses)", *timed(baseline, 3))
+
+
+if __name__ == "__main__":
+    run()
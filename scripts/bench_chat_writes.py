@@ -0,0 +1,69 @@
+import asyncio
+import os
+import time
+
+from benchutil import bootstrap, scratch_database
+
+bootstrap()
+
+from channels.db import database_sync_to_async
+from django.contrib.auth.models import User
+from django.utils.timezone import now
+from courses.models import Course
+from rtchat.buffer import ChatWriteBuffer
+from rtchat.models import ChatMessage
+
+MESSAGES = int(os.environ.get("MESSAGES", "2000"))
+CONCURRENCY = int(os.environ.get("CONCURRENCY", "50"))
+
+
+async def drive(handle):
+    queue = asyncio.Queue()
+    for i in range(MESSAGES):
+        queue.put_nowait(i)
+
+    async def sender():
+        while not queue.empty():
+            await handle(queue.get_nowait())
+
+    await asyncio.gather(*(sender() for _ in range(CONCURRENCY)))
+
+
+async def per_row(user_id, course_id):
+    @database_sync_to_async
+    def save(i):
+        ChatMessage.objects.create(user_id=user_id, course_id=course_id, text=f"msg {i}", created_at=now())
+
+    await drive(save)
+
+
+async def write_behind(user_id, course_id):
+    buffer = ChatWriteBuffer()
+
+    async def add(i):
+        buffer.add(ChatMessage(user_id=user_id, course_id=course_id, text=f"msg {i}", created_at=now()))
+        await asyncio.sleep(0)
+
+    await drive(add)
+    await buffer.flush()
+
+
+def run():
+    with scratch_database():
+        user = User.objects.create_user("bench")
+        course = Course.objects.create(title="Bench", created_by=user)
+        print(f"messages={MESSAGES} concurrency={CONCURRENCY}")
+        results = {}
+        for label, fn in (("per-row insert", per_row), ("write-behind", write_behind)):
+            ChatMessage.objects.all().delete()
+            started = time.perf_counter()
+            asyncio.run(fn(user.id, course.id))
+            elapsed = time.perf_counter() - started
+            assert ChatMessage.objects.count() == MESSAGES
+            results[label] = MESSAGES / elapsed
+            print(f"{label:>15}: {results[label]:>10.0f} msg/s")
+        print(f"speedup: {results['write-behind'] / results['per-row insert']:.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from benchutil import bootstrap, scratch_database, session_cookie, summarize, write_results
+
+bootstrap()
+
+from channels.testing import HttpCommunicator
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+from Elearning.asgi import application
+from courses.datagen import DataGenerator, Spec
+from courses.models import Course, Enrollment
+
+SCENARIO = os.environ.get("SCENARIO", "mixed")
+CONCURRENCY = [int(n) for n in os.environ.get("CONCURRENCY", "1,10,50").split(",")]
+REQUESTS = int(os.environ.get("REQUESTS", "2000"))
+WARMUP = int(os.environ.get("WARMUP", "200"))
+SCALE = float(os.environ.get("SCALE", "1"))
+IDENTITIES = int(os.environ.get("IDENTITIES", "50"))
+TIMEOUT = float(os.environ.get("TIMEOUT", "30"))
+SEED = int(os.environ.get("SEED", "0"))
+BASELINE = os.environ.get("BASELINE")
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+Identity = namedtuple("Identity", "kind headers courses")
+
+ROUTES = {
+    "dashboard": lambda ident, rng: reverse("home"),
+    "course_home": lambda ident, rng: reverse("course_home", args=[rng.choice(ident.courses)]),
+    "roster": lambda ident, rng: reverse("course_roster", args=[rng.choice(ident.courses)]),
+    "catalog": lambda ident, rng: reverse("course_list"),
+    "api_users": lambda ident, rng: reverse("user-list"),
+    "api_catalog": lambda ident, rng: reverse("course_catalog"),
+}
+
+# (route, identity kind, weight); teacher and student identities carry a
+# session cookie, jwt ones an Authorization header
+SCENARIOS = {
+    "student": [("dashboard", "student", 4), ("course_home", "student", 4), ("catalog", "student", 2)],
+    "teacher": [("dashboard", "teacher", 3), ("course_home", "teacher", 3), ("roster", "teacher", 4)],
+    "api": [("api_users", "jwt", 3), ("api_catalog", "jwt", 1)],
+    "mixed": [
+        ("dashboard", "student", 30), ("course_home", "student", 30), ("catalog", "student", 15),
+        ("dashboard", "teacher", 5), ("roster", "teacher", 5), ("api_users", "jwt", 10), ("api_catalog", "jwt", 5),
+    ],
+}
+
+
+def identities():
+    # The first IDENTITIES teachers and students of the generated dataset,
+    # each with the courses it may open.
+    taught = defaultdict(list)
+    for pk, creator in Course.objects.order_by("pk").values_list("pk", "created_by_id"):
+        taught[creator].append(pk)
+    enrolled = defaultdict(list)
+    students = Enrollment.objects.filter(role="STUDENT").order_by("user_id", "course_id")
+    for user_id, course_id in students.values_list("user_id", "course_id"):
+        enrolled[user_id].append(course_id)
+    users = User.objects.in_bulk(sorted(taught)[:IDENTITIES] + sorted(enrolled)[:IDENTITIES])
+    host = [(b"host", b"localhost")]
+    pool = defaultdict(list)
+    for kind, courses in (("teacher", taught), ("student", enrolled)):
+        for user_id in sorted(courses)[:IDENTITIES]:
+            user = users[user_id]
+            pool[kind].append(Identity(kind, host + [(b"cookie", session_cookie(user))], courses[user_id]))
+            if kind == "student":
+                token = f"Bearer {AccessToken.for_user(user)}".encode()
+                pool["jwt"].append(Identity("jwt", host + [(b"authorization", token)], courses[user_id]))
+    return pool
+
+
+def plan(pool, count, rng):
+    # The same seed always yields the same request sequence, so runs before
+    # and after a change replay identical traffic.
+    mix = SCENARIOS[SCENARIO]
+    weights = [weight for _, _, weight in mix]
+    requests = []
+    for route, kind, _ in rng.choices(mix, weights, k=count):
+        ident = rng.choice(pool[kind])
+        requests.append((f"{route}:{kind}", ROUTES[route](ident, rng), ident.headers))
+    return requests
+
+
+def histogram(samples):
+    counts = Counter()
+    for sample in samples:
+        counts[next((f"<={b}" for b in BUCKETS_MS if sample <= b), f">{BUCKETS_MS[-1]}")] += 1
+    return {label: counts[label] for label in [f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]}
+
+
+async def drive(requests, concurrency):
+    samples = defaultdict(list)
+    statuses = defaultdict(Counter)
+    queue = iter(requests)
+
+    async def worker():
+        for label, path, headers in queue:
+            comm = HttpCommunicator(application, "GET", path, headers=headers)
+            started = time.perf_counter()
+            response = await comm.get_response(timeout=TIMEOUT)
+            samples[label].append((time.perf_counter() - started) * 1000)
+            statuses[label][response["status"]] += 1
+            # the handler still closes the response and cancels its disconnect listener
+            await comm.wait(TIMEOUT)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, statuses, time.perf_counter() - started
+
+
+def measure(requests, concurrency):
+    samples, statuses, elapsed = asyncio.run(drive(requests, concurrency))
+    routes = {}
+    for label in sorted(samples):
+        routes[label] = {
+            "requests": len(samples[label]),
+            "rps": round(len(samples[label]) / elapsed, 1),
+            "errors": sum(n for status, n in statuses[label].items() if status >= 400),
+            "statuses": {str(status): n for status, n in sorted(statuses[label].items())},
+            "latency_ms": summarize(samples[label]),
+            "histogram": histogram(samples[label]),
+        }
+    every = [sample for values in samples.values() for sample in values]
+    return {
+        "concurrency": concurrency,
+        "requests": len(requests),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(requests) / elapsed, 1),
+        "errors": sum(route["errors"] for route in routes.values()),
+        "latency_ms": summarize(every),
+        "histogram": histogram(every),
+        "routes": routes,
+    }
+
+
+def change(value, before):
+    if not before:
+        return ""
+    return f"{(value - before) / before * 100:+.0f}%"
+
+
+def report(result, baseline):
+    before = next((r for r in baseline if r["concurrency"] == result["concurrency"]), None)
+    routes = dict(result["routes"], all=result)
+    print(f"\nconcurrency={result['concurrency']} requests={result['requests']} rps={result['rps']}")
+    print(f"{'route':<22} {'req':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'errors':>6} {'Δrps':>6} {'Δp99':>6}")
+    for label, route in routes.items():
+        latency = route["latency_ms"]
+        old = (before or {}).get("routes", {}).get(label) if label != "all" else before
+        old_rps, old_p99 = (old["rps"], old["latency_ms"]["p99"]) if old else (None, None)
+        print(
+            f"{label:<22} {route['requests']:>6} {route['rps']:>8.1f} {latency['p50']:>8.2f} {latency['p95']:>8.2f} "
+            f"{latency['p99']:>8.2f} {latency['max']:>8.2f} {route['errors']:>6} "
+            f"{change(route['rps'], old_rps):>6} {change(latency['p99'], old_p99):>6}"
+        )
+    peak = max(result["histogram"].values())
+    for bucket, n in result["histogram"].items():
+        if n:
+            print(f"  {bucket:>7} ms {'#' * max(round(40 * n / peak), 1)} {n}")
+
+
+def run():
+    if SCENARIO not in SCENARIOS:
+        raise SystemExit(f"SCENARIO must be one of {', '.join(SCENARIOS)}")
+    baseline = []
+    if BASELINE:
+        with open(BASELINE) as f:
+            baseline = json.load(f)["results"]
+    config = {
+        "scenario": SCENARIO, "concurrency": CONCURRENCY, "requests": REQUESTS, "warmup": WARMUP,
+        "scale": SCALE, "identities": IDENTITIES, "seed": SEED,
+    }
+    # DEBUG would record every query on the connection and skew the numbers
+    with scratch_database(), override_settings(DEBUG=False):
+        started = time.perf_counter()
+        DataGenerator(Spec(seed=SEED).scaled(SCALE)).run()
+        pool = identities()
+        print(f"dataset scale={SCALE:g} built in {time.perf_counter() - started:.0f}s, scenario={SCENARIO}")
+        rng = random.Random(SEED)
+        asyncio.run(drive(plan(pool, WARMUP, rng), max(CONCURRENCY)))
+        requests = plan(pool, REQUESTS, rng)
+        results = []
+        for concurrency in CONCURRENCY:
+            results.append(measure(requests, concurrency))
+            report(results[-1], baseline)
+    print(f"\nresults written to {write_results('http_load', config, results)}")
+
+
+if __name__ == "__main__":
+    run()
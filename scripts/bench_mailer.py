@@ -0,0 +1,72 @@
+import os
+import time
+
+from benchutil import bootstrap
+
+bootstrap()
+
+from django.core import mail
+from django.core.mail import send_mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.test.utils import override_settings, setup_test_environment
+from courses.notifications import NotificationMailer
+
+HANDSHAKE_SECONDS = float(os.environ.get("HANDSHAKE_MS", "5")) / 1000
+SIZES = [int(n) for n in os.environ.get("SIZES", "10,100,400,1000").split(",")]
+
+
+class HandshakeBackend(LocmemBackend):
+    # Stand-in for an SMTP server: opening a connection pays a fixed connect +
+    # EHLO cost and send_messages() opens one itself when none is open, exactly
+    # like django.core.mail.backends.smtp.EmailBackend.
+    connected = False
+
+    def open(self):
+        if self.connected:
+            return False
+        time.sleep(HANDSHAKE_SECONDS)
+        self.connected = True
+        return True
+
+    def close(self):
+        self.connected = False
+
+    def send_messages(self, messages):
+        new_connection = self.open()
+        try:
+            return super().send_messages(messages)
+        finally:
+            if new_connection:
+                self.close()
+
+
+def per_recipient(recipients):
+    for address in recipients:
+        send_mail("New material", "Body", None, [address])
+
+
+def pooled(recipients):
+    NotificationMailer().send("New material", "Body", recipients)
+
+
+def run():
+    setup_test_environment()
+    backend = f"{__name__}.HandshakeBackend"
+    print(f"handshake={HANDSHAKE_SECONDS * 1000:.1f}ms")
+    print(f"{'students':>8} {'send_mail us/msg':>17} {'pooled us/msg':>14}")
+    with override_settings(EMAIL_BACKEND=backend):
+        for size in SIZES:
+            recipients = [f"student{i}@example.com" for i in range(size)]
+            row = []
+            for fn in (per_recipient, pooled):
+                mail.outbox = []
+                started = time.perf_counter()
+                fn(recipients)
+                elapsed = time.perf_counter() - started
+                assert len(mail.outbox) == size
+                row.append(elapsed / size * 1e6)
+            print(f"{size:>8} {row[0]:>17.1f} {row[1]:>14.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,76 @@
+import os
+import random
+import statistics
+import time
+
+from benchutil import bootstrap, scratch_database
+
+bootstrap()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from accounts.search import people_page, rebuild
+
+SIZES = [int(n) for n in os.environ.get("SIZES", "10000,100000").split(",")]
+RUNS = int(os.environ.get("RUNS", "30"))
+QUERIES = ["a", "mar", "maria", "maria gar", "zz"]
+FIRST = ["maria", "james", "anna", "li", "omar", "sofia", "marek", "aiko", "pedro", "fatima", "john", "chen"]
+LAST = ["garcia", "smith", "nguyen", "kowalski", "ito", "haddad", "martin", "silva", "brown", "wang"]
+
+
+def grow(rng, total):
+    have = User.objects.count()
+    User.objects.bulk_create(
+        (
+            User(
+                username=f"user{i}",
+                first_name=rng.choice(FIRST),
+                last_name=f"{rng.choice(LAST)}{rng.randint(0, 999)}",
+                email=f"user{i}@example.com",
+            )
+            for i in range(have, total)
+        ),
+        batch_size=5000,
+    )
+    rebuild()
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def icontains(q):
+    name_q = Q(first_name__icontains=q) | Q(last_name__icontains=q) | Q(username__icontains=q) | Q(email__icontains=q)
+    qs = User.objects.filter(name_q).order_by("first_name", "last_name", "username")
+    return list(qs[:25]), qs.count()
+
+
+def indexed(q):
+    page = people_page(q)
+    return list(page), page.paginator.count
+
+
+def timed(fn, q):
+    samples = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def run():
+    rng = random.Random(7)
+    with scratch_database():
+        for size in SIZES:
+            started = time.perf_counter()
+            grow(rng, size)
+            print(f"\n{size} users (seed + index {time.perf_counter() - started:.0f}s)")
+            for q in QUERIES:
+                scan = timed(icontains, q)
+                index = timed(indexed, q)
+                print(f"  {q!r:<12} icontains p50={scan[0]:7.2f}ms p95={scan[1]:7.2f}ms   index p50={index[0]:6.2f}ms p95={index[1]:6.2f}ms")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def bootstrap():
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Elearning.settings")
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def scratch_database(keep=False):
+    # A throwaway on-disk SQLite database (real fsyncs, unlike the in-memory
+    # test database) so benchmarks never touch db.sqlite3.
+    from django.db import connection
+
+    path = os.environ.get("BENCH_DB") or os.path.join(tempfile.mkdtemp(prefix="elearning-bench-"), "bench.sqlite3")
+    connection.settings_dict.setdefault("TEST", {})["NAME"] = path
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keep)
+    try:
+        yield path
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep)
+
+
+def session_cookie(user):
+    # A logged-in session for ``user``, as the Cookie header value a browser would send.
+    from importlib import import_module
+
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return f"{settings.SESSION_COOKIE_NAME}={session.session_key}".encode()
+
+
+def percentile(samples, q):
+    # ``samples`` sorted ascending; nearest-rank, so the value is one that was observed
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    return {
+        "p50": round(percentile(samples, 50), 3),
+        "p95": round(percentile(samples, 95), 3),
+        "p99": round(percentile(samples, 99), 3),
+        "max": round(samples[-1], 3),
+        "mean": round(sum(samples) / len(samples), 3),
+    }
+
+
+def write_results(name, config, results):
+    # One JSON document per run, so successive runs can be diffed or plotted.
+    import json
+    import platform
+    from datetime import datetime, timezone
+
+    import django
+
+    path = os.environ.get("OUTPUT") or f"{name}.json"
+    document = {
+        "benchmark": name,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "config": config,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+    return path
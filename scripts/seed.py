@@ -2,6 +2,7 @@ from datetime import date, timedelta
 from django.contrib.auth.models import User, Group, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
+from courses.enrollment import bulk_enroll
 from courses.models import Course, Enrollment, Assignment
 from accounts.models import Status
 
@@ -68,10 +69,9 @@ def run():
     for c, t in zip(courses, teachers):
         Enrollment.objects.get_or_create(user=t, course=c, defaults={"role": "TEACHER"})
 
+    # full courses waitlist or skip the student instead of failing the seed
     for idx, s in enumerate(students):
-        Enrollment.objects.get_or_create(
-            user=s, course=courses[idx % len(courses)], defaults={"role": "STUDENT"}
-        )
+        bulk_enroll([courses[idx % len(courses)].pk], [s.pk], notify=False)
 
     for c in courses:
         for j in range(1, 3 + 1):
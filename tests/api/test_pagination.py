@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Status
+from courses import access
+from courses.models import Course
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        access.invalidate_groups()
+
+    def walk(self, url, params=None, key="id"):
+        seen, pages = [], 0
+        params = dict(params or {}, page_size=3)
+        while url:
+            data = self.client.get(url, params).json()
+            seen += [row[key] for row in data["results"]]
+            url, params, pages = data["next"], None, pages + 1
+        return seen, pages
+
+    def test_user_directory_pages_without_counting(self):
+        users = [User.objects.create_user(f"user{i:02d}") for i in range(10)]
+        with self.assertNumQueries(2):
+            data = self.client.get(reverse("user-list"), {"page_size": 3}).json()
+        self.assertNotIn("count", data)
+        self.assertIn("cursor=", data["next"])
+
+        seen, pages = self.walk(reverse("user-list"))
+        self.assertEqual(seen, [u.pk for u in users])
+        self.assertEqual(pages, 4)
+        counted = self.client.get(reverse("user-list"), {"count": "true"}).json()
+        self.assertEqual(counted["count"], 10)
+
+    def test_search_results_page_by_rank(self):
+        for name in ["ann", "anna", "annabel", "annie", "andy", "bob"]:
+            User.objects.create_user(name)
+        seen, _ = self.walk(reverse("user-list"), {"q": "ann"}, key="username")
+        self.assertEqual(seen, ["ann", "anna", "annabel", "annie"])
+
+    def test_timeline_is_stable_with_equal_timestamps(self):
+        user = User.objects.create_user("poster", password="pw")
+        statuses = [Status.objects.create(user=user, text=f"s{i}") for i in range(8)]
+        Status.objects.filter(pk__in=[s.pk for s in statuses[2:6]]).update(created_at=timezone.now())
+        self.client.login(username="poster", password="pw")
+        url = reverse("user-statuses", args=[user.pk])
+        seen, _ = self.walk(url)
+        expected = Status.objects.filter(user=user).order_by("-created_at", "-id").values_list("id", flat=True)
+        self.assertEqual(seen, list(expected))
+
+        first = self.client.get(url, {"page_size": 3}).json()
+        Status.objects.create(user=user, text="newer")
+        # a new post does not shift the pages after an existing cursor
+        self.assertEqual(self.client.get(first["next"]).json()["results"][0]["text"], "s2")
+
+    def test_courses_and_invalid_cursor(self):
+        teacher = User.objects.create_user("teach", password="pw")
+        for title in ["B", "A", "C", "A", "D"]:
+            Course.objects.create(title=title, created_by=teacher)
+        self.client.login(username="teach", password="pw")
+        url = reverse("user-courses", args=[teacher.pk])
+        seen, _ = self.walk(url, key="title")
+        self.assertEqual(seen, ["A", "A", "B", "C", "D"])
+        self.assertEqual(self.client.get(url, {"cursor": "bogus"}).status_code, 404)
+        self.assertEqual(self.client.get(url, {"cursor": "WyJ4Il0"}).status_code, 404)
+
+    def test_timeline_seek_uses_index(self):
+        user = User.objects.create_user("poster")
+        qs = Status.objects.filter(user=user).order_by("-created_at", "-id")
+        plan = qs.filter(created_at__lt=timezone.now()).explain()
+        self.assertIn("USING INDEX", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
@@ -0,0 +1,52 @@
+from django.contrib.auth.models import Group, User
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Status
+from api.serializers import StatusSerializer, UserPublicSerializer
+from courses import access
+
+
+class RoleBatchingTests(TestCase):
+    def setUp(self):
+        self.teachers = Group.objects.get_or_create(name="Teacher")[0]
+        self.students = Group.objects.get_or_create(name="Student")[0]
+
+    def make_users(self, n):
+        users = [User.objects.create_user(f"u{User.objects.count()}") for _ in range(n)]
+        for i, user in enumerate(users):
+            (self.teachers if i % 3 == 0 else self.students).user_set.add(user)
+        return users
+
+    def list_users(self):
+        access.invalidate_groups()
+        # the page, then one query for every row's groups
+        with self.assertNumQueries(2):
+            resp = self.client.get(reverse("user-list"))
+        return resp.json()["results"]
+
+    def test_list_query_count_does_not_grow_with_page(self):
+        self.make_users(3)
+        small = self.list_users()
+        self.make_users(30)
+        full = self.list_users()
+        self.assertEqual((len(small), len(full)), (3, 20))
+        self.assertEqual([u["is_teacher"] for u in full[:4]], [True, False, False, True])
+
+    def test_status_page_loads_author_roles_once(self):
+        teacher, student = self.make_users(2)
+        for i in range(25):
+            Status.objects.create(user=teacher if i % 2 else student, text=f"s{i}")
+        access.invalidate_groups()
+        # the statuses with their authors, then every author's groups
+        with self.assertNumQueries(2):
+            data = StatusSerializer(Status.objects.select_related("user").order_by("id"), many=True).data
+        self.assertEqual([row["user"]["is_teacher"] for row in data[:2]], [False, True])
+
+    def test_single_user_and_group_changes(self):
+        (user,) = self.make_users(1)
+        access.invalidate_groups()
+        self.assertTrue(UserPublicSerializer(user).data["is_teacher"])
+        self.teachers.user_set.remove(user)
+        self.assertFalse(UserPublicSerializer(user).data["is_teacher"])
+        self.assertEqual(self.client.get(reverse("user-detail", args=[user.pk])).json()["is_teacher"], False)
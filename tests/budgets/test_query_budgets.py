@@ -0,0 +1,249 @@
+import difflib
+import os
+import re
+import sys
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from accounts.autocomplete import people_index
+from accounts.models import Status
+from courses import access
+from courses.autocomplete import course_index
+from courses.models import Assignment, Course, CourseBlock, CourseFeedback, CourseMaterial, Enrollment
+from rtchat.cache import recent_messages
+from rtchat.models import ChatMessage
+
+# Rows per table for the small dataset; the large one is GROWTH times that.
+SIZE = int(os.environ.get("QUERY_BUDGET_SIZE", 3))
+GROWTH = 4
+# The project urlconf is walked without its includes: the app urlconfs are
+# covered on their own, admin and auth are Django's.
+COVERED_URLCONFS = ("Elearning.urls", "courses.urls", "rtchat.urls", "accounts.urls", "api.urls")
+REPORT = bool(os.environ.get("QUERY_BUDGET_REPORT"))
+
+
+class Endpoint:
+    # One request to measure. ``budget`` maps role -> the most queries the
+    # request may run, cold caches included; the count must also come out
+    # the same on both dataset sizes.
+    def __init__(self, name, budget, method="get", args=(), data=None, stream=False):
+        self.name = name
+        self.budget = budget
+        self.method = method
+        self.args = args
+        self.data = data
+        self.stream = stream
+
+    def label(self, role):
+        return f"{self.method.upper()} {self.name} as {role}"
+
+
+ENDPOINTS = [
+    # Elearning/urls.py
+    Endpoint("home", {"teacher": 10, "student": 10, "anonymous": 0}),
+    Endpoint("signup", {"anonymous": 0}),
+    # courses/urls.py
+    Endpoint("course_list", {"teacher": 5, "student": 5, "anonymous": 3}),
+    Endpoint("course_create", {"teacher": 3, "student": 3}),
+    Endpoint("teacher_course_list", {"teacher": 5, "student": 3}),
+    Endpoint("course_detail", {"teacher": 9, "student": 3}, args=("course",)),
+    Endpoint("course_enroll", {"teacher": 3, "student": 4}),
+    Endpoint("student_course_list", {"teacher": 3, "student": 4}),
+    Endpoint("course_feedback", {"teacher": 3, "student": 5}, args=("course",)),
+    Endpoint("course_roster", {"teacher": 6, "student": 4}, args=("course",)),
+    Endpoint("course_roster_import", {"teacher": 8, "student": 4}, method="post", args=("course",), data="roster_csv"),
+    Endpoint("course_export", {"teacher": 4, "student": 4}, args=("course", "roster"), stream=True),
+    Endpoint("course_remove_student", {"teacher": 10, "student": 4}, method="post", args=("course", "classmate")),
+    Endpoint("course_block_student", {"teacher": 15, "student": 4}, method="post", args=("course", "classmate")),
+    Endpoint("course_unblock_student", {"teacher": 4, "student": 4}, method="post", args=("course", "classmate")),
+    Endpoint("material_create", {"teacher": 3, "student": 4}, args=("course",)),
+    Endpoint("course_home", {"teacher": 6, "student": 6}, args=("course",)),
+    # accounts/urls.py
+    Endpoint("people_search", {"teacher": 6, "student": 3}, data={"q": "stu"}),
+    Endpoint("me", {"teacher": 2, "student": 2}),
+    Endpoint("user_home", {"teacher": 10, "student": 10}, args=("username",)),
+    # rtchat/urls.py
+    Endpoint("course_chat", {"teacher": 4, "student": 5}, args=("course",)),
+    Endpoint("course_chat_history", {"teacher": 4, "student": 5}, args=("course",)),
+    Endpoint("course_chat_export", {"teacher": 4, "student": 4}, args=("course",), stream=True),
+    Endpoint("chat_search", {"teacher": 5, "student": 5}, data={"q": "hello"}),
+    Endpoint("course_chat_clear", {"teacher": 9, "student": 4}, method="post", args=("course_id",)),
+    # api/urls.py
+    Endpoint("user-list", {"teacher": 4, "student": 4}),
+    Endpoint("user-detail", {"teacher": 5, "student": 5}, args=("user",)),
+    Endpoint("user-me", {"teacher": 3, "student": 3}),
+    Endpoint("user-statuses", {"teacher": 5, "student": 5}, args=("user",)),
+    Endpoint("user-courses", {"teacher": 5, "student": 5}, args=("user",)),
+    Endpoint("autocomplete", {"teacher": 4, "student": 4}, data={"q": "co"}),
+    Endpoint("course_catalog", {"teacher": 4, "student": 4}),
+    Endpoint("enroll_bulk", {"teacher": 13, "student": 7}, method="post", data="enroll_json"),
+    Endpoint("jwt_create", {"anonymous": 1}, method="post", data="credentials"),
+    Endpoint("jwt_refresh", {"anonymous": 1}, method="post", data="refresh_token"),
+]
+
+
+def _normalize(sql):
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(\.\d+)?\b", "?", sql)
+    return re.sub(r"\(\?(, \?)*\)", "(?...)", sql)
+
+
+def _sql_diff(small, large):
+    lines = difflib.unified_diff(
+        [_normalize(q["sql"]) for q in small], [_normalize(q["sql"]) for q in large],
+        "small dataset", "large dataset", lineterm="", n=1,
+    )
+    return "\n".join(lines)
+
+
+def _url_names():
+    names = set()
+
+    def walk(patterns, nested):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if nested:
+                    walk(pattern.url_patterns, nested)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                names.add(pattern.name)
+
+    for urlconf in COVERED_URLCONFS:
+        walk(get_resolver(urlconf).url_patterns, nested=urlconf != "Elearning.urls")
+    return names
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class QueryBudgetTests(TestCase):
+    timings = []
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user("teacher", password="pw", first_name="Tess")
+        cls.student = User.objects.create_user("student", password="pw", first_name="Stu")
+        Group.objects.get_or_create(name="Teacher")[0].user_set.add(cls.teacher)
+        Group.objects.get_or_create(name="Student")[0].user_set.add(cls.student)
+        cls.course = Course.objects.create(title="Course main", created_by=cls.teacher, capacity=1000)
+        cls.classmate = User.objects.create_user("classmate")
+        Enrollment.objects.create(course=cls.course, user=cls.student)
+        Enrollment.objects.create(course=cls.course, user=cls.classmate)
+        cls.seeded = 0
+        cls.seed(SIZE)
+
+    @classmethod
+    def seed(cls, n):
+        # n more of everything: courses, classmates in the main course,
+        # materials, assignments, feedback, chat and statuses
+        start, cls.seeded = cls.seeded, cls.seeded + n
+        soon = date.today() + timedelta(days=5)
+        for i in range(start, cls.seeded):
+            course = Course.objects.create(title=f"Course {i}", created_by=cls.teacher, start_date=soon)
+            Enrollment.objects.create(course=course, user=cls.student)
+            peer = User.objects.create_user(f"student{i}", first_name=f"Peer{i}")
+            Group.objects.get_by_natural_key("Student").user_set.add(peer)
+            Enrollment.objects.create(course=cls.course, user=peer)
+            Enrollment.objects.create(course=course, user=peer)
+            CourseFeedback.objects.create(course=course, user=peer, rating=4)
+            CourseMaterial.objects.create(course=cls.course, title=f"Notes {i}", created_by=cls.teacher)
+            Assignment.objects.create(course=course, title=f"HW {i}", due_date=soon)
+            Assignment.objects.create(course=cls.course, title=f"Quiz {i}", due_date=soon)
+            CourseBlock.objects.create(course=course, user=cls.classmate, created_by=cls.teacher)
+            ChatMessage.objects.create(course=cls.course, user=peer, text=f"hello from {i}")
+            Status.objects.create(user=cls.teacher, text=f"status {i}")
+            Status.objects.create(user=cls.student, text=f"status {i}")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        # QUERY_BUDGET_REPORT=1 prints every endpoint's queries and timings
+        if not REPORT or not cls.timings:
+            return
+        width = max(len(label) for label, *_ in cls.timings)
+        out = [f"\n{'endpoint':<{width}}  queries  small ms  large ms"]
+        for label, queries, small_ms, large_ms in sorted(cls.timings, key=lambda row: -row[3]):
+            out.append(f"{label:<{width}}  {queries:>7}  {small_ms:>8.1f}  {large_ms:>8.1f}")
+        sys.stderr.write("\n".join(out) + "\n")
+
+    def payload(self, name):
+        if name == "roster_csv":
+            names = "\n".join(User.objects.filter(username__startswith="student").values_list("username", flat=True))
+            return {"file": SimpleUploadedFile("roster.csv", f"username\n{names}\n".encode(), "text/csv")}
+        if name == "enroll_json":
+            return {"courses": list(Course.objects.exclude(pk=self.course.pk).values_list("pk", flat=True))}
+        if name == "credentials":
+            return {"username": "student", "password": "pw"}
+        if name == "refresh_token":
+            return {"refresh": self.client.post(reverse("jwt_create"), {"username": "student", "password": "pw"}).json()["refresh"]}
+        return name
+
+    def url_args(self, endpoint, role):
+        values = {
+            "course": self.course.pk,
+            "course_id": self.course.pk,
+            "classmate": self.classmate.pk,
+            "user": self.teacher.pk,
+            "username": "teacher",
+        }
+        return [values.get(arg, arg) for arg in endpoint.args]
+
+    def measure(self, endpoint, role):
+        # cold caches, and every request rolled back so endpoints don't see
+        # each other's writes
+        user = {"teacher": self.teacher, "student": self.student}.get(role)
+        if user is None:
+            self.client.logout()
+        else:
+            self.client.force_login(user)
+        data = self.payload(endpoint.data) if isinstance(endpoint.data, str) else endpoint.data
+        url = reverse(endpoint.name, args=self.url_args(endpoint, role))
+        for reset in (access.invalidate, access.invalidate_groups, cache.clear, recent_messages.reset,
+                      people_index.reset, course_index.reset):
+            reset()
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                if endpoint.name == "enroll_bulk":
+                    resp = self.client.post(url, data, content_type="application/json")
+                else:
+                    resp = getattr(self.client, endpoint.method)(url, data)
+                if endpoint.stream and getattr(resp, "streaming", False):
+                    b"".join(resp.streaming_content)
+            elapsed = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+        self.assertLess(resp.status_code, 500, endpoint.label(role))
+        return queries.captured_queries, elapsed
+
+    def test_every_url_has_a_budget(self):
+        self.assertEqual(_url_names() - {e.name for e in ENDPOINTS}, set())
+
+    def test_query_counts_stay_within_budget_and_flat(self):
+        small = {}
+        for endpoint in ENDPOINTS:
+            for role in endpoint.budget:
+                small[endpoint, role] = self.measure(endpoint, role)
+
+        self.seed(SIZE * (GROWTH - 1))
+
+        for endpoint in ENDPOINTS:
+            for role, budget in endpoint.budget.items():
+                label = endpoint.label(role)
+                with self.subTest(label):
+                    (before, small_ms), (after, large_ms) = small[endpoint, role], self.measure(endpoint, role)
+                    self.timings.append((label, len(after), small_ms, large_ms))
+                    self.assertEqual(
+                        len(before), len(after),
+                        f"{label} runs {len(before)} queries on the small dataset and {len(after)} on the large "
+                        f"one:\n{_sql_diff(before, after)}",
+                    )
+                    self.assertLessEqual(
+                        len(after), budget,
+                        f"{label} is over budget:\n" + "\n".join(q["sql"] for q in after),
+                    )
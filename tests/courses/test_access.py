@@ -0,0 +1,74 @@
+from django.contrib.auth.models import Group, User
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from courses import access
+from courses.access import CourseAccess
+from courses.models import Course, CourseBlock, Enrollment
+
+
+class CourseAccessTests(TestCase):
+    def setUp(self):
+        access.invalidate()
+        access.invalidate_groups()
+        self.teacher = User.objects.create_user("teach", password="pw")
+        self.student = User.objects.create_user("stud", password="pw")
+        self.other = User.objects.create_user("other", password="pw")
+        Group.objects.get_or_create(name="Teacher")[0].user_set.add(self.teacher)
+        Group.objects.get_or_create(name="Student")[0].user_set.add(self.student)
+        self.course = Course.objects.create(title="Algebra 101", created_by=self.teacher)
+        Enrollment.objects.create(user=self.student, course=self.course, role="STUDENT")
+
+    def _request(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        return request
+
+    def test_roles(self):
+        self.assertTrue(CourseAccess(self.teacher).is_teacher(self.course))
+        self.assertTrue(CourseAccess(self.student).is_student(self.course))
+        self.assertFalse(CourseAccess(self.other).is_member(self.course))
+        self.assertEqual(access.resolve_role(self.other.id, self.course.id + 1000), (False, None))
+
+    def test_request_memo_and_shared_cache(self):
+        request = self._request(self.student)
+        with self.assertNumQueries(2):
+            checker = CourseAccess.for_request(request)
+            self.assertTrue(checker.is_member(self.course.id))
+            self.assertFalse(checker.is_teacher(self.course.id))
+            self.assertTrue(checker.in_group("Student"))
+            self.assertFalse(checker.in_group("Teacher"))
+        self.assertIs(CourseAccess.for_request(request), checker)
+        with self.assertNumQueries(0):
+            fresh = CourseAccess.for_request(self._request(self.student))
+            self.assertTrue(fresh.is_student(self.course.id))
+            self.assertTrue(fresh.in_group("Student"))
+
+    def test_enrollment_and_block_changes_invalidate(self):
+        self.assertTrue(CourseAccess(self.student).is_student(self.course))
+        Enrollment.objects.filter(user=self.student, course=self.course).delete()
+        self.assertFalse(CourseAccess(self.student).is_member(self.course))
+
+        self.assertFalse(CourseAccess(self.other).is_member(self.course))
+        Enrollment.objects.create(user=self.other, course=self.course, role="TEACHER")
+        self.assertTrue(CourseAccess(self.other).is_teacher(self.course))
+
+        CourseBlock.objects.create(course=self.course, user=self.student)
+        self.assertEqual(access.resolve_role(self.student.id, self.course.id), (True, None))
+
+    def test_group_changes_invalidate(self):
+        self.assertFalse(CourseAccess(self.other).in_group("Teacher"))
+        Group.objects.get(name="Teacher").user_set.add(self.other)
+        self.assertTrue(CourseAccess(self.other).in_group("Teacher"))
+        self.other.groups.clear()
+        self.assertFalse(CourseAccess(self.other).in_group("Teacher"))
+
+    def test_course_home_uses_resolver(self):
+        url = reverse("course_home", args=[self.course.id])
+        self.client.login(username="other", password="pw")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.login(username="stud", password="pw")
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.context["is_teacher"])
+        self.client.login(username="teach", password="pw")
+        self.assertTrue(self.client.get(url).context["is_teacher"])
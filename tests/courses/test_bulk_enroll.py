@@ -0,0 +1,92 @@
+from unittest import mock
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from courses import access
+from courses.access import CourseAccess
+from courses.enrollment import (
+    ALREADY_ENROLLED, BLOCKED, ENROLLED, FULL, NOT_FOUND, WAITLISTED, bulk_enroll,
+)
+from courses.models import Course, CourseBlock, Enrollment, WaitlistEntry
+from jobs.models import Job
+
+
+class BulkEnrollTests(TestCase):
+    def setUp(self):
+        access.invalidate()
+        self.teacher = User.objects.create_user("teach", password="pw", email="t@ex.com")
+        Group.objects.get_or_create(name="Teacher")[0].user_set.add(self.teacher)
+        self.student = User.objects.create_user("stud", password="pw")
+        Group.objects.get_or_create(name="Student")[0].user_set.add(self.student)
+        self.courses = [Course.objects.create(title=f"Course {i}", created_by=self.teacher) for i in range(10)]
+
+    def enroll_view(self, courses):
+        access.invalidate()
+        access.invalidate_groups()
+        self.client.login(username="stud", password="pw")
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(reverse("course_enroll"), {"courses": [c.pk for c in courses]})
+        self.assertEqual(resp.status_code, 302)
+        return len(queries)
+
+    def test_multi_enroll_cost_does_not_grow_with_courses(self):
+        with mock.patch("courses.enrollment.broadcast") as broadcast:
+            two = self.enroll_view(self.courses[:2])
+            Enrollment.objects.all().delete()
+            Job.objects.all().delete()
+            ten = self.enroll_view(self.courses)
+        # one job insert per course is deferred to commit; everything else is fixed
+        self.assertEqual(ten - two, 8)
+        self.assertEqual(Enrollment.objects.filter(user=self.student).count(), 10)
+        self.assertEqual(broadcast.call_count, 12)
+        self.assertEqual(Job.objects.filter(name__endswith="email_teacher_enrollments").count(), 10)
+        self.assertTrue(CourseAccess(self.student).is_student(self.courses[9]))
+        self.assertEqual({c.student_count for c in Course.objects.all()}, {1})
+
+    def test_outcomes_and_partial_capacity(self):
+        capped, waitlisted, blocked = self.courses[:3]
+        Course.objects.filter(pk=capped.pk).update(capacity=2)
+        Course.objects.filter(pk=waitlisted.pk).update(capacity=1, waitlist_enabled=True)
+        students = [User.objects.create_user(f"s{i}") for i in range(3)]
+        CourseBlock.objects.create(course=blocked, user=students[0], created_by=self.teacher)
+        Enrollment.objects.create(course=blocked, user=students[1])
+        ids = [s.pk for s in students]
+
+        results = bulk_enroll([capped.pk, waitlisted.pk, blocked.pk, 999999], ids)
+        self.assertEqual([results[capped.pk, i] for i in ids], [ENROLLED, ENROLLED, FULL])
+        self.assertEqual([results[waitlisted.pk, i] for i in ids], [ENROLLED, WAITLISTED, WAITLISTED])
+        self.assertEqual([results[blocked.pk, i] for i in ids], [BLOCKED, ALREADY_ENROLLED, ENROLLED])
+        self.assertEqual(results[999999, ids[0]], NOT_FOUND)
+        self.assertEqual(
+            list(Course.objects.filter(pk__in=[capped.pk, waitlisted.pk, blocked.pk]).order_by("pk").values_list("student_count", flat=True)),
+            [2, 1, 2],
+        )
+        self.assertEqual(WaitlistEntry.objects.filter(course=waitlisted).count(), 2)
+
+    def test_api_bulk_enroll(self):
+        url = reverse("enroll_bulk")
+        self.client.login(username="stud", password="pw")
+        resp = self.client.post(url, {"courses": [self.courses[0].pk, self.courses[1].pk]}, content_type="application/json")
+        self.assertEqual([r["result"] for r in resp.json()["results"]], [ENROLLED, ENROLLED])
+        other = User.objects.create_user("other")
+        resp = self.client.post(url, {"courses": [self.courses[2].pk], "users": [other.pk]}, content_type="application/json")
+        self.assertEqual(resp.status_code, 403)
+
+        self.client.login(username="teach", password="pw")
+        resp = self.client.post(url, {"courses": [self.courses[3].pk]}, content_type="application/json")
+        self.assertEqual(resp.status_code, 403)
+        resp = self.client.post(
+            url, {"courses": [self.courses[3].pk], "users": [self.teacher.pk]}, content_type="application/json"
+        )
+        self.assertEqual(resp.status_code, 403)
+        self.assertFalse(Enrollment.objects.filter(course=self.courses[3]).exists())
+        resp = self.client.post(
+            url, {"courses": [self.courses[2].pk], "users": [other.pk, self.student.pk]}, content_type="application/json"
+        )
+        self.assertEqual(resp.json()["results"], [
+            {"course": self.courses[2].pk, "user": other.pk, "result": ENROLLED},
+            {"course": self.courses[2].pk, "user": self.student.pk, "result": ENROLLED},
+        ])
+        self.assertEqual(self.client.post(url, {"courses": []}, content_type="application/json").status_code, 400)
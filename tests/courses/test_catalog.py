@@ -0,0 +1,113 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from courses import versions
+from courses.catalog import catalog_page, catalog_queryset
+from courses.enrollment import bulk_enroll
+from courses.models import Course, CourseFeedback, Enrollment
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user("teach")
+        self.students = [User.objects.create_user(f"s{i}") for i in range(3)]
+
+    def course(self, title, **fields):
+        return Course.objects.create(title=title, created_by=self.teacher, **fields)
+
+    def titles(self, **filters):
+        return [row["title"] for row in catalog_page(filters)["results"]]
+
+    def test_filters(self):
+        early = self.course("Early", start_date=date(2030, 1, 10), capacity=1)
+        late = self.course("Late", start_date=date(2030, 6, 1))
+        self.course("Undated")
+        Enrollment.objects.create(course=early, user=self.students[0])
+        CourseFeedback.objects.create(course=late, user=self.students[1], rating=5)
+        CourseFeedback.objects.create(course=late, user=self.students[2], rating=4)
+        CourseFeedback.objects.create(course=early, user=self.students[0], rating=3)
+
+        self.assertEqual(self.titles(), ["Undated", "Late", "Early"])
+        self.assertEqual(self.titles(start_from=date(2030, 2, 1)), ["Late"])
+        self.assertEqual(self.titles(start_from=date(2030, 1, 1), start_to=date(2030, 1, 31)), ["Early"])
+        self.assertEqual(self.titles(open_seats=True), ["Undated", "Late"])
+        self.assertEqual(self.titles(min_rating=4.5), ["Late"])
+        self.assertEqual(self.titles(min_rating=3), ["Late", "Early"])
+        row = catalog_page({})["results"][1]
+        self.assertEqual((row["teacher"], row["rating"], row["rating_count"], row["seats_left"]), ("teach", 4.5, 2, None))
+
+    def test_cached_pages_follow_course_changes(self):
+        course = self.course("Algebra", capacity=1)
+        self.assertEqual(self.titles(open_seats=True), ["Algebra"])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.titles(open_seats=True), ["Algebra"])
+        Enrollment.objects.create(course=course, user=self.students[0])
+        self.assertEqual(self.titles(open_seats=True), [])
+        course.title = "Algebra I"
+        course.save()
+        self.assertEqual(self.titles(), ["Algebra I"])
+
+    def test_catalog_version_moves_only_with_what_the_listing_shows(self):
+        capped = self.course("Capped", capacity=5)
+        open_ended = self.course("Open")
+
+        def catalog_version():
+            return versions.fetch([versions.CATALOG])[versions.CATALOG][0]
+
+        before = catalog_version()
+        Enrollment.objects.create(course=open_ended, user=self.students[0])
+        Enrollment.objects.create(course=capped, user=self.teacher, role="TEACHER")
+        bulk_enroll([open_ended.pk], [self.students[1].pk], notify=False)
+        feedback = CourseFeedback.objects.create(course=capped, user=self.students[0], rating=4)
+        self.assertEqual(catalog_version(), before + 1)
+        feedback.comment = "Great"
+        feedback.save()
+        self.assertEqual(catalog_version(), before + 1)
+
+        feedback.rating = 5
+        feedback.save()
+        Enrollment.objects.create(course=capped, user=self.students[1])
+        bulk_enroll([capped.pk], [self.students[2].pk], notify=False)
+        Enrollment.objects.filter(course=capped, user=self.students[1]).delete()
+        self.assertEqual(catalog_version(), before + 5)
+        self.assertEqual(catalog_page({})["results"][1]["seats_left"], 4)
+
+    def test_api_pages_with_cursor(self):
+        for i in range(7):
+            self.course(f"C{i}")
+        url, params, seen = reverse("course_catalog"), {"page_size": 3}, []
+        while url:
+            data = self.client.get(url, params).json()
+            seen += [row["title"] for row in data["results"]]
+            url, params = data["next"], None
+        self.assertEqual(seen, [f"C{i}" for i in reversed(range(7))])
+        self.assertEqual(self.client.get(reverse("course_catalog"), {"cursor": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("course_catalog"), {"min_rating": 9}).status_code, 400)
+
+    def test_page_query_count_does_not_grow_with_rows(self):
+        def render():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(reverse("course_list"))
+            self.assertEqual(resp.status_code, 200)
+            return len(queries)
+
+        self.course("One")
+        small = render()
+        for i in range(24):
+            self.course(f"More {i}")
+        self.assertEqual(render(), small)
+        resp = self.client.get(reverse("course_list"))
+        self.assertContains(resp, "by teach")
+        self.assertContains(resp, "Next page")
+
+    def test_newest_first_scan_uses_index(self):
+        plan = catalog_queryset({}).explain()
+        self.assertNotIn("TEMP B-TREE", plan)
@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+from courses.models import Course, CourseFeedback, CourseMaterial, CourseRatingSummary, Enrollment
+from rtchat.models import ChatMessage
+from rtchat.search import search_messages
+
+SIZES = {"users": 60, "courses": 12, "enrollments": 200, "messages": 400, "feedback": 40, "materials": 30}
+
+
+def generate(**options):
+    options = {**SIZES, "assignments": 10, "anchor": "2025-03-01", "batch_size": 64, **options}
+    call_command("generate_data", *(f"--{k.replace('_', '-')}={v}" for k, v in options.items()), stdout=StringIO())
+
+
+def snapshot():
+    # the dataset by natural keys, since primary keys depend on what was there before
+    courses = {pk: n for n, pk in enumerate(Course.objects.order_by("pk").values_list("pk", flat=True))}
+    return {
+        "users": list(User.objects.order_by("pk").values_list("username", "first_name", "last_name")),
+        "courses": list(Course.objects.order_by("pk").values_list("title", "start_date", "capacity")),
+        "enrollments": sorted(
+            (courses[c], u, role, at) for c, u, role, at in
+            Enrollment.objects.values_list("course_id", "user__username", "role", "created_at")
+        ),
+        "messages": [
+            (courses[c], u, text, str(uid), at) for c, u, text, uid, at in
+            ChatMessage.objects.order_by("pk").values_list("course_id", "user__username", "text", "uid", "created_at")
+        ],
+        "feedback": sorted(
+            (courses[c], u, rating) for c, u, rating in
+            CourseFeedback.objects.values_list("course_id", "user__username", "rating")
+        ),
+    }
+
+
+def wipe():
+    Course.objects.all().delete()
+    User.objects.all().delete()
+
+
+class DataGeneratorTests(TestCase):
+    def test_generates_requested_rows_and_derived_data(self):
+        generate()
+        self.assertEqual(User.objects.count(), 60)
+        self.assertEqual(Course.objects.count(), 12)
+        self.assertEqual(Enrollment.objects.filter(role="STUDENT").count(), 200)
+        self.assertEqual(Enrollment.objects.filter(role="TEACHER").count(), 12)
+        self.assertEqual(ChatMessage.objects.count(), 400)
+        self.assertEqual(CourseFeedback.objects.count(), 40)
+        self.assertEqual(CourseMaterial.objects.count(), 30)
+
+        for course in Course.objects.annotate(n=Count("enrollments")):
+            self.assertEqual(course.student_count, course.n - 1)
+            self.assertTrue(course.capacity is None or course.capacity >= course.student_count)
+        self.assertEqual(sum(CourseRatingSummary.objects.values_list("count", flat=True)), 40)
+        self.assertFalse(CourseFeedback.objects.exclude(user__enrollments__course=F("course")).exists())
+
+        sizes = sorted(Course.objects.values_list("student_count", flat=True))
+        self.assertGreater(sizes[-1], 4 * sizes[len(sizes) // 2])
+
+        teacher = User.objects.get(pk=Course.objects.order_by("pk")[0].created_by_id)
+        word = ChatMessage.objects.filter(course__created_by=teacher).first().text.split()[0]
+        self.assertTrue(search_messages(teacher.id, word))
+
+    def test_same_seed_same_data(self):
+        generate(seed=3)
+        first = snapshot()
+        wipe()
+        generate(seed=3)
+        self.assertEqual(snapshot(), first)
+        wipe()
+        generate(seed=4)
+        self.assertNotEqual(snapshot()["messages"], first["messages"])
+
+    def test_counts_scale_and_existing_prefix_is_refused(self):
+        generate(scale=0.5, messages=0)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Enrollment.objects.filter(role="STUDENT").count(), 100)
+        with self.assertRaises(CommandError):
+            generate()
+        generate(prefix="more", users=5, courses=1, enrollments=3, messages=5, feedback=0, materials=0)
+        self.assertEqual(User.objects.filter(username__startswith="more").count(), 5)
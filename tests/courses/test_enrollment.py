@@ -0,0 +1,148 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from courses import enrollment
+from courses.enrollment import (
+    ALREADY_ENROLLED, BLOCKED, ENROLLED, FULL, WAITLISTED, CourseFull, bulk_enroll, rebuild_counts,
+)
+from courses.models import Course, Enrollment, WaitlistEntry
+
+
+class EnrollmentCounterTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user("teach", password="pw")
+        Group.objects.get_or_create(name="Teacher")[0].user_set.add(self.teacher)
+        self.course = Course.objects.create(title="Algebra 101", created_by=self.teacher, capacity=2)
+        self.students = [User.objects.create_user(f"s{i}", password="pw") for i in range(4)]
+
+    def enroll(self, student):
+        return bulk_enroll([self.course.pk], [student.pk], notify=False)[self.course.pk, student.pk]
+
+    def count(self):
+        self.course.refresh_from_db()
+        return self.course.student_count
+
+    def test_capacity_is_enforced_without_waitlist(self):
+        results = [self.enroll(s) for s in self.students[:3]]
+        self.assertEqual(results, [ENROLLED, ENROLLED, FULL])
+        self.assertEqual(self.enroll(self.students[0]), ALREADY_ENROLLED)
+        self.assertEqual(self.count(), 2)
+        Enrollment.objects.create(user=self.students[3], course=self.course, role="TEACHER")
+        self.assertEqual(self.count(), 2)
+
+    def test_waitlist_promotes_on_remove_and_block(self):
+        self.course.waitlist_enabled = True
+        self.course.save()
+        results = [self.enroll(s) for s in self.students]
+        self.assertEqual(results, [ENROLLED, ENROLLED, WAITLISTED, WAITLISTED])
+
+        self.client.login(username="teach", password="pw")
+        self.client.post(reverse("course_remove_student", args=[self.course.id, self.students[0].id]))
+        self.assertTrue(Enrollment.objects.filter(course=self.course, user=self.students[2]).exists())
+        self.assertEqual(self.count(), 2)
+
+        self.client.post(reverse("course_block_student", args=[self.course.id, self.students[1].id]))
+        self.assertTrue(Enrollment.objects.filter(course=self.course, user=self.students[3]).exists())
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.assertEqual(self.enroll(self.students[1]), BLOCKED)
+        self.assertEqual(self.count(), 2)
+
+    def test_course_edit_keeps_counter_and_listing_reads_it(self):
+        self.enroll(self.students[0])
+        stale = Course.objects.get(pk=self.course.pk)
+        self.enroll(self.students[1])
+        stale.title = "Algebra 102"
+        stale.save()
+        self.assertEqual(self.count(), 2)
+
+        self.client.login(username="teach", password="pw")
+        with self.assertNumQueries(5):
+            resp = self.client.get(reverse("teacher_course_list"))
+        self.assertContains(resp, "Students: 2 / 2")
+
+    def test_course_delete_and_rebuild(self):
+        self.course.waitlist_enabled = True
+        self.course.save()
+        for s in self.students:
+            self.enroll(s)
+        Course.objects.filter(pk=self.course.pk).update(student_count=0)
+        rebuild_counts()
+        self.assertEqual(self.count(), 2)
+        self.course.delete()
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_full_course_is_a_validation_error(self):
+        for s in self.students[:2]:
+            self.enroll(s)
+        with self.assertRaises(ValidationError):
+            Enrollment.objects.create(course=self.course, user=self.students[2])
+        with self.assertRaises(CourseFull):
+            Enrollment.objects.get_or_create(course=self.course, user=self.students[2])
+        teacher_row = Enrollment.objects.create(course=self.course, user=self.students[3], role="TEACHER")
+        teacher_row.role = "STUDENT"
+        with self.assertRaises(ValidationError):
+            teacher_row.full_clean()
+        Enrollment.objects.get(course=self.course, user=self.students[0]).full_clean()
+
+        admin = User.objects.create_superuser("admin", "admin@ex.com", "pw")
+        self.client.force_login(admin)
+        resp = self.client.post(
+            reverse("admin:courses_enrollment_add"),
+            {"user": self.students[2].pk, "course": self.course.pk, "role": "STUDENT"},
+        )
+        self.assertContains(resp, "This course is full.")
+        self.assertEqual(self.count(), 2)
+
+    def test_bulk_enroll_hands_back_seats_of_raced_rows(self):
+        claim = enrollment._claim_seats
+
+        def raced_claim(courses, wanted):
+            # another request enrolls s0 between the checks and the seat claim
+            Enrollment.objects.bulk_create([Enrollment(course=self.course, user=self.students[0], role="STUDENT")])
+            Course.objects.filter(pk=self.course.pk).update(student_count=F("student_count") + 1)
+            return claim(courses, wanted)
+
+        ids = [s.pk for s in self.students[:2]]
+        with mock.patch("courses.enrollment._claim_seats", raced_claim):
+            results = bulk_enroll([self.course.pk], ids, notify=False)
+        self.assertEqual([results[self.course.pk, i] for i in ids], [ALREADY_ENROLLED, ENROLLED])
+        self.assertEqual(self.count(), 2)
+
+
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    def test_parallel_enrollments_never_oversell(self):
+        owner = User.objects.create_user("teach")
+        course = Course.objects.create(title="Popular", created_by=owner, capacity=7)
+        students = [User.objects.create_user(f"s{i}") for i in range(40)]
+        start = threading.Barrier(8)
+
+        def attempt(student):
+            try:
+                try:
+                    start.wait(timeout=5)
+                except threading.BrokenBarrierError:
+                    pass
+                for _ in range(200):
+                    try:
+                        return bulk_enroll([course.pk], [student.pk])[course.pk, student.pk]
+                    except OperationalError:  # SQLite "database is locked"; the transaction rolled back, retry
+                        time.sleep(0.005)
+                raise AssertionError("enrollment never got the lock")
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(attempt, students))
+
+        course.refresh_from_db()
+        self.assertEqual(results.count(ENROLLED), 7)
+        self.assertEqual(results.count(FULL), 33)
+        self.assertEqual(Enrollment.objects.filter(course=course).count(), 7)
+        self.assertEqual(course.student_count, 7)
@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from courses import access
+from courses.models import Course, CourseFeedback, Enrollment
+from rtchat.history import clear_chat
+from rtchat.models import ChatMessage
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        access.invalidate()
+        self.teacher = User.objects.create_user("teach", password="pw")
+        Group.objects.get_or_create(name="Teacher")[0].user_set.add(self.teacher)
+        self.course = Course.objects.create(title="Algebra", created_by=self.teacher)
+        self.students = [
+            User.objects.create_user(f"s{i}", password="pw" if i == 0 else None, first_name=f"Ann{i}", email=f"s{i}@ex.com")
+            for i in range(5)
+        ]
+        for student in self.students:
+            Enrollment.objects.create(course=self.course, user=student)
+        CourseFeedback.objects.create(course=self.course, user=self.students[0], rating=4, comment='Good, "clear"')
+        self.client.login(username="teach", password="pw")
+
+    def export(self, dataset, fmt="csv"):
+        resp = self.client.get(reverse("course_export", args=[self.course.pk, dataset]), {"format": fmt})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        return b"".join(resp.streaming_content).decode()
+
+    def test_roster_csv_and_ndjson(self):
+        rows = list(csv.DictReader(io.StringIO(self.export("roster"))))
+        self.assertEqual([r["username"] for r in rows], [f"s{i}" for i in range(5)])
+        self.assertEqual(rows[2]["first_name"], "Ann2")
+        self.assertEqual(rows[2]["email"], "s2@ex.com")
+
+        lines = self.export("roster", "ndjson").splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])["username"], "s0")
+
+    def test_feedback_quotes_text(self):
+        rows = list(csv.DictReader(io.StringIO(self.export("feedback"))))
+        self.assertEqual([(r["username"], r["rating"], r["comment"]) for r in rows], [("s0", "4", 'Good, "clear"')])
+
+    def test_chat_export_hides_cleared_messages(self):
+        ChatMessage.objects.create(course=self.course, user=self.teacher, text="before")
+        clear_chat(self.course.pk)
+        ChatMessage.objects.create(course=self.course, user=self.students[1], text="after")
+        resp = self.client.get(reverse("course_chat_export", args=[self.course.pk]), {"format": "ndjson"})
+        rows = [json.loads(line) for line in b"".join(resp.streaming_content).splitlines()]
+        self.assertEqual([(r["username"], r["text"]) for r in rows], [("s1", "after")])
+
+    def test_teachers_only_and_bad_format(self):
+        url = reverse("course_export", args=[self.course.pk, "roster"])
+        self.assertEqual(self.client.get(url, {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("course_export", args=[self.course.pk, "grades"])).status_code, 404)
+        self.client.login(username="s0", password="pw")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(reverse("course_chat_export", args=[self.course.pk])).status_code, 403)
+
+    @override_settings(EXPORT={"CHUNK_SIZE": 2, "BUFFER_BYTES": 1})
+    def test_header_is_sent_before_rows_are_queried(self):
+        resp = self.client.get(reverse("course_export", args=[self.course.pk, "roster"]))
+        content = iter(resp.streaming_content)
+        with CaptureQueriesContext(connection) as queries:
+            header = next(content)
+        self.assertEqual(header, b"username,first_name,last_name,email,enrolled_at\r\n")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(len(list(content)), 5)
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.teacher)
+        resp = await self.async_client.get(reverse("course_export", args=[self.course.pk, "roster"]))
+        self.assertTrue(resp.is_async)
+        body = b"".join([chunk async for chunk in resp.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), 6)
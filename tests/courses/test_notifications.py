@@ -0,0 +1,24 @@
+from unittest.mock import patch
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import SimpleTestCase
+from courses.notifications import NotificationMailer
+
+
+class NotificationMailerTests(SimpleTestCase):
+    def test_one_connection_per_batch(self):
+        recipients = (f"s{i}@ex.com" for i in range(25))
+        with patch.object(EmailBackend, "open", autospec=True, return_value=True) as opened:
+            sent = NotificationMailer(batch_size=10).send("Hi", "Body", recipients)
+        self.assertEqual(sent, 25)
+        self.assertEqual(opened.call_count, 3)
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertTrue(all(len(m.to) == 1 for m in mail.outbox))
+
+    @patch("courses.notifications.time.sleep")
+    def test_rate_limit_sleeps(self, sleep):
+        NotificationMailer(batch_size=5, rate=10).send("Hi", "Body", [f"s{i}@ex.com" for i in range(15)])
+        # between batches only, not after the last one
+        self.assertEqual(sleep.call_count, 2)
+        self.assertAlmostEqual(sleep.call_args_list[0].args[0], 0.5, delta=0.1)
+        self.assertAlmostEqual(sleep.call_args_list[-1].args[0], 1.0, delta=0.2)
@@ -0,0 +1,68 @@
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from courses.models import Course, CourseFeedback, CourseRatingSummary, Enrollment
+
+
+class RatingSummaryTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user("teach", password="pw")
+        Group.objects.get_or_create(name="Teacher")[0].user_set.add(self.teacher)
+        Group.objects.get_or_create(name="Student")
+        self.course = Course.objects.create(title="Algebra 101", created_by=self.teacher)
+        self.students = [User.objects.create_user(f"s{i}", password="pw") for i in range(3)]
+        for student in self.students:
+            Enrollment.objects.create(user=student, course=self.course, role="STUDENT")
+
+    def summary(self):
+        return CourseRatingSummary.objects.get(course=self.course)
+
+    def test_create_edit_delete_keep_summary_exact(self):
+        self.assertEqual((self.summary().count, self.summary().average), (0, None))
+        feedbacks = [
+            CourseFeedback.objects.create(course=self.course, user=s, rating=r)
+            for s, r in zip(self.students, [5, 4, 4])
+        ]
+        summary = self.summary()
+        self.assertEqual((summary.count, summary.total), (3, 13))
+        self.assertEqual(summary.histogram, {1: 0, 2: 0, 3: 0, 4: 2, 5: 1})
+
+        feedbacks[0].rating = 1
+        feedbacks[0].save()
+        feedbacks[1].comment = "no rating change"
+        feedbacks[1].save()
+        feedbacks[2].delete()
+        summary = self.summary()
+        self.assertEqual((summary.count, summary.total), (2, 5))
+        self.assertEqual(summary.histogram, {1: 1, 2: 0, 3: 0, 4: 1, 5: 0})
+        self.assertEqual(summary.average, 2.5)
+        self.assertEqual(summary.distribution[-1], {"rating": 1, "count": 1, "percent": 50})
+
+    def test_leave_feedback_edits_move_the_rating(self):
+        self.client.login(username="s0", password="pw")
+        url = reverse("course_feedback", args=[self.course.id])
+        self.client.post(url, {"rating": 2, "comment": ""})
+        self.client.post(url, {"rating": 5, "comment": "better now"})
+        summary = self.summary()
+        self.assertEqual((summary.count, summary.total, summary.rating_2, summary.rating_5), (1, 5, 0, 1))
+
+    def test_pages_read_the_summary(self):
+        CourseFeedback.objects.create(course=self.course, user=self.students[0], rating=3)
+        self.client.login(username="teach", password="pw")
+        resp = self.client.get(reverse("course_roster", args=[self.course.id]))
+        self.assertEqual(resp.context["avg_rating"], 3)
+        resp = self.client.get(reverse("course_detail", args=[self.course.id]))
+        self.assertContains(resp, "(1 review)")
+
+    def test_rebuild_command(self):
+        for s, r in zip(self.students, [5, 3, 1]):
+            CourseFeedback.objects.create(course=self.course, user=s, rating=r)
+        CourseRatingSummary.objects.filter(course=self.course).update(count=99, total=0, rating_5=7)
+        other = Course.objects.create(title="Empty", created_by=self.teacher)
+        CourseRatingSummary.objects.filter(course=other).delete()
+        call_command("rebuild_rating_summaries", stdout=open("/dev/null", "w"))
+        summary = self.summary()
+        self.assertEqual((summary.count, summary.total), (3, 9))
+        self.assertEqual(summary.histogram, {1: 1, 2: 0, 3: 1, 4: 0, 5: 1})
+        self.assertEqual(CourseRatingSummary.objects.get(course=other).count, 0)
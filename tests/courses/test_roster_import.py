@@ -0,0 +1,145 @@
+import csv
+import io
+import tracemalloc
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from courses import access
+from courses.enrollment import ALREADY_ENROLLED, BLOCKED, ENROLLED, NOT_FOUND, WAITLISTED
+from courses.models import Course, CourseBlock, Enrollment
+from courses.roster_import import AMBIGUOUS, DUPLICATE, INVALID, TOO_MANY_ROWS, import_roster
+from jobs.models import Job
+
+
+def _lines(*rows):
+    return io.StringIO("".join(f"{row}\r\n" for row in rows))
+
+
+class _Report:
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, row):
+        self.rows.append(row)
+
+
+class RosterImportTests(TestCase):
+    def setUp(self):
+        access.invalidate()
+        self.teacher = User.objects.create_user("teach", password="pw", email="t@ex.com")
+        Group.objects.get_or_create(name="Teacher")[0].user_set.add(self.teacher)
+        self.course = Course.objects.create(title="Algebra", created_by=self.teacher, capacity=4)
+
+    @mock.patch("courses.roster_import.broadcast")
+    def test_row_outcomes(self, broadcast):
+        ann = User.objects.create_user("ann", email="Ann@Example.com")
+        bob = User.objects.create_user("bob")
+        User.objects.create_user("cat")
+        blocked = User.objects.create_user("dan")
+        User.objects.create_user("twin1", email="twin@example.com")
+        User.objects.create_user("twin2", email="TWIN@example.com")
+        Enrollment.objects.create(course=self.course, user=bob)
+        CourseBlock.objects.create(course=self.course, user=blocked, created_by=self.teacher)
+
+        report = _Report()
+        with self.captureOnCommitCallbacks(execute=True):
+            totals = import_roster(self.course, _lines(
+                "username,name", "ann@example.com", "bob", "dan", "nobody", "", "twin@example.com",
+                "ann", "cat", "eve",
+            ), report)
+
+        self.assertEqual(report.rows, [
+            ["row", "identifier", "result"],
+            [2, "ann@example.com", ENROLLED],
+            [3, "bob", ALREADY_ENROLLED],
+            [4, "dan", BLOCKED],
+            [5, "nobody", NOT_FOUND],
+            [6, "", INVALID],
+            [7, "twin@example.com", AMBIGUOUS],
+            [8, "ann", DUPLICATE],
+            [9, "cat", ENROLLED],
+            [10, "eve", NOT_FOUND],
+        ])
+        self.assertEqual(totals[ENROLLED], 2)
+        self.assertTrue(Enrollment.objects.filter(course=self.course, user=ann).exists())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.student_count, 3)
+        broadcast.assert_called_once()
+        self.assertEqual(broadcast.call_args[0][2]["count"], 2)
+        self.assertEqual(Job.objects.filter(name__endswith="email_teacher_roster_import").count(), 1)
+
+    @override_settings(ROSTER_IMPORT={"CHUNK_SIZE": 2, "MAX_ROWS": 5})
+    @mock.patch("courses.roster_import.broadcast")
+    def test_capacity_and_row_limit_across_batches(self, broadcast):
+        Course.objects.filter(pk=self.course.pk).update(waitlist_enabled=True)
+        self.course.refresh_from_db()
+        for i in range(7):
+            User.objects.create_user(f"s{i}")
+        totals = import_roster(self.course, _lines(*(f"s{i}" for i in range(7))))
+        self.assertEqual(totals, {ENROLLED: 4, WAITLISTED: 1, TOO_MANY_ROWS: 1})
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 4)
+        self.assertFalse(User.objects.filter(username="s6", enrollments__isnull=False).exists())
+
+    @override_settings(ROSTER_IMPORT={"CHUNK_SIZE": 2, "MAX_ROWS": 100})
+    @mock.patch("courses.roster_import.broadcast")
+    def test_bad_rows_and_duplicates_across_batches(self, broadcast):
+        ann = User.objects.create_user("ann", email="ann@example.com")
+        User.objects.create_user("bob")
+        report = _Report()
+        import_roster(self.course, _lines("ann", "bob", "x" * 200000, "ann@example.com", "bob"), report)
+        self.assertEqual(report.rows[1:], [
+            [1, "ann", ENROLLED],
+            [2, "bob", ENROLLED],
+            [3, "", INVALID],
+            [4, "ann@example.com", DUPLICATE],
+            [5, "bob", DUPLICATE],
+        ])
+        self.assertEqual(Enrollment.objects.filter(course=self.course, user=ann).count(), 1)
+
+    def test_view_returns_report_and_is_teacher_only(self):
+        User.objects.create_user("ann")
+        url = reverse("course_roster_import", args=[self.course.pk])
+        upload = SimpleUploadedFile("roster.csv", "﻿username\nann\nghost\n".encode("utf-8"), "text/csv")
+
+        User.objects.create_user("stud", password="pw")
+        self.client.login(username="stud", password="pw")
+        self.assertEqual(self.client.post(url, {"file": upload}).status_code, 403)
+
+        upload.seek(0)
+        self.client.login(username="teach", password="pw")
+        resp = self.client.post(url, {"file": upload})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("attachment", resp["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(b"".join(resp.streaming_content).decode())))
+        self.assertEqual(rows, [["row", "identifier", "result"], ["2", "ann", ENROLLED], ["3", "ghost", NOT_FOUND]])
+
+    @mock.patch("courses.roster_import.broadcast")
+    def test_large_file_memory_is_bounded_by_batch(self, broadcast):
+        Course.objects.filter(pk=self.course.pk).update(capacity=None)
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=f"user{i:05d}", password=password) for i in range(20000)], batch_size=2000
+        )
+
+        def rows(n):
+            yield "username\r\n"
+            for i in range(n):
+                yield f"user{i:05d}\r\n"
+
+        def peak(n):
+            Enrollment.objects.all().delete()
+            tracemalloc.start()
+            totals = import_roster(self.course, rows(n), csv.writer(io.TextIOWrapper(io.BytesIO())))
+            _, top = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.assertEqual(totals[ENROLLED], n)
+            return top
+
+        small, large = peak(2000), peak(20000)
+        # ten times the rows must not cost anywhere near ten times the memory
+        self.assertLess(large, small * 2)
@@ -0,0 +1,120 @@
+from datetime import date
+
+from django.contrib.auth.models import Group, User
+from django.test import TestCase
+from django.urls import reverse
+
+from courses import access
+from courses.enrollment import bulk_enroll
+from courses.models import Assignment, Course, CourseFeedback, CourseMaterial, Enrollment
+
+
+class ConditionalResponseTests(TestCase):
+    def setUp(self):
+        access.invalidate()
+        self.teacher = User.objects.create_user("teach", password="pw")
+        Group.objects.get_or_create(name="Teacher")[0].user_set.add(self.teacher)
+        self.student = User.objects.create_user("stud", password="pw")
+        self.course = Course.objects.create(title="Algebra", created_by=self.teacher)
+        Enrollment.objects.create(course=self.course, user=self.student)
+        self.home = reverse("course_home", args=[self.course.pk])
+        self.client.login(username="stud", password="pw")
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def current_etag(self, url):
+        # the first response also sets the CSRF cookie the ETag depends on
+        self.client.get(url)
+        return self.client.get(url)["ETag"]
+
+    def test_course_home_revalidates_with_one_lookup(self):
+        etag = self.current_etag(self.home)
+        self.assertTrue(etag.startswith('"'))
+        # session, user, version counter
+        with self.assertNumQueries(3):
+            resp = self.revalidate(self.home, etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_course_changes_change_the_etag(self):
+        etag = self.current_etag(self.home)
+        changes = [
+            lambda: CourseMaterial.objects.create(course=self.course, title="Notes", created_by=self.teacher),
+            lambda: Assignment.objects.create(course=self.course, title="HW", due_date=date(2030, 1, 1)),
+            lambda: CourseFeedback.objects.create(course=self.course, user=self.student, rating=5),
+            lambda: Course.objects.get(pk=self.course.pk).save(),
+            lambda: Enrollment.objects.create(course=self.course, user=self.teacher, role="TEACHER"),
+        ]
+        for change in changes:
+            change()
+            resp = self.revalidate(self.home, etag)
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotEqual(resp["ETag"], etag)
+            etag = resp["ETag"]
+
+    def test_no_etag_for_outsiders_or_pending_messages(self):
+        Enrollment.objects.filter(user=self.student).delete()
+        resp = self.client.get(self.home)
+        self.assertEqual(resp.status_code, 403)
+        self.assertFalse(resp.has_header("ETag"))
+
+        self.client.login(username="teach", password="pw")
+        etag = self.current_etag(self.home)
+        self.client.post(reverse("course_remove_student", args=[self.course.pk, self.student.pk]))
+        resp = self.revalidate(self.home, etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, "No student enrollment found to remove")
+
+    def test_course_list_follows_the_catalog(self):
+        url = reverse("course_list")
+        etag = self.current_etag(url)
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        Course.objects.create(title="Biology", created_by=self.teacher)
+        self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_api_courses_revalidates_on_enrollment(self):
+        url = reverse("user-courses", args=[self.student.pk])
+        resp = self.client.get(url)
+        self.assertTrue(resp.has_header("Last-Modified"))
+        etag = resp["ETag"]
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"]).status_code, 304)
+
+        other = Course.objects.create(title="Biology", created_by=self.teacher)
+        etag = self.client.get(url)["ETag"]
+        bulk_enroll([other.pk], [self.student.pk], notify=False)
+        resp = self.revalidate(url, etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([c["title"] for c in resp.json()["results"]], ["Algebra", "Biology"])
+
+    def test_api_courses_resolves_the_user_first(self):
+        self.assertEqual(self.client.get("/api/v1/users/abc/courses/").status_code, 404)
+        # session, user, the missing user
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(reverse("user-courses", args=[999999])).status_code, 404)
+
+        url = reverse("user-courses", args=[self.student.pk])
+        etag = self.client.get(url)["ETag"]
+        # session, user, the listed user, the versions of the user and their courses
+        with self.assertNumQueries(4):
+            self.assertEqual(self.revalidate(url, etag).status_code, 304)
+
+        # courses written without signals have no counter yet, but leaving
+        # the list still changes the ETag
+        [quiet] = Course.objects.bulk_create([Course(title="Quiet", created_by=self.teacher)])
+        Enrollment.objects.bulk_create([Enrollment(course=quiet, user=self.student, role="STUDENT")])
+        etag = self.client.get(url)["ETag"]
+        Course.objects.filter(pk=quiet.pk).delete()
+        self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_api_courses_follows_its_courses_not_the_catalog(self):
+        url = reverse("user-courses", args=[self.student.pk])
+        etag = self.client.get(url)["ETag"]
+        Course.objects.create(title="Biology", created_by=self.teacher)
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+
+        self.course.title = "Algebra I"
+        self.course.save()
+        resp = self.revalidate(url, etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([c["title"] for c in resp.json()["results"]], ["Algebra I"])
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from courses import tasks
+from courses.models import Course, CourseMaterial, Enrollment
+from jobs.models import Job
+from jobs.queue import enqueue, run_pending, task
+
+calls = []
+
+@task(name="tests.flaky")
+def flaky(fail_times=0):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            enqueue("tests.flaky")
+            self.assertFalse(Job.objects.exists())
+        for cb in callbacks:
+            cb()
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.status), ("tests.flaky", "QUEUED"))
+
+    def test_unknown_job_rejected(self):
+        with self.assertRaises(KeyError):
+            enqueue("tests.missing")
+
+    def test_success(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(flaky)
+        self.assertEqual(run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ("DONE", 1))
+        self.assertEqual(run_pending(), 0)
+
+    def test_retry_with_backoff_then_fail(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(flaky, max_attempts=2, fail_times=5)
+        with self.assertLogs("jobs.queue", "WARNING"):
+            run_pending()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ("QUEUED", 1))
+        self.assertIn("boom", job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(run_pending(), 0)
+
+        Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs("jobs.queue", "ERROR"):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("FAILED", 2))
+
+
+class SignalJobTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user("teach", email="teach@ex.com")
+        self.student = User.objects.create_user("stud", email="stud@ex.com")
+        self.course = Course.objects.create(title="Algebra 101", created_by=self.teacher)
+
+    def test_signals_enqueue_mail_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(user=self.student, course=self.course, role="STUDENT")
+            CourseMaterial.objects.create(course=self.course, title="Slides", created_by=self.teacher)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            sorted(Job.objects.values_list("name", flat=True)),
+            sorted([tasks.email_teacher_enrollment.job_name, tasks.email_students_material.job_name]),
+        )
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["stud@ex.com", "teach@ex.com"])
+
+    @override_settings(NOTIFICATION_MAIL={"BATCH_SIZE": 2})
+    def test_material_mail_retry_skips_sent_batches(self):
+        students = [User.objects.create_user(f"s{i}", email=f"s{i}@ex.com") for i in range(5)]
+        for student in students:
+            Enrollment.objects.create(user=student, course=self.course, role="STUDENT")
+        send_messages = EmailBackend.send_messages
+        failed = []
+
+        def flaky_send(backend, messages):
+            if messages[0].to == ["s2@ex.com"] and not failed:
+                failed.append(True)
+                raise OSError("connection reset")
+            return send_messages(backend, messages)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CourseMaterial.objects.create(course=self.course, title="Slides", created_by=self.teacher)
+        Job.objects.exclude(name=tasks.email_students_material.job_name).delete()
+        with mock.patch.object(EmailBackend, "send_messages", flaky_send), self.assertLogs("jobs.queue", "WARNING"):
+            while Job.objects.filter(status="QUEUED").exists():
+                Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+                with self.captureOnCommitCallbacks(execute=True):
+                    run_pending()
+        self.assertTrue(failed)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f"s{i}@ex.com" for i in range(5)])
+        self.assertEqual(Job.objects.filter(status="DONE").count(), 3)
+
+    @override_settings(NOTIFICATION_MAIL={"BATCH_SIZE": 2, "RATE": 4})
+    def test_material_mail_batches_are_paced_by_rate(self):
+        for i in range(3):
+            student = User.objects.create_user(f"s{i}", email=f"s{i}@ex.com")
+            Enrollment.objects.create(user=student, course=self.course, role="STUDENT")
+        with self.captureOnCommitCallbacks(execute=True):
+            material = CourseMaterial.objects.create(course=self.course, title="Slides", created_by=self.teacher)
+        Job.objects.exclude(name=tasks.email_students_material.job_name).delete()
+        started = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            run_pending()
+        self.assertEqual(len(mail.outbox), 2)
+        follow_up = Job.objects.get(status="QUEUED")
+        self.assertEqual(follow_up.payload["material_id"], material.pk)
+        # two messages at four per second
+        delay = (follow_up.run_at - started).total_seconds()
+        self.assertGreaterEqual(delay, 0.5)
+        self.assertLess(delay, 1.5)
+        self.assertEqual(run_pending(), 0)
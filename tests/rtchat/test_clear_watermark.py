@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from courses.models import Course
+from jobs.models import Job
+from jobs.queue import run_pending
+from rtchat.history import clear_chat, visible_messages
+from rtchat.models import ChatMessage
+
+
+class ClearWatermarkTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user("teach", password="pw")
+        self.course = Course.objects.create(title="Algebra 101", created_by=self.teacher)
+        self.other_course = Course.objects.create(title="Biology", created_by=self.teacher)
+        self.seed(self.course, 30)
+        self.seed(self.other_course, 5)
+
+    def seed(self, course, n):
+        ChatMessage.objects.bulk_create(ChatMessage(course=course, user=self.teacher, text=f"m{i}") for i in range(n))
+
+    def test_clear_cost_does_not_depend_on_history_size(self):
+        clear_chat(self.course.id)
+        with CaptureQueriesContext(connection) as small:
+            clear_chat(self.course.id)
+        self.seed(self.course, 300)
+        with CaptureQueriesContext(connection) as large:
+            clear_chat(self.course.id)
+        self.assertEqual(len(small), len(large))
+        self.assertFalse(any("DELETE" in q["sql"] for q in large.captured_queries))
+
+    def test_clear_hides_old_messages_immediately(self):
+        self.client.login(username="teach", password="pw")
+        self.client.post(reverse("course_chat_clear", args=[self.course.id]))
+        self.assertEqual(visible_messages(self.course.id).count(), 0)
+        self.assertEqual(visible_messages(self.other_course.id).count(), 5)
+        self.assertEqual(ChatMessage.objects.filter(course=self.course).count(), 30)
+
+        ChatMessage.objects.create(course=self.course, user=self.teacher, text="after")
+        self.assertEqual(list(visible_messages(self.course.id).values_list("text", flat=True)), ["after"])
+
+    @override_settings(CHAT_COMPACTION={"CHUNK_SIZE": 7, "CHUNKS_PER_JOB": 2})
+    def test_compaction_deletes_in_bounded_chunks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            clear_chat(self.course.id)
+        ChatMessage.objects.create(course=self.course, user=self.teacher, text="after")
+        runs = 0
+        while Job.objects.filter(status="QUEUED").exists():
+            with self.captureOnCommitCallbacks(execute=True):
+                run_pending()
+            runs += 1
+        self.assertEqual(runs, 3)
+        self.assertEqual(list(ChatMessage.objects.filter(course=self.course).values_list("text", flat=True)), ["after"])
+        self.assertEqual(ChatMessage.objects.filter(course=self.other_course).count(), 5)
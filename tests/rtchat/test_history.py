@@ -0,0 +1,52 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from Elearning.keyset import encode_cursor
+from courses.models import Course, Enrollment
+from rtchat.models import ChatMessage
+
+
+class ChatHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user("teach", password="pw")
+        cls.student = User.objects.create_user("stud", password="pw")
+        User.objects.create_user("other", password="pw")
+        cls.course = Course.objects.create(title="Algebra 101", created_by=cls.teacher)
+        Enrollment.objects.create(user=cls.student, course=cls.course, role="STUDENT")
+        start = timezone.now() - timedelta(hours=1)
+        # pairs of messages share a timestamp so the id tie-breaker matters
+        ChatMessage.objects.bulk_create(
+            ChatMessage(course=cls.course, user=cls.teacher, text=f"m{i}", created_at=start + timedelta(seconds=i // 2))
+            for i in range(125)
+        )
+        cls.url = reverse("course_chat_history", args=[cls.course.id])
+
+    def test_pages_walk_back_through_history(self):
+        self.client.login(username="stud", password="pw")
+        page = self.client.get(reverse("course_chat", args=[self.course.id])).context
+        seen = [m["text"] for m in page["chat_messages"]]
+        self.assertEqual(seen, [f"m{i}" for i in range(75, 125)])
+        cursor = page["history_cursor"]
+        while cursor:
+            data = self.client.get(self.url, {"before": cursor, "limit": 20}).json()
+            seen = [m["text"] for m in data["messages"]] + seen
+            cursor = data["next"]
+        self.assertEqual(seen, [f"m{i}" for i in range(125)])
+
+    def test_query_count_does_not_depend_on_depth(self):
+        self.client.login(username="stud", password="pw")
+        first = self.client.get(self.url, {"limit": 10}).json()
+        with self.assertNumQueries(4):
+            self.client.get(self.url, {"before": first["next"], "limit": 10})
+
+    def test_permissions_and_bad_cursor(self):
+        self.client.login(username="other", password="pw")
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.login(username="teach", password="pw")
+        self.assertEqual(self.client.get(self.url, {"before": "not-a-cursor"}).status_code, 400)
+        # well-formed cursors holding the wrong types
+        for values in ([1, 2], [[1], {}], ["yesterday", 1]):
+            self.assertEqual(self.client.get(self.url, {"before": encode_cursor(values)}).status_code, 400)
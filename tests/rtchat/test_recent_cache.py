@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from courses.models import Course
+from rtchat.cache import RecentMessageCache, recent_messages
+from rtchat.models import ChatMessage
+
+
+def message(i):
+    return {"id": i, "uid": f"u{i}", "user": "teach", "text": f"m{i}", "created_at": timezone.now()}
+
+
+class RecentMessageCacheTests(SimpleTestCase):
+    def test_window_slides_and_counts(self):
+        cache = RecentMessageCache(per_course=3, max_messages=100)
+        self.assertIsNone(cache.get(1))
+        cache.fill(1, [message(1), message(2)], False, cache.write_token(1))
+        page, cursor = cache.get(1, 3)
+        self.assertEqual([m["id"] for m in page], [1, 2])
+        self.assertIsNone(cursor)
+
+        cache.append(1, message(3))
+        cache.append(1, message(4))
+        page, cursor = cache.get(1, 3)
+        self.assertEqual([m["id"] for m in page], [2, 3, 4])
+        self.assertIsNotNone(cursor)
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_stale_fill_is_rejected(self):
+        cache = RecentMessageCache(per_course=3)
+        token = cache.write_token(1)
+        cache.append(1, message(9))
+        self.assertFalse(cache.fill(1, [message(1)], False, token))
+        self.assertIsNone(cache.get(1))
+
+    def test_lru_eviction_under_memory_cap(self):
+        cache = RecentMessageCache(per_course=3, max_messages=5)
+        for course in (1, 2, 3):
+            cache.fill(course, [message(i) for i in range(3)], False, cache.write_token(course))
+        self.assertEqual(cache.stats()["courses"], 1)
+        self.assertEqual(cache.stats()["evictions"], 2)
+        self.assertIsNotNone(cache.get(3, 3))
+
+
+class ChatPageCacheTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user("teach", password="pw")
+        self.course = Course.objects.create(title="Algebra 101", created_by=self.teacher)
+        ChatMessage.objects.create(course=self.course, user=self.teacher, text="Welcome!")
+        self.url = reverse("course_chat", args=[self.course.id])
+        self.client.login(username="teach", password="pw")
+
+    def test_second_page_load_skips_message_query(self):
+        self.client.get(self.url)
+        hits = recent_messages.hits
+        with self.assertNumQueries(3):
+            resp = self.client.get(self.url)
+        self.assertContains(resp, "Welcome!")
+        self.assertEqual(recent_messages.hits, hits + 1)
+
+    def test_clear_empties_cached_page(self):
+        self.client.get(self.url)
+        self.client.post(reverse("course_chat_clear", args=[self.course.id]))
+        history = self.client.get(reverse("course_chat_history", args=[self.course.id])).json()
+        self.assertEqual(history, {"messages": [], "next": None})
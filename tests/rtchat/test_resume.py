@@ -0,0 +1,106 @@
+import uuid
+from datetime import timedelta
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TransactionTestCase
+from django.utils import timezone
+from courses.models import Course, Enrollment
+from rtchat.consumers import CourseChatConsumer
+from rtchat.events import EPOCH, CourseEventLog
+from rtchat.models import ChatMessage
+
+
+class CourseEventLogTests(SimpleTestCase):
+    def test_replay_window(self):
+        log = CourseEventLog(size=3, max_courses=2)
+        first = log.record(1, {"event": "message", "uid": "a"})
+        log.record(2, {"event": "material"})
+        second = log.record(1, {"event": "message", "uid": "b"})
+        self.assertEqual(log.since(1, first["event_id"]), [second])
+        self.assertEqual(log.since(1, second["event_id"]), [])
+        self.assertEqual(log.recent_message(1, "b"), second)
+
+        for i in range(3):
+            log.record(1, {"event": "message", "uid": f"x{i}"})
+        self.assertIsNone(log.since(1, first["event_id"]))
+        self.assertEqual(len(log.since(1, second["event_id"])), 3)
+
+    def test_unknown_epoch_or_evicted_course_is_a_gap(self):
+        log = CourseEventLog(size=3, max_courses=1)
+        event = log.record(1, {"event": "material"})
+        self.assertIsNone(log.since(1, "other-epoch:1"))
+        log.record(1, {"event": "material"})
+        log.record(2, {"event": "material"})
+        self.assertIsNone(log.since(1, event["event_id"]))
+        self.assertIsNone(log.since(3, f"{EPOCH}:0"))
+        self.assertEqual(log.since(3, log.last_event_id()), [])
+
+
+class ResumeTests(TransactionTestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user("teach")
+        self.student = User.objects.create_user("stud")
+        self.course = Course.objects.create(title="Algebra 101", created_by=self.teacher)
+        Enrollment.objects.create(user=self.student, course=self.course, role="STUDENT")
+
+    async def open(self, user, query=""):
+        comm = WebsocketCommunicator(CourseChatConsumer.as_asgi(), f"/ws/chat/course/{self.course.id}/?{query}")
+        comm.scope["user"] = user
+        comm.scope["url_route"] = {"kwargs": {"course_id": self.course.id}}
+        connected, _ = await comm.connect()
+        self.assertTrue(connected)
+        return comm
+
+    async def receive_until_resumed(self, comm):
+        frames = []
+        while True:
+            frame = await comm.receive_json_from()
+            if frame["event"] == "resumed":
+                return frames, frame
+            frames.append(frame)
+
+    async def test_reconnect_replays_missed_events(self):
+        student = await self.open(self.student)
+        await self.receive_until_resumed(student)
+        await student.send_json_to({"message": "first"})
+        last_seen = (await student.receive_json_from())["event_id"]
+        await student.disconnect()
+
+        teacher = await self.open(self.teacher)
+        await self.receive_until_resumed(teacher)
+        await teacher.send_json_to({"message": "while you were away"})
+        await teacher.receive_json_from()
+
+        student = await self.open(self.student, f"last_event={last_seen}")
+        frames, resumed = await self.receive_until_resumed(student)
+        self.assertEqual([f["text"] for f in frames], ["while you were away"])
+        self.assertFalse(resumed["gap"])
+        self.assertTrue(await student.receive_nothing())
+        await student.disconnect()
+        await teacher.disconnect()
+
+    async def test_gap_falls_back_to_database(self):
+        since = timezone.now() - timedelta(minutes=5)
+        await database_sync_to_async(ChatMessage.objects.create)(
+            course=self.course, user=self.teacher, text="stored", created_at=timezone.now()
+        )
+        query = f"last_event=old:7&since={since.isoformat().replace('+', '%2B')}"
+        student = await self.open(self.student, query)
+        frames, resumed = await self.receive_until_resumed(student)
+        self.assertTrue(resumed["gap"])
+        self.assertEqual([f["text"] for f in frames], ["stored"])
+        await student.disconnect()
+
+    async def test_resent_client_id_is_not_duplicated(self):
+        client_id = str(uuid.uuid4())
+        student = await self.open(self.student)
+        await self.receive_until_resumed(student)
+        await student.send_json_to({"message": "once", "client_id": client_id})
+        original = await student.receive_json_from()
+        self.assertEqual(original["uid"], client_id)
+
+        await student.send_json_to({"message": "once", "client_id": client_id})
+        self.assertEqual((await student.receive_json_from())["uid"], client_id)
+        self.assertEqual(await database_sync_to_async(ChatMessage.objects.count)(), 1)
+        await student.disconnect()
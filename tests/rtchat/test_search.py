@@ -0,0 +1,76 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from courses.models import Course, Enrollment
+from rtchat.history import clear_chat
+from rtchat.models import ChatMessage
+from rtchat.search import parse_query, search_messages
+
+
+class ChatSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user("teach", password="pw")
+        cls.student = User.objects.create_user("stud", password="pw")
+        cls.outsider = User.objects.create_user("other", password="pw")
+        cls.course = Course.objects.create(title="Algebra 101", created_by=cls.teacher)
+        cls.private = Course.objects.create(title="Staff room", created_by=cls.outsider)
+        Enrollment.objects.create(user=cls.student, course=cls.course, role="STUDENT")
+        start = timezone.now() - timedelta(hours=1)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(course=cls.course, user=cls.teacher, text="The midterm covers chapters 1-4", created_at=start),
+            ChatMessage(course=cls.course, user=cls.student, text="Is the midterm open book? midterm midterm", created_at=start),
+            ChatMessage(course=cls.course, user=cls.student, text="see you <b>tomorrow</b>", created_at=start),
+            ChatMessage(course=cls.private, user=cls.outsider, text="midterm answers are in the drawer", created_at=start),
+        ] + [ChatMessage(course=cls.course, user=cls.student, text=f"filler {i}", created_at=start) for i in range(20)])
+
+    def test_ranked_results_from_member_courses_only(self):
+        results = search_messages(self.student.id, "midterm")
+        self.assertEqual([r["user"] for r in results], ["stud", "teach"])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        self.assertEqual(search_messages(self.student.id, "drawer"), [])
+        self.assertEqual(search_messages(self.student.id, "midterm", course_id=self.private.id), [])
+        self.assertEqual(len(search_messages(self.outsider.id, "midterm")), 1)
+
+    def test_wide_scope_filters_matches_instead_of_index(self):
+        with mock.patch("rtchat.search.MAX_SCOPE_TOKENS", 0):
+            self.assertEqual(len(search_messages(self.student.id, "midterm")), 2)
+            self.assertEqual(len(search_messages(self.outsider.id, "midterm")), 1)
+
+    def test_snippet_highlights_terms_and_escapes_text(self):
+        [chapters] = search_messages(self.teacher.id, "chapt*")
+        self.assertIn("<mark>chapters</mark>", chapters["snippet"])
+        [tomorrow] = search_messages(self.teacher.id, "tomorrow")
+        self.assertEqual(tomorrow["snippet"], "see you &lt;b&gt;<mark>tomorrow</mark>&lt;/b&gt;")
+
+    def test_index_follows_inserts_edits_clears_and_deletes(self):
+        message = ChatMessage.objects.create(course=self.course, user=self.teacher, text="quiz on friday")
+        self.assertEqual(len(search_messages(self.student.id, "quiz")), 1)
+        message.text = "exam on friday"
+        message.save()
+        self.assertEqual(search_messages(self.student.id, "quiz"), [])
+        self.assertEqual(len(search_messages(self.student.id, "exam")), 1)
+
+        clear_chat(self.course.id)
+        self.assertEqual(search_messages(self.student.id, "midterm"), [])
+        ChatMessage.objects.create(course=self.course, user=self.teacher, text="new midterm date")
+        self.assertEqual(len(search_messages(self.student.id, "midterm")), 1)
+
+        ChatMessage.objects.filter(course=self.private).delete()
+        self.assertEqual(search_messages(self.outsider.id, "midterm"), [])
+
+    def test_query_syntax_is_never_passed_through(self):
+        self.assertEqual(parse_query('midterm" OR course:c1 NEAR('), '"midterm" "OR" "course" "c1" "NEAR"')
+        self.assertEqual(search_messages(self.student.id, '"midterm" OR drawer'), [])
+        self.assertEqual(search_messages(self.student.id, "  ()  "), [])
+
+    def test_endpoint(self):
+        url = reverse("chat_search")
+        self.assertEqual(self.client.get(url, {"q": "midterm"}).status_code, 302)
+        self.client.login(username="stud", password="pw")
+        data = self.client.get(url, {"q": "midterm", "course": self.course.id}).json()
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual(self.client.get(url, {"q": "midterm", "course": "x"}).status_code, 400)
@@ -4,6 +4,7 @@ from django.urls import reverse
 from django.contrib.auth.models import User, Group
 from django.utils import timezone
 from courses.models import Course, Enrollment
+from rtchat.history import visible_messages
 from rtchat.models import ChatMessage
 
 
@@ -58,7 +59,7 @@ class ChatViewsAndSignalsTests(TestCase):
         url = reverse("course_chat_clear", args=[self.course.id])
         resp = self.client.post(url, follow=True)
         self.assertEqual(resp.status_code, 200)
-        self.assertEqual(ChatMessage.objects.filter(course=self.course).count(), 0)
+        self.assertEqual(visible_messages(self.course.id).count(), 0)
         self.assertTrue(dummy.events, "No group_send recorded")
         group, payload = dummy.events[-1]
         self.assertEqual(group, f"course_{self.course.id}")
@@ -0,0 +1,52 @@
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+from courses.models import Course, Enrollment
+from rtchat.buffer import ChatWriteBuffer
+from rtchat.consumers import CourseChatConsumer
+from rtchat.models import ChatMessage
+
+
+def communicator_for(user, course):
+    comm = WebsocketCommunicator(CourseChatConsumer.as_asgi(), f"/ws/chat/course/{course.id}/")
+    comm.scope["user"] = user
+    comm.scope["url_route"] = {"kwargs": {"course_id": course.id}}
+    return comm
+
+
+class WriteBehindTests(TransactionTestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user("teach")
+        self.student = User.objects.create_user("stud")
+        self.course = Course.objects.create(title="Algebra 101", created_by=self.teacher)
+        Enrollment.objects.create(user=self.student, course=self.course, role="STUDENT")
+
+    @override_settings(CHAT_WRITE_BEHIND={"ENABLED": True, "FLUSH_INTERVAL": 60, "MAX_BATCH": 3})
+    async def test_broadcast_before_persist_and_flush_on_disconnect(self):
+        comm = communicator_for(self.student, self.course)
+        connected, _ = await comm.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await comm.receive_json_from())["event"], "resumed")
+
+        await comm.send_json_to({"message": "hello"})
+        payload = await comm.receive_json_from()
+        self.assertEqual(payload["text"], "hello")
+        self.assertIsNone(payload["id"])
+        self.assertTrue(payload["uid"])
+        self.assertEqual(await database_sync_to_async(ChatMessage.objects.count)(), 0)
+
+        await comm.disconnect()
+        saved = await database_sync_to_async(ChatMessage.objects.get)()
+        self.assertEqual((str(saved.uid), saved.text), (payload["uid"], "hello"))
+
+    async def test_max_batch_triggers_bulk_write(self):
+        buffer = ChatWriteBuffer(flush_interval=60, max_batch=5)
+        for i in range(12):
+            buffer.add(ChatMessage(user=self.student, course=self.course, text=f"m{i}"))
+        await buffer.flush()
+        self.assertEqual(buffer.written, 12)
+        texts = await database_sync_to_async(
+            lambda: list(ChatMessage.objects.order_by("id").values_list("text", flat=True))
+        )()
+        self.assertEqual(texts, [f"m{i}" for i in range(12)])